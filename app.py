@@ -5,10 +5,23 @@ sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
 import streamlit as st
 import os
 from pathlib import Path
-import PyPDF2
-import io
-from crew_company_search import initialize_crew
-from typing import Dict, Any, List, Optional
+import uuid
+import time
+import threading
+from contextlib import nullcontext
+# Only lightweight modules are imported here. crewai, crewai_tools and PyPDF2
+# take seconds to load, so they are imported when a generation or PDF parse
+# first needs them and the landing page renders without them.
+from results import PipelineResult
+from cache import ResearchCache, RequestLog, get_research_cache as get_shared_research_cache
+from jobs import JobManager, JobRecord, JobStatus, DEFAULT_JOB_RETENTION
+from metrics import RunMetrics, StepMetrics, load_summaries
+from warmup import WarmupScheduler, COUNTRIES
+from resume_store import get_resume_store
+from pdf_extract import extract_pdf, TEXT_CACHE_TTL
+from enum import Enum
+from typing import Dict, Any, List, Optional, Tuple
+from pydantic import BaseModel
 from models import ResearchOutput
 import json
 
@@ -24,6 +37,25 @@ if 'generation_complete' not in st.session_state:
     st.session_state.generation_complete = False
 if 'crew_result' not in st.session_state:
     st.session_state.crew_result = None
+if 'session_id' not in st.session_state:
+    # Kept in the URL next to the job id, so a reload reattaches as the job's owner
+    session_param = st.query_params.get("session", "")
+    st.session_state.session_id = (
+        session_param if len(session_param) == 32 and session_param.isalnum() else uuid.uuid4().hex
+    )
+if 'generation_notice' not in st.session_state:
+    st.session_state.generation_notice = None
+if 'job_id' not in st.session_state:
+    st.session_state.job_id = None
+
+# Pipeline steps in display order, with their progress labels
+PIPELINE_STEPS = {
+    "research": "Researching company and industry",
+    "contacts": "Finding key contacts",
+    "email": "Writing outreach email"
+}
+# Seconds between refreshes while a generation job is running
+JOB_POLL_INTERVAL = float(os.getenv("CREW_JOB_POLL_INTERVAL", 1.0))
 
 # Custom CSS
 st.markdown("""
@@ -61,18 +93,79 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_research_cache() -> ResearchCache:
+    """Shared research cache for all sessions in this process, also read by the pipeline's fallbacks."""
+    return get_shared_research_cache()
+
+@st.cache_resource
+def get_request_log() -> RequestLog:
+    """Popularity log of researched targets, used to decide what to keep warm."""
+    return RequestLog()
+
+@st.cache_resource
+def get_warmup_scheduler() -> Optional[WarmupScheduler]:
+    """
+    Start the background cache warm-up once per process. It is opt-in because
+    it spends API quota ahead of demand: set CREW_WARMUP=1 to enable it.
+    """
+    if os.getenv("CREW_WARMUP", "0") != "1":
+        return None
+    scheduler = WarmupScheduler(
+        anthropic_api_key=st.secrets['ANTHROPIC_API_KEY'],
+        serper_api_key=st.secrets['SERPER_API_KEY'],
+        research_cache=get_research_cache(),
+        request_log=get_request_log()
+    )
+    scheduler.start()
+    return scheduler
+
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """Background worker pool running generations for every session in this process."""
+    return JobManager()
+
+@st.cache_resource
+def get_cassette_recorder():
+    """
+    Records each generation's LLM and Serper traffic when CREW_RECORD_DIR is
+    set, with the user's resume redacted from it.
+    """
+    record_dir = os.getenv("CREW_RECORD_DIR", "")
+    if not record_dir:
+        return None
+    from cassette import CassetteRecorder
+    return CassetteRecorder(record_dir, redact_resume=True)
+
+@st.cache_resource
+def preload_pipeline() -> None:
+    """
+    Import the pipeline on a background thread once the first page is up, so
+    the first generation does not wait for crewai to load. CREW_PRELOAD=0
+    leaves it to the first generation.
+    """
+    if os.getenv("CREW_PRELOAD", "1") != "1":
+        return
+    def load() -> None:
+        import pipeline  # noqa: F401
+    threading.Thread(target=load, name="pipeline-preload", daemon=True).start()
+
 def pdf_to_text(uploaded_file) -> str:
     """Convert uploaded PDF to text with error handling."""
     try:
         if not uploaded_file:
             raise ValueError("No file uploaded")
         
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(uploaded_file.getvalue()))
-        text = "\n".join(page.extract_text() for page in pdf_reader.pages if page.extract_text())
+        extracted = extract_pdf(uploaded_file.getvalue())
+        if extracted.truncated:
+            st.warning(
+                f"⚠️ Your resume has {extracted.pages} pages; only the first "
+                f"{extracted.pages_read} were read."
+            )
         
-        if not text.strip():
+        if not extracted.text.strip():
             raise ValueError("No text content found in PDF")
-        return text
+        return extracted.text
     except Exception as e:
         raise Exception(f"Error processing PDF: {str(e)}")
 
@@ -126,238 +219,312 @@ def parse_contacts(text: str) -> List[Dict[str, str]]:
     
     return contacts
 
-def update_tabs_with_content(result, tabs):
-    """Update tabs with CrewAI results."""
-    tab1, tab2, tab3 = tabs  # Unpack the tabs
-    
-    try:
-        # Get the tasks output
-        tasks_output = []
-        if hasattr(result, 'tasks_output'):
-            tasks_output = result.tasks_output
-        elif isinstance(result, dict) and 'tasks_output' in result:
-            tasks_output = result['tasks_output']
-        
-        # Initialize outputs
-        research_output = None
-        contact_output = None
-        email_output = None
-        
-        # Extract task results
-        if tasks_output and len(tasks_output) >= 3:
-            # Get research output
-            research_result = tasks_output[0]
-            if isinstance(research_result, dict):
-                research_output = research_result.get('output') or research_result.get('raw')
+# Labels that differ from the field name; other fields are labelled from their names
+FIELD_LABELS = {
+    "offices_count": "Offices",
+    "organizational_structure": "Organization",
+    "department_overview": "Department",
+    "reporting_structure": "Reporting",
+    "culture_description": "Culture",
+    "benefits_overview": "Benefits",
+    "skill_requirements": "Required Skills"
+}
+RESEARCH_GROUP_ICONS = {
+    "company_analysis": "🏢",
+    "industry_analysis": "🌐"
+}
+
+def field_label(name: str, title: Optional[str] = None) -> str:
+    return FIELD_LABELS.get(name) or title or name.replace("_", " ").title()
+
+def format_scalar(value: Any) -> str:
+    if isinstance(value, Enum):
+        return str(value.value)
+    return "N/A" if value is None or value == "" else str(value)
+
+def model_markdown(model: BaseModel, indent: str = "") -> str:
+    """One markdown list for a model, walking its fields in schema order."""
+    lines = []
+    for name, field in type(model).model_fields.items():
+        label = field_label(name, field.title)
+        value = getattr(model, name)
+        if isinstance(value, BaseModel):
+            lines.append(f"{indent}- **{label}:**")
+            lines.append(model_markdown(value, indent + "    "))
+        elif isinstance(value, (list, tuple, set)):
+            lines.append(f"{indent}- **{label}:**")
+            for item in value:
+                if isinstance(item, BaseModel):
+                    lines.append(model_markdown(item, indent + "    "))
+                else:
+                    lines.append(f"{indent}    - {format_scalar(item)}")
+        else:
+            lines.append(f"{indent}- **{label}:** {format_scalar(value)}")
+    return "\n".join(lines)
+
+# Rendered research: (group title, [(section title, markdown)]) per analysis
+ResearchSections = List[Tuple[str, List[Tuple[str, str]]]]
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def research_markdown(research_json: str, reasons: Tuple[Tuple[str, str], ...] = ()) -> ResearchSections:
+    """
+    Markdown for each section of a ResearchOutput, grouped by analysis.
+    Research may lack sections, cut short by a run's time limit or failing
+    validation; each is validated on its own and a missing one is shown as a
+    note with the reason the run recorded for it, given as (section, reason)
+    pairs. Cached by its arguments, so a rerun with the same content only
+    replays the blocks.
+    """
+    missing = dict(reasons)
+    research = json.loads(research_json)
+    groups = []
+    for group_name, group_field in ResearchOutput.model_fields.items():
+        values = research.get(group_name) or {}
+        icon = RESEARCH_GROUP_ICONS.get(group_name, "📋")
+        sections = []
+        for name, field in group_field.annotation.model_fields.items():
+            try:
+                markdown = model_markdown(field.annotation.model_validate(values[name]))
+            except Exception:
+                reason = missing.get(name, "it did not match the expected format, even after repair")
+                markdown = f"_Not available: {reason}._"
+            sections.append((field_label(name, field.title), markdown))
+        groups.append((f"{icon} {field_label(group_name, group_field.title)}", sections))
+    return groups
+
+def research_sections(research_output, degraded: Optional[Dict[str, str]] = None) -> ResearchSections:
+    """
+    Rendered sections of a ResearchOutput or its JSON, noting missing ones with
+    the reason recorded in degraded; raises JSONDecodeError for unstructured text.
+    """
+    reasons = tuple(sorted(
+        (step.split(":", 1)[1], reason) for step, reason in (degraded or {}).items()
+        if step.startswith("research:")
+    ))
+    if isinstance(research_output, str):
+        research = json.loads(research_output)
+        if not isinstance(research, dict) or not any(name in research for name in ResearchOutput.model_fields):
+            raise ValueError("Research JSON does not match the ResearchOutput schema")
+        return research_markdown(json.dumps(research, sort_keys=True), reasons)
+    return research_markdown(research_output.model_dump_json(), reasons)
+
+def render_research(research_output):
+    """
+    Render the Research tab from a ResearchOutput, raw research text, or
+    sections already rendered by research_sections.
+    """
+    st.subheader("Company & Industry Research")
+    if research_output:
+        try:
+            if isinstance(research_output, list):
+                groups = research_output
             else:
-                research_output = research_result
-                
-            # Get contact and email outputs
-            contact_output = tasks_output[1].get('output') if isinstance(tasks_output[1], dict) else tasks_output[1]
-            email_output = tasks_output[2].get('output') if isinstance(tasks_output[2], dict) else tasks_output[2]
-        
-        # Display Research Tab
-        with tab1:
-            st.subheader("Company & Industry Research")
-            if research_output:
                 try:
-                    # Parse the research output into ResearchOutput model if it's a string
-                    if isinstance(research_output, str):
-                        try:
-                            research_data = ResearchOutput(**json.loads(research_output))
-                        except json.JSONDecodeError:
-                            # If not valid JSON, try to parse the raw text output
-                            st.warning("Received unstructured output. Displaying raw format:")
-                            st.markdown(research_output)
-                            return
-                    else:
-                        research_data = research_output
-
-                    # Display structured data
-                    st.markdown("### 🏢 Company Analysis")
-                    
-                    # Company Details
-                    with st.expander("Company Details", expanded=True):
-                        details = research_data.company_analysis.company_details
-                        st.markdown(f"- **Employees:** {details.employees}")
-                        st.markdown(f"- **Offices:** {details.offices_count}")
-                        st.markdown(f"- **Company Stage:** {details.company_stage}")
-                        st.markdown(f"- **Financial Status:** {details.financial_status}")
-                        st.markdown("**Core Business:**")
-                        for business in details.core_business:
-                            st.markdown(f"  • {business}")
-                        st.markdown("**Geographical Presence:**")
-                        for location in details.geographical_presence:
-                            st.markdown(f"  • {location}")
-                        st.markdown(f"- **Organization:** {details.organizational_structure}")
-
-                    # Position Context
-                    with st.expander("Position Context", expanded=True):
-                        position = research_data.company_analysis.position_context
-                        st.markdown(f"- **Department:** {position.department_overview}")
-                        st.markdown(f"- **Reporting:** {position.reporting_structure}")
-                        st.markdown("**Growth Plans:**")
-                        for plan in position.growth_plans:
-                            st.markdown(f"  • {plan}")
-                        st.markdown("**Key Projects:**")
-                        for project in position.key_projects:
-                            st.markdown(f"  • {project}")
-                        st.markdown("**Required Qualifications:**")
-                        for qual in position.required_qualifications:
-                            st.markdown(f"  • {qual}")
-                        st.markdown("**Similar Roles:**")
-                        for role in position.similar_roles:
-                            st.markdown(f"  • {role}")
-
-                    # Work Environment
-                    with st.expander("Work Environment", expanded=True):
-                        env = research_data.company_analysis.work_environment
-                        st.markdown("**Company Values:**")
-                        for value in env.company_values:
-                            st.markdown(f"  • {value}")
-                        st.markdown(f"- **Culture:** {env.culture_description}")
-                        st.markdown("**Development Programs:**")
-                        for program in env.development_programs:
-                            st.markdown(f"  • {program}")
-                        st.markdown("**Benefits:**")
-                        for benefit in env.benefits_overview:
-                            st.markdown(f"  • {benefit}")
-                        st.markdown(f"- **Leadership Style:** {env.leadership_style}")
-                        st.markdown("**Employee Reviews:**")
-                        for review in env.employee_reviews:
-                            st.markdown(f"  • {review}")
-                        st.markdown(f"- **Work Model:** {env.work_model}")
-
-                    # Industry Analysis Section
-                    st.markdown("### 🌐 Industry Analysis")
-                    
-                    # Market Position
-                    with st.expander("Market Position", expanded=True):
-                        market = research_data.industry_analysis.market_position
-                        st.markdown(f"- **Industry Ranking:** {market.industry_ranking}")
-                        st.markdown("**Key Competitors:**")
-                        for competitor in market.key_competitors:
-                            st.markdown(f"  • {competitor}")
-                        st.markdown("**Differentiators:**")
-                        for diff in market.differentiators:
-                            st.markdown(f"  • {diff}")
-                        st.markdown("**Major Partnerships:**")
-                        for partnership in market.major_partnerships:
-                            st.markdown(f"  • {partnership}")
-                        st.markdown("**Recent Achievements:**")
-                        for achievement in market.recent_achievements:
-                            st.markdown(f"  • {achievement}")
-                        st.markdown("**Industry Challenges:**")
-                        for challenge in market.industry_challenges:
-                            st.markdown(f"  • {challenge}")
-
-                    # Professional Growth
-                    with st.expander("Professional Growth", expanded=True):
-                        growth = research_data.industry_analysis.professional_growth
-                        st.markdown("**Required Skills:**")
-                        for skill in growth.skill_requirements:
-                            st.markdown(f"  • {skill}")
-                        st.markdown("**Career Paths:**")
-                        for path in growth.career_paths:
-                            st.markdown(f"  • {path}")
-                        st.markdown("**Certifications:**")
-                        for cert in growth.certifications:
-                            st.markdown(f"  • {cert}")
-                        st.markdown(f"- **Salary Ranges:** {growth.salary_ranges}")
-                        st.markdown("**Professional Associations:**")
-                        for assoc in growth.professional_associations:
-                            st.markdown(f"  • {assoc}")
-                        st.markdown("**Industry Outlook:**")
-                        for outlook in growth.industry_outlook:
-                            st.markdown(f"  • {outlook}")
-
-                    # Local Market
-                    with st.expander("Local Market", expanded=True):
-                        local = research_data.industry_analysis.local_market
-                        st.markdown(f"- **Regional Status:** {local.regional_status}")
-                        st.markdown(f"- **Business Environment:** {local.business_environment}")
-                        st.markdown("**Local Competitors:**")
-                        for competitor in local.local_competitors:
-                            st.markdown(f"  • {competitor}")
-                        st.markdown("**Employment Regulations:**")
-                        for reg in local.employment_regulations:
-                            st.markdown(f"  • {reg}")
-                        st.markdown("**Business Culture:**")
-                        for culture in local.business_culture:
-                            st.markdown(f"  • {culture}")
-                        st.markdown("**Required Permits:**")
-                        for permit in local.required_permits:
-                            st.markdown(f"  • {permit}")
-
-                except Exception as e:
-                    st.error(f"Error parsing research: {str(e)}")
-                    st.markdown("Raw output:")
+                    groups = research_sections(research_output)
+                except json.JSONDecodeError:
+                    # If not valid JSON, try to parse the raw text output
+                    st.warning("Received unstructured output. Displaying raw format:")
                     st.markdown(research_output)
+                    return
+
+            # One markdown block per section rather than one element per bullet
+            for group_title, sections in groups:
+                st.markdown(f"### {group_title}")
+                for section_title, markdown in sections:
+                    with st.expander(section_title, expanded=True):
+                        st.markdown(markdown)
+
+        except Exception as e:
+            st.error(f"Error parsing research: {str(e)}")
+            st.markdown("Raw output:")
+            st.markdown(research_output)
+    else:
+        st.warning("No research data available")
+
+def contact_list(contact_output: str) -> List[Dict[str, str]]:
+    """Contacts parsed from the contact finder's output."""
+    # Remove the "Based on my research" prefix if present
+    if contact_output.startswith("Based on my research"):
+        contact_output = contact_output.split("\n\n", 1)[1]
+    return parse_contacts(contact_output)
+
+def render_contacts(contact_output):
+    """Render the Contacts tab from the contact finder's output or contacts parsed by contact_list."""
+    st.subheader("Key Contacts")
+    if contact_output:
+        try:
+            if isinstance(contact_output, list):
+                contacts = contact_output
             else:
-                st.warning("No research data available")
+                contacts = contact_list(contact_output)
+            for contact in contacts:
+                with st.expander(f"{contact.get('Contact Name', 'Unknown')} - {contact.get('Role', 'Unknown Role')}"):
+                    # Display fields in specific order
+                    display_order = ['Role', 'Location', 'Background', 'LinkedIn', 'Email']
+                    
+                    for field in display_order:
+                        if field == 'LinkedIn' and field in contact:
+                            st.markdown(f"**LinkedIn:** [{contact[field]}]({contact[field]})")
+                        elif field == 'Email':
+                            # Always show email field, even if not found
+                            email_value = contact.get(field, 'Not found')
+                            st.markdown(f"**Email:** {email_value}")
+                        elif field in contact:
+                            st.markdown(f"**{field}:** {contact[field]}")
+                    
+        except Exception as e:
+            st.error(f"Error parsing contacts: {str(e)}")
+            st.markdown(contact_output)
+    else:
+        st.warning("No contact data available")
+
+@st.fragment
+def render_email(email_output: Optional[str]):
+    """Render the Email tab. Its Copy button reruns only this tab."""
+    st.subheader("Email Draft")
+    if email_output:
+        try:
+            st.text_area(
+                "Email Content",
+                value=email_output,
+                height=300,
+                key="email_content"
+            )
+            
+            col1, col2 = st.columns([1, 4])
+            with col1:
+                if st.button("📋 Copy"):
+                    st.code(email_output)
+                    st.success("Copied to clipboard!")
+        except Exception as e:
+            st.error(f"Error displaying email: {str(e)}")
+            st.markdown(email_output)
+    else:
+        st.warning("No email draft available")
+
+def metrics_rows(label: str, steps: Dict[str, StepMetrics]) -> List[Dict[str, Any]]:
+    """Table rows for a metrics panel, one per agent or task."""
+    return [
+        {
+            label: name,
+            "Wall time (s)": round(step.wall_time, 1),
+            "LLM calls": step.llm_calls,
+            "Input tokens": step.input_tokens,
+            "Cached input tokens": step.cached_input_tokens,
+            "Output tokens": step.output_tokens,
+            "Serper calls": step.serper_calls,
+            "Retries": step.retries,
+            "Hedges": step.hedges,
+            "Escalations": step.escalations,
+            "Queued (s)": round(step.queue_time, 1)
+        }
+        for name, step in sorted(steps.items())
+    ]
+
+def render_metrics(metrics: Optional[RunMetrics]):
+    """Render wall time, LLM, token and search usage for a run and recent runs."""
+    if metrics is None:
+        st.info("No metrics recorded for this run.")
+        return
+    
+    total = metrics.total()
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Wall time", f"{total.wall_time:.0f}s")
+    col2.metric("LLM calls", total.llm_calls)
+    col3.metric("Tokens in / out", f"{total.input_tokens:,} / {total.output_tokens:,}")
+    col4.metric("Serper requests", metrics.serper_requests)
+    col5.metric("Retries", total.retries)
+    
+    st.markdown("**By agent**")
+    st.dataframe(metrics_rows("Agent", metrics.by_agent), hide_index=True)
+    st.markdown("**By task**")
+    st.dataframe(metrics_rows("Task", metrics.by_task), hide_index=True)
+    
+    # Aggregate over the recent runs in the trace, for a baseline to compare against
+    recent = load_summaries()
+    if len(recent) > 1:
+        by_agent: Dict[str, StepMetrics] = {}
+        for run in recent:
+            for name, step in run.by_agent.items():
+                by_agent.setdefault(name, StepMetrics()).add(step)
+        wall_times = sorted(run.wall_time for run in recent)
+        st.markdown(
+            f"**Last {len(recent)} runs** - median wall time "
+            f"{wall_times[len(wall_times) // 2]:.0f}s, totals by agent:"
+        )
+        st.dataframe(metrics_rows("Agent", by_agent), hide_index=True)
+
+class ResultView(BaseModel):
+    """
+    A finished generation as kept in the session: the pipeline result plus
+    its research and contacts parsed once, so reruns only redraw them.
+    """
+    result: PipelineResult
+    research_sections: Optional[ResearchSections] = None
+    contacts: Optional[List[Dict[str, str]]] = None
+
+def build_result_view(result: PipelineResult) -> ResultView:
+    """Parse a result for display; parts that fail to parse are shown raw instead."""
+    view = ResultView(result=result)
+    research = result.research or result.research_raw
+    if research:
+        try:
+            view.research_sections = research_sections(research, result.degraded)
+        except Exception:
+            pass
+    if result.contacts:
+        try:
+            view.contacts = contact_list(result.contacts) or None
+        except Exception:
+            pass
+    return view
+
+@st.fragment
+def render_result_details(view: ResultView):
+    """
+    Metrics and debug panels. Their content is only built while the panel is
+    open, and opening one reruns just this fragment.
+    """
+    result = view.result
+    metrics_panel = st.expander("📈 Run Metrics", key="metrics_panel", on_change="rerun")
+    if metrics_panel.open:
+        with metrics_panel:
+            render_metrics(result.metrics)
+    
+    debug_panel = st.expander("Debug Information", key="debug_panel", on_change="rerun")
+    if debug_panel.open:
+        with debug_panel:
+            st.write("Execution mode:", result.mode)
+            st.write("Research served from cache:", result.research_cached)
+            st.write("Degraded steps:", result.degraded or "none")
+            st.json(result.model_dump(mode="json"))
+
+def update_tabs_with_content(view: ResultView, tabs):
+    """Update tabs with a parsed pipeline result."""
+    tab1, tab2, tab3 = tabs  # Unpack the tabs
+    result = view.result
+    
+    try:
+        if result.degraded:
+            # Parts that ran out of time were served from a fallback instead
+            st.warning("Some results were cut short to finish in time:\n\n" + "\n".join(
+                f"- **{step.replace('research:', '').replace('_', ' ').capitalize()}**: {fallback}"
+                for step, fallback in result.degraded.items()
+            ))
+
+        # Display Research Tab, preferring the parsed research over raw output
+        with tab1:
+            render_research(view.research_sections or result.research_raw)
 
         # Display Contacts Tab
         with tab2:
-            st.subheader("Key Contacts")
-            if contact_output:
-                try:
-                    # Remove the "Based on my research" prefix if present
-                    if contact_output.startswith("Based on my research"):
-                        contact_output = contact_output.split("\n\n", 1)[1]
-                    
-                    contacts = parse_contacts(contact_output)
-                    for contact in contacts:
-                        with st.expander(f"{contact.get('Contact Name', 'Unknown')} - {contact.get('Role', 'Unknown Role')}"):
-                            # Display fields in specific order
-                            display_order = ['Role', 'Location', 'Background', 'LinkedIn', 'Email']
-                            
-                            for field in display_order:
-                                if field == 'LinkedIn' and field in contact:
-                                    st.markdown(f"**LinkedIn:** [{contact[field]}]({contact[field]})")
-                                elif field == 'Email':
-                                    # Always show email field, even if not found
-                                    email_value = contact.get(field, 'Not found')
-                                    st.markdown(f"**Email:** {email_value}")
-                                elif field in contact:
-                                    st.markdown(f"**{field}:** {contact[field]}")
-                            
-                except Exception as e:
-                    st.error(f"Error parsing contacts: {str(e)}")
-                    st.markdown(contact_output)
-            else:
-                st.warning("No contact data available")
+            render_contacts(view.contacts or result.contacts)
 
         # Display Email Tab
         with tab3:
-            st.subheader("Email Draft")
-            if email_output:
-                try:
-                    st.text_area(
-                        "Email Content",
-                        value=email_output,
-                        height=300,
-                        key="email_content"
-                    )
-                    
-                    col1, col2 = st.columns([1, 4])
-                    with col1:
-                        if st.button("📋 Copy"):
-                            st.code(email_output)
-                            st.success("Copied to clipboard!")
-                except Exception as e:
-                    st.error(f"Error displaying email: {str(e)}")
-                    st.markdown(email_output)
-            else:
-                st.warning("No email draft available")
+            render_email(result.email)
 
-        # Add debug information (can be toggled with a checkbox)
-        with st.expander("Debug Information", expanded=False):
-            st.write("Raw Result Structure:", type(result))
-            st.json(result.model_dump() if hasattr(result, 'model_dump') else result)
-            if tasks_output:
-                st.write("Tasks Output Types:")
-                for i, task in enumerate(tasks_output):
-                    st.write(f"Task {i}: {type(task)}")
+        render_result_details(view)
 
     except Exception as e:
         st.error(f"Error updating content: {str(e)}")
@@ -368,6 +535,190 @@ def update_tabs_with_content(result, tabs):
         except:
             st.write(result)
 
+def render_job_progress(job: JobRecord, tab_slots: Dict[str, Any]):
+    """
+    Show the live progress of a running job and fill each tab whose step has
+    already completed. Called on every poll, from the job's recorded events.
+    """
+    renderers = {
+        "research": render_research,
+        "contacts": render_contacts,
+        "email": render_email
+    }
+    started = job.started_at or job.created_at
+    completed = [step for step in PIPELINE_STEPS if step in job.partial]
+    
+    if job.status == JobStatus.QUEUED:
+        label = "⏳ Waiting for a free worker..."
+    else:
+        current = [
+            PIPELINE_STEPS[event.step] for event in job.progress
+            if event.step in PIPELINE_STEPS and event.step not in completed
+        ]
+        label = f"🔍 {current[-1]}..." if current else "🔍 Analyzing and generating materials..."
+    
+    with st.status(label, expanded=True):
+        st.progress(len(completed) / len(PIPELINE_STEPS))
+        for event in job.progress:
+            elapsed = event.at - started
+            if event.step not in PIPELINE_STEPS:
+                # Sub-steps such as "research:local_market" are only logged
+                if event.status == "completed":
+                    section = event.step.split(":", 1)[-1].replace("_", " ")
+                    st.write(f"✅ Research: {section} ({elapsed:.0f}s)")
+                continue
+            
+            label = PIPELINE_STEPS[event.step]
+            if event.status == "started":
+                st.write(f"⏳ {label}...")
+            else:
+                st.write(f"✅ {label} ({elapsed:.0f}s)")
+        
+        if st.button("✖️ Cancel generation", key="cancel_job"):
+            get_job_manager().cancel(job.id)
+    
+    for step in PIPELINE_STEPS:
+        with tab_slots[step].container():
+            if step in job.partial:
+                renderers[step](job.partial[step])
+            else:
+                st.info(f"{PIPELINE_STEPS[step]}...")
+
+def search_notice(result: PipelineResult) -> Optional[str]:
+    """This run's web searches and how many the search cache answered without calling Serper."""
+    if result.metrics is None:
+        return None
+    searches = result.metrics.total().serper_calls
+    if not searches:
+        return None
+    hits = max(0, searches - result.metrics.serper_requests)
+    return f"🔎 Search cache: {hits} of this run's {searches} searches were cached ({hits / searches:.0%})"
+
+def follow_job(job_id: str, status_area, tab_slots: Dict[str, Any]) -> bool:
+    """
+    Show the state of a background generation job, moving its result into the
+    session once it succeeds. Returns True while the job is still running.
+    """
+    job = get_job_manager().get(job_id)
+    # Jobs hold another user's inputs and email; only their own session may see them
+    if job is None or job.owner != st.session_state.session_id:
+        with status_area:
+            st.warning("This generation is no longer available.")
+        st.query_params.pop("job", None)
+        st.session_state.job_id = None
+        return False
+    
+    if not job.finished:
+        with status_area:
+            render_job_progress(job, tab_slots)
+        return True
+    
+    if job.status == JobStatus.SUCCEEDED:
+        st.session_state.crew_result = build_result_view(job.result)
+        st.session_state.generation_complete = True
+        st.session_state.generation_notice = search_notice(job.result)
+        return False
+    
+    with status_area:
+        if job.status == JobStatus.CANCELLED:
+            st.warning("Generation cancelled.")
+        else:
+            st.error(f"Error during generation: {job.error}")
+            st.error("Please try again or contact support.")
+    # Show the outcome once; there is nothing to reattach to
+    st.query_params.pop("job", None)
+    st.session_state.job_id = None
+    return False
+
+def generate_materials(
+    uploaded_file,
+    tab_slots: Dict[str, Any],
+    industry: str,
+    company: str,
+    pitching_role: str,
+    country: str,
+    outreach_purpose: str
+):
+    """Validate the form and queue a background generation job for it."""
+    if not uploaded_file:
+        st.error("⚠️ Please upload your resume first!")
+        return
+    
+    if not all([industry, company, pitching_role]):
+        st.error("⚠️ Please fill in all required fields!")
+        return
+    
+    job_manager = get_job_manager()
+    resume_store = get_resume_store()
+    resume_key = None
+    try:
+        # Process resume and keep it in memory for this session only
+        resume_text = pdf_to_text(uploaded_file)
+        resume_key = resume_store.put(st.session_state.session_id, resume_text)
+        
+        # Reuse research for this company/role/country if we have it
+        get_request_log().record(company, industry, country, pitching_role)
+        research_cache = get_research_cache()
+        cached_research = research_cache.get(company, industry, country, pitching_role)
+        if cached_research is not None:
+            st.info("♻️ Using cached research for this company - skipping the research step.")
+        
+        inputs = {
+            "industry": industry,
+            "outreach_purpose": outreach_purpose,
+            "pitching_role": pitching_role,
+            "company": company,
+            "country": country  # Add country to inputs
+        }
+        # Secrets are read here; the job runs outside the script thread
+        anthropic_api_key = st.secrets['ANTHROPIC_API_KEY']
+        serper_api_key = st.secrets['SERPER_API_KEY']
+        scheduler = get_warmup_scheduler()
+        recorder = get_cassette_recorder()
+        
+        def job(on_progress) -> PipelineResult:
+            from pipeline import run_pipeline
+            recording = (
+                recorder.record(inputs, resume_key, research_output=cached_research)
+                if recorder else nullcontext()
+            )
+            with scheduler.foreground() if scheduler else nullcontext(), recording:
+                result = run_pipeline(
+                    anthropic_api_key=anthropic_api_key,
+                    serper_api_key=serper_api_key,
+                    inputs=inputs,
+                    research_output=cached_research,
+                    resume_key=resume_key,
+                    on_progress=on_progress
+                )
+            # Research patched up from fallbacks is not cached as if it were researched
+            if result.research is not None and not result.research_cached and not result.is_degraded("research"):
+                research_cache.set(company, industry, country, pitching_role, result.research)
+            return result
+        
+        # Only one generation per session at a time
+        if st.session_state.job_id:
+            job_manager.cancel(st.session_state.job_id)
+        
+        job_id = job_manager.submit(
+            job,
+            owner=st.session_state.session_id,
+            inputs=inputs,
+            # Drop the resume as soon as the run is over, however it ends
+            cleanup=lambda: resume_store.discard(resume_key)
+        )
+    except Exception as e:
+        if resume_key is not None:
+            resume_store.discard(resume_key)
+        st.error(f"An error occurred: {str(e)}")
+        st.error("Please try again or contact support.")
+        return
+    
+    # Keep the job in the URL so a reload reattaches to it
+    st.query_params["job"] = job_id
+    st.query_params["session"] = st.session_state.session_id
+    st.rerun()
+
 def main():
     st.title("AI Job Application Assistant 💼")
     
@@ -380,11 +731,19 @@ def main():
     """)
 
     # Add note about privacy and performance
-    st.info("""
+    retention_hours = DEFAULT_JOB_RETENTION / 3600
+    # Checked without building the recorder, which would load crewai with the landing page
+    recording_note = (
+        "\n    - Generations are recorded to disk for debugging: the prompts and generated materials, "
+        "with your resume's text removed"
+        if os.getenv("CREW_RECORD_DIR") else ""
+    )
+    st.info(f"""
     ℹ️ **Important Notes:**
     - This is a prototype application and may run slower than a production version
-    - No user data or resumes are stored - all information is processed in memory and immediately deleted
-    - Each generation takes about 2-3 minutes to complete
+    - Your resume is kept in memory only and never written to disk: the text read from your PDF for {TEXT_CACHE_TTL / 60:g} minutes, so resubmitting it is instant, and the copy used for a generation until it ends
+    - Your inputs and the generated materials are kept for {retention_hours:g} hours so you can come back to them, then deleted
+    - Each generation takes about 2-3 minutes to complete{recording_note}
     """)
 
     # File upload
@@ -419,11 +778,7 @@ def main():
         # Add country selection
         country = st.selectbox(
             "Country",
-            options=[
-                "France", "United States", "United Kingdom", "Germany", 
-                "Singapore", "Australia", "Canada", "Japan", "Netherlands",
-                "Switzerland", "Other"
-            ],
+            options=COUNTRIES + ["Other"],
             help="Select the country where the position is located"
         )
         
@@ -434,87 +789,59 @@ def main():
         )
 
     # Generate button and results
-    if st.button("🚀 Generate Application Materials", type="primary"):
-        if not uploaded_file:
-            st.error("⚠️ Please upload your resume first!")
-            return
-        
-        if not all([industry, company, pitching_role]):
-            st.error("⚠️ Please fill in all required fields!")
-            return
-        
-        try:
-            # Process resume
-            resume_text = pdf_to_text(uploaded_file)
-            
-            # Save resume text to a temporary file in the current working directory
-            resume_path = os.path.join(os.getcwd(), "resume.txt")
-            with open(resume_path, "w", encoding="utf-8") as f:
-                f.write(resume_text)
-            
-            # Initialize CrewAI with error handling
-            with st.spinner("Initializing AI agents..."):
-                try:
-                    crew_instance = initialize_crew(
-                        anthropic_api_key=st.secrets['ANTHROPIC_API_KEY'],
-                        serper_api_key=st.secrets['SERPER_API_KEY'],
-                        company=company,
-                        industry=industry,
-                        pitching_role=pitching_role,
-                        country=country,
-                        outreach_purpose=outreach_purpose
-                    )
-                except Exception as e:
-                    st.error(f"Failed to initialize AI agents: {str(e)}")
-                    return
-            
-            inputs = {
-                "industry": industry,
-                "outreach_purpose": outreach_purpose,
-                "pitching_role": pitching_role,
-                "company": company,
-                "country": country,  # Add country to inputs
-                "resume_path": resume_path  # Pass the full path to the resume file
-            }
-            
-            with st.spinner("🔍 Analyzing and generating materials..."):
-                try:
-                    result = crew_instance.kickoff(inputs=inputs)
-                    
-                    if result is None:
-                        st.error("No results generated. The AI agents returned None.")
-                        return
-                        
-                    st.session_state.crew_result = result
-                    st.session_state.generation_complete = True
-                    st.success("✨ Application materials generated successfully!")
-                except Exception as e:
-                    st.error(f"Error during generation: {str(e)}")
-                    st.error("Please try again or contact support.")
-                    
-        except Exception as e:
-            st.error(f"An error occurred: {str(e)}")
-            st.error("Please try again or contact support.")
-        finally:
-            # Clean up the temporary resume file
-            try:
-                if os.path.exists(resume_path):
-                    os.remove(resume_path)
-            except Exception as e:
-                st.warning(f"Could not remove temporary file: {str(e)}")
-
+    generate = st.button("🚀 Generate Application Materials", type="primary")
+    status_area = st.container()
+    
     # Show results or placeholders - AFTER the generate button
     tabs = st.tabs(["📊 Research", "👥 Contacts", "✉️ Email"])
+    tab_slots = {step: tab.empty() for step, tab in zip(PIPELINE_STEPS, tabs)}
+    
+    if generate:
+        with status_area:
+            generate_materials(
+                uploaded_file, tab_slots,
+                industry=industry,
+                company=company,
+                pitching_role=pitching_role,
+                country=country,
+                outreach_purpose=outreach_purpose
+            )
+    
+    # Attach to the generation job in the URL, if any: a new submission or a reload
+    polling = False
+    job_id = st.query_params.get("job")
+    if job_id and job_id != st.session_state.job_id:
+        st.session_state.job_id = job_id
+        st.session_state.crew_result = None
+        st.session_state.generation_complete = False
+    if job_id and not st.session_state.generation_complete:
+        polling = follow_job(job_id, status_area, tab_slots)
+    
+    # Shown once, on the rerun that follows a successful generation
+    if st.session_state.generation_notice:
+        with status_area:
+            st.success("✨ Application materials generated successfully!")
+            st.caption(st.session_state.generation_notice)
+        st.session_state.generation_notice = None
+    
+    if polling:
+        # Tabs are filled from the job's progress; check on it again shortly
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
     
     if not st.session_state.generation_complete:
-        with tabs[0]:
+        with tab_slots["research"]:
             st.info("Company and industry research will appear here.")
-        with tabs[1]:
+        with tab_slots["contacts"]:
             st.info("Key contacts will be listed here.")
-        with tabs[2]:
+        with tab_slots["email"]:
             st.info("Your personalized email will appear here.")
     elif st.session_state.crew_result:
         update_tabs_with_content(st.session_state.crew_result, tabs)
+    
+    preload_pipeline()
+    # Warm the caches from process start, not from the first user's cold run
+    get_warmup_scheduler()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,213 @@
+import pysqlite3
+import sys
+sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+
+import os
+import csv
+import json
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Set
+
+from cache import ResearchCache
+from models import ResearchOutput
+from pipeline import run_research
+
+REQUIRED_COLUMNS = ("company", "industry", "role", "country")
+
+
+def row_key(row: Dict[str, str]) -> str:
+    """Identity of a batch row, used for checkpointing."""
+    return ResearchCache.make_key(row["company"], row["industry"], row["country"], row["role"])
+
+
+def read_rows(path: str) -> List[Dict[str, str]]:
+    """Read (company, industry, role, country) rows from a CSV or JSONL file."""
+    try:
+        if path.endswith(".jsonl"):
+            with open(path, "r", encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                rows = list(csv.DictReader(f))
+    except Exception as e:
+        raise Exception(f"Error reading batch input: {str(e)}")
+
+    normalized = []
+    for line_no, row in enumerate(rows, start=1):
+        # Accept the app's "pitching_role" naming as well
+        if "role" not in row and "pitching_role" in row:
+            row["role"] = row["pitching_role"]
+        missing = [col for col in REQUIRED_COLUMNS if not str(row.get(col) or "").strip()]
+        if missing:
+            raise ValueError(f"Row {line_no} of {path} is missing {', '.join(missing)}")
+        normalized.append({col: str(row[col]).strip() for col in REQUIRED_COLUMNS})
+    return normalized
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """
+    Collect the keys already written to the output file. A partially written last
+    line (e.g. after a crash) is ignored so that row is simply researched again.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                done.add(row_key(record))
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+    return done
+
+
+def truncate_partial_line(path: str, chunk_size: int = 65536) -> None:
+    """Cut a file back to its last newline, dropping a line left half-written by a crash."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - chunk_size)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b"\n")
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position != end:
+            f.truncate(position)
+
+
+class JsonlWriter:
+    """
+    Thread-safe, append-only JSONL writer that flushes every record to disk.
+    A partial last line left by a crash is dropped on open, so new records
+    start on a line of their own.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        truncate_partial_line(path)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record: Dict) -> None:
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def research_row(
+    row: Dict[str, str],
+    anthropic_api_key: str,
+    serper_api_key: str,
+    cache: ResearchCache
+) -> ResearchOutput:
+    research = cache.get(row["company"], row["industry"], row["country"], row["role"])
+    if research is None:
+        research = run_research(
+            anthropic_api_key=anthropic_api_key,
+            serper_api_key=serper_api_key,
+            company=row["company"],
+            industry=row["industry"],
+            country=row["country"],
+            pitching_role=row["role"]
+        )
+        cache.set(row["company"], row["industry"], row["country"], row["role"], research)
+    return research
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    anthropic_api_key: str,
+    serper_api_key: str,
+    concurrency: int = 4
+) -> Dict[str, int]:
+    """
+    Research every row of input_path with at most `concurrency` rows in flight,
+    appending one validated record per row to output_path as it completes.
+    Rows already present in output_path are skipped, so a crashed run resumes
+    where it stopped. Failed rows go to <output>.errors.jsonl and are retried
+    on the next run.
+    """
+    rows = read_rows(input_path)
+    done = load_checkpoint(output_path)
+
+    # De-duplicate within the input and against the checkpoint
+    todo: Dict[str, Dict[str, str]] = {}
+    for row in rows:
+        key = row_key(row)
+        if key not in done:
+            todo.setdefault(key, row)
+
+    stats = {"total": len(rows), "skipped": len(rows) - len(todo), "succeeded": 0, "failed": 0}
+    if not todo:
+        return stats
+
+    cache = ResearchCache()
+    results = JsonlWriter(output_path)
+    errors = JsonlWriter(output_path + ".errors.jsonl")
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = {
+                pool.submit(research_row, row, anthropic_api_key, serper_api_key, cache): row
+                for row in todo.values()
+            }
+            for future in as_completed(futures):
+                row = futures[future]
+                try:
+                    research = future.result()
+                    results.write({**row, "research": research.model_dump(mode="json")})
+                    stats["succeeded"] += 1
+                    print(f"[ok] {row['company']} ({row['role']}, {row['country']})", file=sys.stderr)
+                except Exception as e:
+                    errors.write({**row, "error": str(e)})
+                    stats["failed"] += 1
+                    print(f"[failed] {row['company']}: {str(e)}", file=sys.stderr)
+    finally:
+        results.close()
+        errors.close()
+    return stats
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Research many target companies and stream results as JSONL."
+    )
+    parser.add_argument("input", help="CSV or JSONL file with company, industry, role and country")
+    parser.add_argument("-o", "--output", default="research_results.jsonl",
+                        help="JSONL output file, also used as the resume checkpoint")
+    parser.add_argument("-c", "--concurrency", type=int, default=4,
+                        help="Maximum number of companies researched at once")
+    args = parser.parse_args(argv)
+
+    anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
+    serper_api_key = os.getenv("SERPER_API_KEY")
+    if not anthropic_api_key or not serper_api_key:
+        print("Missing required API keys in environment variables", file=sys.stderr)
+        return 2
+
+    try:
+        stats = run_batch(
+            args.input, args.output, anthropic_api_key, serper_api_key, args.concurrency
+        )
+    except Exception as e:
+        print(f"Error in batch run: {str(e)}", file=sys.stderr)
+        return 1
+
+    print(json.dumps(stats), file=sys.stderr)
+    return 0 if stats["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,418 @@
+import pysqlite3
+import sys
+sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+
+import os
+import json
+import atexit
+import time
+import argparse
+import resource
+import tempfile
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Keep benchmark runs away from the app's caches and trace, unless told otherwise.
+# Set before the imports below, which read these paths; removed on exit
+if not all(os.getenv(name) for name in ("CREW_CACHE_PATH", "CREW_SEARCH_CACHE_PATH", "CREW_TRACE_PATH")):
+    _scratch = tempfile.TemporaryDirectory(prefix="crew-bench-")
+    atexit.register(_scratch.cleanup)
+    os.environ.setdefault("CREW_CACHE_PATH", os.path.join(_scratch.name, "cache.db"))
+    os.environ.setdefault("CREW_SEARCH_CACHE_PATH", os.environ["CREW_CACHE_PATH"])
+    os.environ.setdefault("CREW_TRACE_PATH", os.path.join(_scratch.name, "trace.jsonl"))
+# crewai's per-step console output would dominate the measurement
+os.environ.setdefault("CREW_VERBOSE", "0")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from contextlib import nullcontext
+from crew_company_search import initialize_crew, parse_research_output, set_backends
+from pipeline import run_pipeline, PipelineResult
+from metrics import RunTrace
+from models import ResearchOutput
+from resume_store import get_resume_store
+from stubs import StubLLM, StubSerperDevTool, LatencyModel
+from cassette import Cassette, install_replay
+from resilience import ResiliencePolicy, set_policy
+from ratelimit import RateLimit, RateLimiter, set_rate_limiter
+from routing import ModelRouter, routes_from_env, set_router
+from promptcache import LocalPromptCache, get_local_prompt_cache, set_local_prompt_cache
+
+SCENARIOS = ("hierarchical", "dag")
+BENCH_RESUME = """Alex Martin - Senior Software Engineer
+Experience: 8 years building distributed systems and developer platforms.
+Skills: Python, Go, Kubernetes, PostgreSQL, team leadership."""
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def install_stubs(llm_latency: str, serper_latency: str, seed: int) -> None:
+    """Route every LLM and Serper call through the deterministic offline stand-ins."""
+    llm_model = LatencyModel(llm_latency, seed=seed)
+    serper_model = LatencyModel(serper_latency, seed=seed + 1)
+    set_backends(
+        llm_factory=lambda **kwargs: StubLLM(model=kwargs.get("model"), latency=llm_model),
+        search_tool_factory=lambda **kwargs: StubSerperDevTool(latency=serper_model, **kwargs)
+    )
+
+
+def load_renderers() -> Dict[str, Callable[[Any], None]]:
+    """
+    The app's parse and render functions. Outside `streamlit run` they execute
+    in bare mode: elements are built but not sent anywhere.
+    """
+    from streamlit import logger
+    # Bare mode warns about the missing script context on every element. Loading
+    # the app applies Streamlit's configured log level, so set it on both sides.
+    logger.set_log_level("error")
+    import app
+    logger.set_log_level("error")
+    return {
+        "parse_contacts": app.parse_contacts,
+        "research": app.render_research,
+        "contacts": app.render_contacts,
+        "email": app.render_email
+    }
+
+
+def bench_inputs(index: int, warm: bool) -> Dict[str, str]:
+    # Cold runs use a distinct industry per run so no section or search is shared
+    return {
+        "company": f"Benchmark Corp {index}",
+        "industry": "Software" if warm else f"Software {index}",
+        "pitching_role": "Senior Software Engineer",
+        "country": "France",
+        "outreach_purpose": "job opportunities"
+    }
+
+
+def run_hierarchical(inputs: Dict[str, str], resume_key: str, run_id: str) -> PipelineResult:
+    """The original manager-led crew: initialize_crew then kickoff, traced like run_pipeline."""
+    trace = RunTrace(run_id=run_id)
+    with trace.activate():
+        crew = initialize_crew(
+            anthropic_api_key="bench",
+            serper_api_key="bench",
+            company=inputs["company"],
+            industry=inputs["industry"],
+            pitching_role=inputs["pitching_role"],
+            country=inputs["country"],
+            outreach_purpose=inputs["outreach_purpose"],
+            resume_key=resume_key
+        )
+        result = crew.kickoff(inputs=inputs)
+    research_raw, contacts, email = (
+        [output.raw for output in result.tasks_output] + [None, None, None]
+    )[:3]
+    return PipelineResult(
+        research_raw=research_raw,
+        contacts=contacts,
+        email=email,
+        mode="hierarchical",
+        metrics=trace.finish()
+    )
+
+
+def run_once(
+    scenario: str,
+    index: int,
+    warm: bool,
+    renderers: Dict[str, Callable[[Any], None]],
+    cassette: Optional[Cassette] = None,
+    sla_seconds: float = 0.0
+) -> Dict[str, Any]:
+    """One end-to-end run: orchestration, then parsing, then rendering, each timed."""
+    inputs = bench_inputs(index, warm)
+    resume_key = get_resume_store().put(f"bench-{index}", BENCH_RESUME)
+    try:
+        started = time.perf_counter()
+        # Each run replays the cassette from its start
+        with cassette.replay_scope() if cassette else nullcontext():
+            if scenario == "hierarchical" and not sla_seconds:
+                result = run_hierarchical(inputs, resume_key, run_id=f"bench-{scenario}-{index}")
+            else:
+                # Under an SLA the hierarchical crew runs with run_pipeline's budgets and fallbacks
+                result = run_pipeline(
+                    "bench", "bench", inputs, mode=scenario, resume_key=resume_key, sla_seconds=sla_seconds
+                )
+        orchestrated = time.perf_counter()
+
+        research = result.research
+        # Research cut short by the SLA may lack sections; it is rendered from its JSON
+        if research is None and not result.is_degraded("research"):
+            research = ResearchOutput(**parse_research_output(result.research_raw))
+        contacts = renderers["parse_contacts"](result.contacts or "")
+        parsed = time.perf_counter()
+
+        renderers["research"](research or result.research_raw)
+        renderers["contacts"](result.contacts)
+        renderers["email"](result.email)
+        rendered = time.perf_counter()
+    finally:
+        get_resume_store().discard(resume_key)
+
+    total = result.metrics.total()
+    return {
+        "latency": rendered - started,
+        "orchestration": orchestrated - started,
+        "parse": parsed - orchestrated,
+        "render": rendered - parsed,
+        "contacts_found": len(contacts),
+        "llm_calls": total.llm_calls,
+        "serper_calls": total.serper_calls,
+        "hedges": total.hedges,
+        "queue_time": total.queue_time,
+        "escalations": total.escalations,
+        "degraded": 1 if result.degraded else 0,
+        "input_tokens": total.input_tokens,
+        "cached_input_tokens": total.cached_input_tokens,
+        "output_tokens": total.output_tokens
+    }
+
+
+def run_scenario(
+    scenario: str,
+    runs: int,
+    concurrency: int,
+    warm: bool,
+    renderers: Dict[str, Callable[[Any], None]],
+    cassette: Optional[Cassette] = None,
+    sla_seconds: float = 0.0
+) -> Dict[str, Any]:
+    """Run a scenario `runs` times with `concurrency` runs in flight and summarize."""
+    # Each scenario starts with a cold prompt cache, as its own deployment would
+    set_local_prompt_cache(LocalPromptCache())
+    started = time.perf_counter()
+    errors: List[str] = []
+    samples: List[Dict[str, Any]] = []
+
+    def attempt(index: int) -> None:
+        try:
+            samples.append(run_once(scenario, index, warm, renderers, cassette, sla_seconds))
+        except Exception as e:
+            errors.append(str(e))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(attempt, range(runs)))
+    wall = time.perf_counter() - started
+
+    def column(name: str) -> List[float]:
+        return [sample[name] for sample in samples]
+
+    latencies = column("latency")
+    prompt_cache = get_local_prompt_cache()
+    return {
+        "scenario": scenario,
+        "runs": runs,
+        "succeeded": len(samples),
+        "errors": errors[:5],
+        "concurrency": concurrency,
+        "wall_time": wall,
+        "throughput_per_min": len(samples) / wall * 60 if wall else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "max": max(latencies, default=0.0),
+        "orchestration_p50": percentile(column("orchestration"), 50),
+        "parse_p50": percentile(column("parse"), 50),
+        "render_p50": percentile(column("render"), 50),
+        "llm_calls_per_run": sum(column("llm_calls")) / len(samples) if samples else 0.0,
+        "serper_calls_per_run": sum(column("serper_calls")) / len(samples) if samples else 0.0,
+        "hedges_per_run": sum(column("hedges")) / len(samples) if samples else 0.0,
+        "queue_time_p50": percentile(column("queue_time"), 50),
+        "degraded_share": sum(column("degraded")) / len(samples) if samples else 0.0,
+        "escalations_per_run": sum(column("escalations")) / len(samples) if samples else 0.0,
+        "tokens_per_run": (
+            sum(column("input_tokens")) + sum(column("output_tokens"))
+        ) / len(samples) if samples else 0.0,
+        "cached_input_share": (
+            sum(column("cached_input_tokens")) / sum(column("input_tokens"))
+        ) if sum(column("input_tokens")) else 0.0,
+        # Stub runs only: prompt bytes the local stand-in served from its cache, per task
+        "prompt_cache": {label: usage.model_dump() for label, usage in sorted(prompt_cache.usage().items())},
+        "cached_prefixes": [prefix.model_dump() for prefix in prompt_cache.prefixes()[:10]]
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def print_report(results: List[Dict[str, Any]], memory: Dict[str, float]) -> None:
+    header = (
+        f"{'scenario':<13}{'ok/runs':>9}{'conc':>6}{'runs/min':>10}{'p50 s':>9}{'p95 s':>9}"
+        f"{'max s':>9}{'orch p50':>10}{'parse ms':>10}{'render ms':>11}{'LLM/run':>9}{'search/run':>12}"
+        f"{'hedge/run':>11}{'queue p50':>11}{'degraded':>10}{'escal/run':>11}{'cached in':>11}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['scenario']:<13}{str(r['succeeded']) + '/' + str(r['runs']):>9}{r['concurrency']:>6}"
+            f"{r['throughput_per_min']:>10.1f}{r['p50']:>9.3f}{r['p95']:>9.3f}{r['max']:>9.3f}"
+            f"{r['orchestration_p50']:>10.3f}{r['parse_p50'] * 1000:>10.2f}{r['render_p50'] * 1000:>11.2f}"
+            f"{r['llm_calls_per_run']:>9.1f}{r['serper_calls_per_run']:>12.1f}"
+            f"{r['hedges_per_run']:>11.2f}{r['queue_time_p50']:>11.3f}{r['degraded_share']:>10.0%}"
+            f"{r['escalations_per_run']:>11.2f}{r['cached_input_share']:>11.0%}"
+        )
+        for error in r["errors"]:
+            print(f"  error: {error}")
+    print_prompt_cache(results)
+    print(f"\npeak RSS: {memory['peak_rss_mb']:.1f} MB", end="")
+    if memory.get("peak_traced_mb") is not None:
+        print(f", peak traced Python allocations: {memory['peak_traced_mb']:.1f} MB", end="")
+    print()
+
+
+def print_prompt_cache(results: List[Dict[str, Any]]) -> None:
+    """Prompt bytes each task reused from the local cache stand-in, and where reuse stops."""
+    for r in results:
+        if not r["prompt_cache"]:
+            continue
+        print(f"\nprompt cache, {r['scenario']}: bytes read / sent per task")
+        for label, usage in r["prompt_cache"].items():
+            sent = usage["prompt_bytes"]
+            print(f"  {label:<30}{usage['read_bytes']:>10,} / {sent:<10,}{usage['read_bytes'] / sent if sent else 0:>6.0%}")
+        for prefix in r["cached_prefixes"]:
+            if prefix["reads"]:
+                print(f"  {prefix['length']:>8,} bytes read {prefix['reads']}x ({prefix['label']}), ending {prefix['tail'][-40:]!r}")
+
+
+def compare_to_baseline(
+    results: List[Dict[str, Any]],
+    baseline_path: str,
+    tolerance: float
+) -> List[str]:
+    """Latency and throughput regressions beyond tolerance versus a saved report."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+
+    regressions = []
+    for r in results:
+        base = baseline.get(r["scenario"])
+        if not base:
+            continue
+        for metric in ("p50", "p95"):
+            if base[metric] and r[metric] > base[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{r['scenario']} {metric}: {r[metric]:.3f}s vs baseline {base[metric]:.3f}s"
+                )
+        if base["throughput_per_min"] and (
+            r["throughput_per_min"] < base["throughput_per_min"] * (1 - tolerance)
+        ):
+            regressions.append(
+                f"{r['scenario']} throughput: {r['throughput_per_min']:.1f}/min "
+                f"vs baseline {base['throughput_per_min']:.1f}/min"
+            )
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the pipeline offline against stub LLM and Serper backends "
+                    "or recorded traffic."
+    )
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default=None,
+                        help='Defaults to "all", or to the recorded mode with --cassette')
+    parser.add_argument("-n", "--runs", type=int, default=10, help="Runs per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=1, help="Runs in flight at once")
+    parser.add_argument("--llm-latency", default="uniform:0.05,0.15",
+                        help='LLM call latency, e.g. "0", "0.5", "uniform:0.2,1", "lognormal:0.8,0.4"')
+    parser.add_argument("--serper-latency", default="uniform:0.02,0.06",
+                        help="Serper request latency, same format as --llm-latency")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the latency distributions")
+    parser.add_argument("--warm", action="store_true",
+                        help="Share industry and country across runs so section and search caches hit")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="Also report peak traced Python allocations (slows runs down)")
+    parser.add_argument("--json", dest="json_path", help="Write the report as JSON to this file")
+    parser.add_argument("--baseline", help="JSON report to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression versus the baseline")
+    parser.add_argument("--cassette",
+                        help="Replay traffic recorded with cassette.py instead of the stubs")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="Multiple of the recorded latencies to wait when replaying a cassette")
+    parser.add_argument("--hedge", type=float, default=None, metavar="QUANTILE",
+                        help="Hedge LLM calls past this latency quantile, with no minimum delay; "
+                             "0 disables hedging. Defaults to the CREW_HEDGE_* settings")
+    parser.add_argument("--rate-limits", metavar="JSON",
+                        help='Rate limits per model or "serper", as in CREW_RATE_LIMITS, e.g. '
+                             '\'{"serper": {"requests_per_second": 2}}\'. By default nothing is limited')
+    parser.add_argument("--routes", metavar="JSON",
+                        help='Models per task, cheapest first, as in CREW_MODEL_ROUTES, e.g. '
+                             '\'{"research": ["anthropic/claude-3-sonnet-20240229"]}\' to compare against Sonnet only')
+    parser.add_argument("--sla", type=float, default=0.0, metavar="SECONDS",
+                        help="End-to-end time limit of each run, degrading steps that run out of time; "
+                             "hierarchical runs then go through run_pipeline. 0 leaves runs unbounded")
+    args = parser.parse_args(argv)
+
+    limits = json.loads(args.rate_limits) if args.rate_limits else {}
+    set_rate_limiter(RateLimiter(
+        limits={name: RateLimit.model_validate(limit) for name, limit in limits.items()}, path=""
+    ))
+
+    routes = routes_from_env()
+    routes.update(json.loads(args.routes) if args.routes else {})
+    set_router(ModelRouter(routes=routes, seed=args.seed))
+
+    if args.hedge is not None:
+        set_policy(ResiliencePolicy(hedge_quantile=args.hedge, hedge_min_delay=0.0, seed=args.seed))
+
+    cassette = None
+    if args.cassette:
+        # Benchmark inputs differ from the recorded ones, so requests fall back
+        # to the responses recorded for the same task and agent
+        cassette = Cassette.load(args.cassette)
+        install_replay(cassette, speed=args.replay_speed, strict=False)
+        args.scenario = args.scenario or cassette.header.get("mode") or "dag"
+    else:
+        install_stubs(args.llm_latency, args.serper_latency, args.seed)
+    renderers = load_renderers()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    scenario_arg = args.scenario or "all"
+    scenarios = SCENARIOS if scenario_arg == "all" else (scenario_arg,)
+    results = [
+        run_scenario(scenario, args.runs, args.concurrency, args.warm, renderers, cassette, args.sla)
+        for scenario in scenarios
+    ]
+    memory = {"peak_rss_mb": peak_rss_mb(), "peak_traced_mb": None}
+    if args.tracemalloc:
+        memory["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    print_report(results, memory)
+    report = {
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in ("json_path", "baseline")
+        },
+        "memory": memory,
+        "results": results
+    }
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0 if all(r["succeeded"] == r["runs"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
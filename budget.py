@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+from crew_company_search import (
+    get_llm, create_email_task, load_resume, group_research_sections,
+    merge_research_sections, RESEARCH_SECTIONS, INDUSTRY_SECTIONS, HAIKU_MODEL
+)
+from cache import get_research_cache, get_section_cache
+from metrics import current_trace
+from models import ResearchOutput
+from repair import draft_section
+from resilience import DeadlineExceeded, run_until
+
+# End-to-end time limit of a run in seconds; 0 leaves runs unbounded
+DEFAULT_SLA_SECONDS = float(os.getenv("CREW_SLA_SECONDS", 0))
+# When each step must be done by, as a share of the time limit from the start
+# of the run. Research and contacts run side by side; the "_fallback" shares
+# bound the Haiku drafts written for a step that ran out of time.
+STEP_DEADLINES = {
+    "research": 0.55,
+    "contacts": 0.55,
+    "research_fallback": 0.7,
+    "email": 0.85,
+    "email_fallback": 1.0
+}
+# Which agent a degraded step is recorded against in the run's trace
+STEP_AGENTS = {"research": "researcher", "contacts": "contact_finder", "email": "writer"}
+
+
+class RunBudget:
+    """Deadlines of the steps of one run, split from its end-to-end time limit."""
+
+    def __init__(self, sla_seconds: Optional[float] = DEFAULT_SLA_SECONDS):
+        self.sla_seconds = sla_seconds or None
+        self.started = time.monotonic()
+
+    def deadline(self, step: str) -> Optional[float]:
+        """Monotonic time step must be done by; None when runs are unbounded."""
+        if self.sla_seconds is None:
+            return None
+        return self.started + STEP_DEADLINES[step] * self.sla_seconds
+
+    def out_of_time(self, step: str, error: BaseException) -> bool:
+        """Whether error means step ran out of its budget, as opposed to failing."""
+        deadline = self.deadline(step)
+        return deadline is not None and (
+            isinstance(error, DeadlineExceeded) or time.monotonic() >= deadline
+        )
+
+
+def format_age(seconds: float) -> str:
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} minutes old"
+    if seconds < 2 * 86400:
+        return f"{seconds / 3600:.0f} hours old"
+    return f"{seconds / 86400:.0f} days old"
+
+
+def record_degraded(degraded: Dict[str, str], step: str, fallback: str) -> None:
+    """Note how a step or research section was served, in the result and the run's trace."""
+    degraded[step] = fallback
+    trace = current_trace()
+    if trace:
+        trace.record("degraded", STEP_AGENTS.get(step.split(":")[0], "unknown"), step, fallback=fallback)
+
+
+def fallback_research(
+    anthropic_api_key: str,
+    researcher: Any,
+    completed: Dict[str, BaseModel],
+    company: str,
+    industry: str,
+    country: str,
+    pitching_role: str,
+    deadline: Optional[float],
+    degraded: Dict[str, str]
+) -> Tuple[Optional[ResearchOutput], str]:
+    """
+    Fill the sections research did not finish in time: from the freshest
+    cached research for the target, else from cached industry sections,
+    else with Haiku drafts written until deadline. Returns the research, or
+    None while sections are still missing, and its JSON either way.
+    """
+    sections = dict(completed)
+    stale = get_research_cache().get_stale(company, industry, country, pitching_role)
+    for section, (parent, model, _) in RESEARCH_SECTIONS.items():
+        if section in sections:
+            continue
+        cached = None
+        if stale is not None:
+            cached = getattr(getattr(stale[0], parent), section), stale[1]
+        elif section in INDUSTRY_SECTIONS:
+            cached = get_section_cache().get_stale(section, industry, country, model)
+        if cached is not None:
+            sections[section] = cached[0]
+            record_degraded(degraded, f"research:{section}", f"cached research, {format_age(cached[1])}")
+
+    missing = [section for section in RESEARCH_SECTIONS if section not in sections]
+    if missing:
+        llm = get_llm(anthropic_api_key, HAIKU_MODEL)
+        context = {
+            "company": company, "industry": industry, "country": country, "pitching_role": pitching_role
+        }
+        drafts: Dict[str, BaseModel] = {}
+
+        def draft(section: str) -> None:
+            drafts[section] = draft_section(section, llm, researcher, context)
+
+        def draft_all() -> None:
+            with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+                for future in [pool.submit(contextvars.copy_context().run, draft, s) for s in missing]:
+                    future.exception()
+
+        try:
+            run_until(draft_all, deadline)
+        except DeadlineExceeded:
+            pass
+        # Drafts that did finish in time are used either way
+        for section in missing:
+            if section in drafts:
+                sections[section] = drafts[section]
+                record_degraded(degraded, f"research:{section}", "quick Haiku draft, not researched")
+            else:
+                record_degraded(degraded, f"research:{section}", "left out, research ran out of time")
+
+    if len(sections) == len(RESEARCH_SECTIONS):
+        research = merge_research_sections(sections)
+        return research, research.model_dump_json()
+    return None, json.dumps(group_research_sections(sections))
+
+
+def draft_email(
+    anthropic_api_key: str,
+    writer: Any,
+    company: str,
+    country: str,
+    research: Optional[ResearchOutput],
+    research_raw: Optional[str],
+    contacts: Optional[str],
+    resume_key: Optional[str],
+    deadline: Optional[float]
+) -> Optional[str]:
+    """
+    A Haiku draft of the outreach email in a single call, from the same brief
+    the writer gets with the resume inlined. None if it is not done by deadline.
+    """
+    task = create_email_task(writer, company, country, research_output=research, contacts_output=contacts)
+    prompt = f"{task.description}\n\n{task.request_context}"
+    if research is None and research_raw:
+        prompt += f"\n\nCompany and industry research:\n{research_raw}"
+    if resume_key:
+        prompt += f"\n\nCandidate's resume:\n{load_resume(resume_key)}"
+    prompt += f"\n\nReply with {task.expected_output[0].lower()}{task.expected_output[1:]}"
+    llm = get_llm(anthropic_api_key, HAIKU_MODEL)
+    try:
+        return run_until(
+            lambda: llm.call([{"role": "user", "content": prompt}], from_agent=writer),
+            deadline
+        )
+    except DeadlineExceeded:
+        return None
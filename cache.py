@@ -0,0 +1,328 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from models import ResearchOutput
+
+DEFAULT_CACHE_PATH = os.getenv("CREW_CACHE_PATH", "crew_cache.db")
+DEFAULT_RESEARCH_TTL = 7 * 24 * 3600
+DEFAULT_RESEARCH_MAX_ENTRIES = 500
+DEFAULT_SECTION_TTL = 14 * 24 * 3600
+DEFAULT_SECTION_MAX_ENTRIES = 2000
+# Expired entries are kept this much longer as a last resort when a run runs out of time
+DEFAULT_STALE_SECONDS = 30 * 24 * 3600
+
+
+def normalize_key_part(value: str) -> str:
+    """Normalize a key component so trivial spelling differences share an entry."""
+    return " ".join((value or "").lower().split())
+
+
+class SQLiteCache:
+    """
+    Small key/value store on SQLite with TTL expiry and size-bounded LRU eviction.
+    Entries are evicted by last access time once max_entries is exceeded.
+    Expired entries are kept for stale_seconds more, readable only through
+    get_stale.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_RESEARCH_TTL,
+        max_entries: int = DEFAULT_RESEARCH_MAX_ENTRIES,
+        stale_seconds: float = 0.0
+    ):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table}")
+        self.table = table
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stale_seconds = stale_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None if it is missing or expired."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                if now - created_at > self.ttl_seconds + self.stale_seconds:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store a value, then drop expired rows and evict least recently used ones."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"""INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at)
+                    VALUES (?, ?, ?, ?)""",
+                (key, value, now, now)
+            )
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created_at < ?",
+                (now - self.ttl_seconds - self.stale_seconds,)
+            )
+            self._conn.execute(
+                f"""DELETE FROM {self.table} WHERE key IN (
+                        SELECT key FROM {self.table}
+                        ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )""",
+                (self.max_entries,)
+            )
+
+    def get_stale(self, key: str) -> Optional[Tuple[str, float]]:
+        """The value and its age in seconds, even if expired, unless it is past its stale period."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        age = time.time() - row[1]
+        return (row[0], age) if age <= self.ttl_seconds + self.stale_seconds else None
+
+    def age(self, key: str) -> Optional[float]:
+        """Seconds since the entry was written, or None if it is missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        age = time.time() - row[0]
+        return age if age <= self.ttl_seconds else None
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class ResearchCache:
+    """Persistent cache of validated ResearchOutput keyed on (company, industry, country, role)."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_RESEARCH_TTL,
+        max_entries: int = DEFAULT_RESEARCH_MAX_ENTRIES,
+        stale_seconds: float = DEFAULT_STALE_SECONDS
+    ):
+        self._store = SQLiteCache("research", path, ttl_seconds, max_entries, stale_seconds)
+
+    @staticmethod
+    def make_key(company: str, industry: str, country: str, pitching_role: str) -> str:
+        return "|".join(
+            normalize_key_part(part) for part in (company, industry, country, pitching_role)
+        )
+
+    def get(
+        self, company: str, industry: str, country: str, pitching_role: str
+    ) -> Optional[ResearchOutput]:
+        key = self.make_key(company, industry, country, pitching_role)
+        value = self._store.get(key)
+        if value is None:
+            return None
+        try:
+            return ResearchOutput.model_validate_json(value)
+        except Exception:
+            # Stale schema or corrupted row - treat as a miss
+            self._store.delete(key)
+            return None
+
+    def set(
+        self,
+        company: str,
+        industry: str,
+        country: str,
+        pitching_role: str,
+        research: ResearchOutput
+    ) -> None:
+        key = self.make_key(company, industry, country, pitching_role)
+        self._store.set(key, research.model_dump_json())
+
+    def get_stale(
+        self, company: str, industry: str, country: str, pitching_role: str
+    ) -> Optional[Tuple[ResearchOutput, float]]:
+        """The cached research and its age in seconds, even if it has expired."""
+        entry = self._store.get_stale(self.make_key(company, industry, country, pitching_role))
+        if entry is None:
+            return None
+        try:
+            return ResearchOutput.model_validate_json(entry[0]), entry[1]
+        except Exception:
+            return None
+
+    def age(self, company: str, industry: str, country: str, pitching_role: str) -> Optional[float]:
+        return self._store.age(self.make_key(company, industry, country, pitching_role))
+
+    @property
+    def ttl_seconds(self) -> float:
+        return self._store.ttl_seconds
+
+    def clear(self) -> None:
+        self._store.clear()
+
+
+class SectionCache:
+    """
+    Persistent cache of research sections that depend on (industry, country)
+    rather than on the company, so they can be shared across companies.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_SECTION_TTL,
+        max_entries: int = DEFAULT_SECTION_MAX_ENTRIES,
+        stale_seconds: float = DEFAULT_STALE_SECONDS
+    ):
+        self._store = SQLiteCache("sections", path, ttl_seconds, max_entries, stale_seconds)
+
+    @staticmethod
+    def make_key(section: str, industry: str, country: str) -> str:
+        return "|".join([section, normalize_key_part(industry), normalize_key_part(country)])
+
+    def get(
+        self, section: str, industry: str, country: str, model: Type[BaseModel]
+    ) -> Optional[BaseModel]:
+        key = self.make_key(section, industry, country)
+        value = self._store.get(key)
+        if value is None:
+            return None
+        try:
+            return model.model_validate_json(value)
+        except Exception:
+            self._store.delete(key)
+            return None
+
+    def set(self, section: str, industry: str, country: str, value: BaseModel) -> None:
+        self._store.set(self.make_key(section, industry, country), value.model_dump_json())
+
+    def get_stale(
+        self, section: str, industry: str, country: str, model: Type[BaseModel]
+    ) -> Optional[Tuple[BaseModel, float]]:
+        """The cached section and its age in seconds, even if it has expired."""
+        entry = self._store.get_stale(self.make_key(section, industry, country))
+        if entry is None:
+            return None
+        try:
+            return model.model_validate_json(entry[0]), entry[1]
+        except Exception:
+            return None
+
+    def age(self, section: str, industry: str, country: str) -> Optional[float]:
+        return self._store.age(self.make_key(section, industry, country))
+
+    @property
+    def ttl_seconds(self) -> float:
+        return self._store.ttl_seconds
+
+    def clear(self) -> None:
+        self._store.clear()
+
+
+_research_cache: Optional[ResearchCache] = None
+_section_cache: Optional[SectionCache] = None
+_shared_caches_lock = threading.Lock()
+
+
+def get_research_cache() -> ResearchCache:
+    """Process-wide research cache, for fallbacks inside the pipeline."""
+    global _research_cache
+    with _shared_caches_lock:
+        if _research_cache is None:
+            _research_cache = ResearchCache()
+        return _research_cache
+
+
+def get_section_cache() -> SectionCache:
+    """Process-wide industry/country section cache."""
+    global _section_cache
+    with _shared_caches_lock:
+        if _section_cache is None:
+            _section_cache = SectionCache()
+        return _section_cache
+
+
+class RequestLog:
+    """Counts research requests per (company, industry, country, role) to find popular targets."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS research_requests (
+                    key TEXT PRIMARY KEY,
+                    company TEXT NOT NULL,
+                    industry TEXT NOT NULL,
+                    country TEXT NOT NULL,
+                    pitching_role TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    last_requested REAL NOT NULL
+                )
+            """)
+
+    def record(self, company: str, industry: str, country: str, pitching_role: str) -> None:
+        key = ResearchCache.make_key(company, industry, country, pitching_role)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO research_requests
+                       (key, company, industry, country, pitching_role, count, last_requested)
+                   VALUES (?, ?, ?, ?, ?, 1, ?)
+                   ON CONFLICT(key) DO UPDATE SET
+                       count = count + 1, last_requested = excluded.last_requested""",
+                (key, company, industry, country, pitching_role, time.time())
+            )
+
+    def top(self, limit: int, since_seconds: Optional[float] = None) -> List[Tuple[str, str, str, str]]:
+        """Most requested (company, industry, country, role) targets, most popular first."""
+        since = time.time() - since_seconds if since_seconds else 0
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT company, industry, country, pitching_role FROM research_requests
+                   WHERE last_requested >= ?
+                   ORDER BY count DESC, last_requested DESC LIMIT ?""",
+                (since, limit)
+            ).fetchall()
+        return [tuple(row) for row in rows]
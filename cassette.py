@@ -0,0 +1,569 @@
+import pysqlite3
+import sys
+sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+
+import os
+import json
+import gzip
+import time
+import argparse
+import hashlib
+import tempfile
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
+
+if __name__ == "__main__":
+    # Fresh caches, so the run makes (or replays) every call instead of reusing earlier results
+    _scratch = tempfile.mkdtemp(prefix="crew-cassette-")
+    os.environ["CREW_CACHE_PATH"] = os.path.join(_scratch, "cache.db")
+    os.environ["CREW_SEARCH_CACHE_PATH"] = os.environ["CREW_CACHE_PATH"]
+    os.environ.setdefault("CREW_TRACE_PATH", "")
+
+from pydantic import BaseModel, PrivateAttr
+from crewai import LLM, BaseLLM
+from crewai.llms.base_llm import llm_call_context
+from crewai.events.types.llm_events import LLMCallType
+
+from llmwrap import wrap_llm, bind_call
+from tools import CachedSerperDevTool
+
+CASSETTE_VERSION = 1
+# The app records every generation's traffic to this directory; unset disables recording
+DEFAULT_RECORD_DIR = os.getenv("CREW_RECORD_DIR", "")
+# Written in place of the resume by recorders that redact it; replays use it as the resume
+REDACTED_RESUME = "[resume redacted]"
+
+_recording: contextvars.ContextVar[Optional["Cassette"]] = contextvars.ContextVar(
+    "crew_cassette_recording", default=None
+)
+_replay_cursors: contextvars.ContextVar[Optional[Dict[Tuple, int]]] = contextvars.ContextVar(
+    "crew_cassette_cursors", default=None
+)
+
+
+class CassetteMiss(Exception):
+    """Raised on replay when the cassette holds no response for a request."""
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def llm_request_key(
+    model: str,
+    messages: Any,
+    tools: Optional[List[dict]] = None,
+    response_model: Optional[Any] = None
+) -> str:
+    """Key of an LLM request: the model, the full conversation and what the reply must be."""
+    return _digest({
+        "model": model,
+        "messages": messages,
+        "tools": sorted(str(tool.get("name", tool)) for tool in tools or []),
+        "response_model": getattr(response_model, "__name__", None)
+    })
+
+
+def search_request_key(tool: CachedSerperDevTool, kwargs: Dict[str, Any]) -> str:
+    """Key of a search: the same normalized key the search cache uses."""
+    return _digest(tool.cache_key(**kwargs))
+
+
+def redact(value: Any, redactions: Dict[str, str]) -> Any:
+    """value with every occurrence of each redactions key in its strings replaced by its value."""
+    if isinstance(value, str):
+        for secret, placeholder in redactions.items():
+            value = value.replace(secret, placeholder)
+        return value
+    if isinstance(value, list):
+        return [redact(item, redactions) for item in value]
+    if isinstance(value, dict):
+        return {key: redact(item, redactions) for key, item in value.items()}
+    return value
+
+
+def _dump_response(response: Any) -> Dict[str, Any]:
+    # Native tool calling returns the provider's tool_use blocks instead of text
+    if isinstance(response, str):
+        return {"text": response}
+    if isinstance(response, BaseModel):
+        return {"structured": response.model_dump(mode="json")}
+    if isinstance(response, list):
+        return {"blocks": [
+            block.model_dump(mode="json") if isinstance(block, BaseModel) else block
+            for block in response
+        ]}
+    return {"text": str(response)}
+
+
+def _load_response(data: Dict[str, Any], response_model: Optional[Any] = None) -> Any:
+    if "structured" in data:
+        if response_model is not None:
+            return response_model.model_validate(data["structured"])
+        return data["structured"]
+    if "blocks" in data:
+        blocks = []
+        for block in data["blocks"]:
+            if isinstance(block, dict) and block.get("type") == "tool_use":
+                try:
+                    from anthropic.types import ToolUseBlock
+                    block = ToolUseBlock.model_validate(block)
+                except Exception:
+                    pass
+            blocks.append(block)
+        return blocks
+    return data.get("text", "")
+
+
+class Cassette:
+    """
+    Recorded LLM and Serper traffic of one or more runs, stored as
+    gzip-compressed JSONL: a header with the run's inputs and the models'
+    capabilities, then one line per request with its response or error and
+    latency. Replay looks requests up by a hash of their content; identical
+    requests are served in recorded order, tracked per replay scope so
+    concurrent replays of the same cassette do not interfere.
+    Cassettes hold full prompts, resume included unless it is redacted, so
+    keep them as private as the resume itself.
+    """
+
+    def __init__(
+        self,
+        header: Optional[Dict[str, Any]] = None,
+        entries: Optional[List[Dict[str, Any]]] = None
+    ):
+        self.header: Dict[str, Any] = header or {}
+        self.header.setdefault("version", CASSETTE_VERSION)
+        self.header.setdefault("created_at", time.time())
+        self.header.setdefault("models", {})
+        # Text replaced in everything recorded from now on, e.g. the resume
+        self.redactions: Dict[str, str] = {}
+        self.entries: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._by_key: Dict[Tuple, List[Dict[str, Any]]] = {}
+        self._by_step: Dict[Tuple, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[Tuple, int] = {}
+        for entry in entries or []:
+            self.add(entry)
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        if self.redactions:
+            entry = redact(entry, self.redactions)
+        with self._lock:
+            self.entries.append(entry)
+            self._by_key.setdefault((entry["kind"], entry["key"]), []).append(entry)
+            step = (entry["kind"], entry.get("task") or "", entry.get("agent") or "")
+            self._by_step.setdefault(step, []).append(entry)
+
+    def first_models(self) -> Dict[str, str]:
+        """The model of the first LLM call recorded for each route, see routing.route_key."""
+        from metrics import agent_key
+        from routing import route_key
+        models: Dict[str, str] = {}
+        for entry in self.entries:
+            if entry["kind"] == "llm" and entry.get("model"):
+                route = route_key(entry.get("task") or "", agent_key(entry.get("agent")))
+                models.setdefault(route, entry["model"])
+        return models
+
+    def note_model(self, llm: BaseLLM) -> None:
+        """Remember what the recorded model supports, so its replay behaves the same."""
+        if llm.model in self.header["models"]:
+            return
+        capabilities = {
+            "supports_function_calling": llm.supports_function_calling(),
+            "supports_stop_words": llm.supports_stop_words(),
+            "context_window": llm.get_context_window_size()
+        }
+        with self._lock:
+            self.header["models"][llm.model] = capabilities
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                if header.get("version") != CASSETTE_VERSION:
+                    raise ValueError(f"unsupported cassette version {header.get('version')}")
+                return cls(header, [json.loads(line) for line in f if line.strip()])
+        except Exception as e:
+            raise Exception(f"Error loading cassette {path}: {str(e)}")
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            lines = [self.header] + list(self.entries)
+        with gzip.open(path, "wt", encoding="utf-8", compresslevel=9) as f:
+            for line in lines:
+                f.write(json.dumps(line, separators=(",", ":"), default=str) + "\n")
+
+    @contextmanager
+    def record(self):
+        """Record the traffic of recording backends called in this context."""
+        token = _recording.set(self)
+        try:
+            yield self
+        finally:
+            _recording.reset(token)
+
+    @contextmanager
+    def replay_scope(self):
+        """Replay from the start of the cassette, independently of other scopes."""
+        token = _replay_cursors.set({})
+        try:
+            yield self
+        finally:
+            _replay_cursors.reset(token)
+
+    def take(self, kind: str, key: str, task: str = "", agent: str = "", strict: bool = True) -> Dict[str, Any]:
+        """
+        The next recorded response for a request. Unless strict, a request that
+        was never recorded gets the next response recorded for the same task
+        and agent, e.g. when replaying a run against different inputs.
+        """
+        cursors = _replay_cursors.get()
+        with self._lock:
+            if cursors is None:
+                cursors = self._cursors
+            slot = (kind, key)
+            candidates = self._by_key.get(slot)
+            if not candidates and not strict:
+                slot = (kind, task or "", agent or "")
+                candidates = self._by_step.get(slot)
+            if not candidates:
+                raise CassetteMiss(
+                    f"No recorded {kind} response for task '{task or 'unknown'}' "
+                    f"({agent or 'unknown'}), request {key[:12]}"
+                )
+            index = cursors.get(slot, 0)
+            cursors[slot] = index + 1
+        # Requests repeated more often than recorded get the last response again
+        return candidates[min(index, len(candidates) - 1)]
+
+
+def _step_names(from_task: Any, from_agent: Any) -> Tuple[str, str]:
+    return getattr(from_task, "name", None) or "", getattr(from_agent, "role", None) or ""
+
+
+class _RecordingLLMMixin:
+    """Records each call made while a cassette is recording, then answers as usual."""
+
+    def call(self, *args: Any, **kwargs: Any) -> Any:
+        cassette = _recording.get()
+        if cassette is None:
+            return super().call(*args, **kwargs)
+
+        cassette.note_model(self)
+        arguments = bind_call(self, args, kwargs).arguments
+        # Keyed on the redacted request too, as a replay with the placeholder resume sends it
+        messages = redact(arguments.get("messages"), cassette.redactions)
+        tools = arguments.get("tools")
+        task, agent = _step_names(arguments.get("from_task"), arguments.get("from_agent"))
+        entry = {
+            "kind": "llm",
+            "key": llm_request_key(self.model, messages, tools, arguments.get("response_model")),
+            "task": task,
+            "agent": agent,
+            "model": self.model,
+            "request": {"messages": messages, "tools": tools}
+        }
+        started = time.time()
+        try:
+            response = super().call(*args, **kwargs)
+        except Exception as e:
+            cassette.add({**entry, "error": str(e), "latency": time.time() - started})
+            raise
+        cassette.add({**entry, "response": _dump_response(response), "latency": time.time() - started})
+        return response
+
+
+def recording_llm(llm: BaseLLM) -> BaseLLM:
+    """Make an LLM record its traffic, keeping its provider-specific behaviour."""
+    return wrap_llm(llm, _RecordingLLMMixin)
+
+
+class RecordingSerperDevTool(CachedSerperDevTool):
+    """Cached search tool that records every search made while a cassette is recording."""
+
+    def _run(self, **kwargs: Any) -> Any:
+        cassette = _recording.get()
+        if cassette is None:
+            return super()._run(**kwargs)
+        entry = {"kind": "search", "key": search_request_key(self, kwargs), "request": kwargs}
+        started = time.time()
+        try:
+            response = super()._run(**kwargs)
+        except Exception as e:
+            cassette.add({**entry, "error": str(e), "latency": time.time() - started})
+            raise
+        cassette.add({**entry, "response": response, "latency": time.time() - started})
+        return response
+
+
+class ReplayLLM(BaseLLM):
+    """
+    Serves LLM responses from a cassette without any network access. Calls
+    wait for the recorded latency times speed and emit crewai's LLM events,
+    with token usage estimated from the text as the recording keeps none.
+    """
+
+    # A hedged duplicate would consume the recorded answer of the next call
+    allow_hedging: ClassVar[bool] = False
+    # Replays reach no provider, so there is no quota to respect
+    rate_limited: ClassVar[bool] = False
+
+    _cassette: Optional[Cassette] = PrivateAttr(default=None)
+    _speed: float = PrivateAttr(default=0.0)
+    _strict: bool = PrivateAttr(default=True)
+
+    def __init__(self, cassette: Cassette, speed: float = 0.0, strict: bool = True, **data: Any):
+        super().__init__(**data)
+        self._cassette = cassette
+        self._speed = speed
+        self._strict = strict
+
+    def _capability(self, name: str, default: Any) -> Any:
+        return self._cassette.header["models"].get(self.model, {}).get(name, default)
+
+    def supports_function_calling(self) -> bool:
+        return self._capability("supports_function_calling", False)
+
+    def supports_stop_words(self) -> bool:
+        return self._capability("supports_stop_words", True)
+
+    def get_context_window_size(self) -> int:
+        return self._capability("context_window", super().get_context_window_size())
+
+    def call(
+        self,
+        messages: Any,
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+        from_task: Optional[Any] = None,
+        from_agent: Optional[Any] = None,
+        response_model: Optional[Any] = None
+    ) -> Any:
+        with llm_call_context():
+            self._emit_call_started_event(
+                messages=messages, from_task=from_task, from_agent=from_agent
+            )
+            task, agent = _step_names(from_task, from_agent)
+            try:
+                entry = self._cassette.take(
+                    "llm", llm_request_key(self.model, messages, tools, response_model),
+                    task, agent, strict=self._strict
+                )
+            except CassetteMiss as e:
+                self._emit_call_failed_event(error=str(e), from_task=from_task, from_agent=from_agent)
+                raise
+            if self._speed > 0:
+                time.sleep(entry.get("latency", 0.0) * self._speed)
+            if "error" in entry:
+                self._emit_call_failed_event(
+                    error=entry["error"], from_task=from_task, from_agent=from_agent
+                )
+                raise Exception(entry["error"])
+
+            response = _load_response(entry["response"], response_model)
+            prompt = json.dumps(messages, default=str)
+            self._emit_call_completed_event(
+                response=response,
+                call_type=LLMCallType.LLM_CALL,
+                from_task=from_task,
+                from_agent=from_agent,
+                messages=messages,
+                usage={
+                    "input_tokens": len(prompt) // 4,
+                    "output_tokens": len(json.dumps(entry["response"], default=str)) // 4
+                }
+            )
+            return response
+
+
+class ReplaySerperDevTool(CachedSerperDevTool):
+    """Serves search results from a cassette, bypassing both Serper and the search cache."""
+
+    _cassette: Optional[Cassette] = PrivateAttr(default=None)
+    _speed: float = PrivateAttr(default=0.0)
+    _strict: bool = PrivateAttr(default=True)
+
+    def __init__(self, cassette: Cassette, speed: float = 0.0, strict: bool = True, **data: Any):
+        super().__init__(**data)
+        self._cassette = cassette
+        self._speed = speed
+        self._strict = strict
+
+    def _run(self, **kwargs: Any) -> Any:
+        entry = self._cassette.take(
+            "search", search_request_key(self, kwargs), strict=self._strict
+        )
+        if self._speed > 0:
+            time.sleep(entry.get("latency", 0.0) * self._speed)
+        if "error" in entry:
+            raise Exception(entry["error"])
+        return entry["response"]
+
+
+def install_recording() -> None:
+    """Route every LLM and Serper call through backends that record while a cassette is active."""
+    from crew_company_search import set_backends
+    set_backends(
+        llm_factory=lambda **kwargs: recording_llm(LLM(**kwargs)),
+        search_tool_factory=RecordingSerperDevTool
+    )
+
+
+def install_replay(cassette: Cassette, speed: float = 0.0, strict: bool = True) -> None:
+    """
+    Serve every LLM and Serper call from a cassette; speed scales the recorded
+    latencies. Tasks start on the models the recording started them on.
+    """
+    from crew_company_search import set_backends
+    from routing import PinnedRouter, set_router
+    set_router(PinnedRouter(cassette.first_models()))
+    set_backends(
+        llm_factory=lambda **kwargs: ReplayLLM(
+            cassette, speed=speed, strict=strict, model=kwargs.get("model")
+        ),
+        search_tool_factory=lambda **kwargs: ReplaySerperDevTool(
+            cassette, speed=speed, strict=strict, **kwargs
+        )
+    )
+
+
+class CassetteRecorder:
+    """
+    Records each run into its own cassette file in a directory. With
+    redact_resume the resume is replaced by REDACTED_RESUME wherever it
+    appears verbatim: in the header, the prompts and the responses.
+    """
+
+    def __init__(self, directory: str = DEFAULT_RECORD_DIR, redact_resume: bool = False):
+        self.directory = directory
+        self.redact_resume = redact_resume
+        install_recording()
+
+    @contextmanager
+    def record(
+        self,
+        inputs: Dict[str, str],
+        resume_key: Optional[str] = None,
+        mode: Optional[str] = None,
+        research_output: Optional[BaseModel] = None
+    ):
+        """Record the run in this context; the cassette is saved even if the run fails."""
+        from resume_store import get_resume_store
+        resume = get_resume_store().get(resume_key) if resume_key else None
+        cassette = Cassette({
+            "inputs": inputs,
+            "mode": mode,
+            "resume": REDACTED_RESUME if resume and self.redact_resume else resume,
+            "research_output": research_output.model_dump() if research_output else None
+        })
+        if resume and resume.strip() and self.redact_resume:
+            # Tools may hand it on stripped, so that is what is looked for
+            cassette.redactions[resume.strip()] = REDACTED_RESUME
+        started = time.strftime("%Y%m%d-%H%M%S")
+        name = "".join(ch if ch.isalnum() else "-" for ch in inputs.get("company", "run"))[:40]
+        path = os.path.join(self.directory, f"{started}-{name}-{os.getpid()}.cassette.jsonl.gz")
+        try:
+            with cassette.record():
+                yield cassette
+        finally:
+            cassette.header["path"] = path
+            cassette.save(path)
+
+
+def _run_from_cassette(cassette: Cassette, mode: Optional[str]) -> Any:
+    from pipeline import run_pipeline, DEFAULT_EXECUTION_MODE
+    from models import ResearchOutput
+    from resume_store import get_resume_store
+
+    header = cassette.header
+    resume_key = get_resume_store().put("cassette", header.get("resume") or "")
+    research_output = header.get("research_output")
+    try:
+        return run_pipeline(
+            anthropic_api_key=os.getenv("ANTHROPIC_API_KEY", "replay"),
+            serper_api_key=os.getenv("SERPER_API_KEY", "replay"),
+            inputs=header["inputs"],
+            research_output=ResearchOutput(**research_output) if research_output else None,
+            mode=mode or header.get("mode") or DEFAULT_EXECUTION_MODE,
+            resume_key=resume_key
+        )
+    finally:
+        get_resume_store().discard(resume_key)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Record a pipeline run's LLM and Serper traffic to a cassette, or replay one offline."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Run the pipeline live and record its traffic")
+    record.add_argument("path", help="Cassette file to write, e.g. run.cassette.jsonl.gz")
+    record.add_argument("--company", required=True)
+    record.add_argument("--industry", required=True)
+    record.add_argument("--role", dest="pitching_role", required=True)
+    record.add_argument("--country", default="France")
+    record.add_argument("--outreach-purpose", default="job opportunities")
+    record.add_argument("--resume", required=True, help="Resume as a text or PDF file")
+    record.add_argument("--mode", choices=("dag", "hierarchical"), default=None)
+
+    replay = commands.add_parser("replay", help="Replay a cassette with no network access")
+    replay.add_argument("path")
+    replay.add_argument("--speed", type=float, default=0.0,
+                        help="Multiple of the recorded latencies to wait; 0 replays instantly")
+    replay.add_argument("--lenient", action="store_true",
+                        help="Serve unrecorded requests the next response recorded for their step")
+    replay.add_argument("--mode", choices=("dag", "hierarchical"), default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        from pdf_extract import extract_pdf_text
+        with open(args.resume, "rb") as f:
+            data = f.read()
+        resume = extract_pdf_text(data) if args.resume.lower().endswith(".pdf") else data.decode("utf-8")
+        cassette = Cassette({
+            "inputs": {
+                "company": args.company,
+                "industry": args.industry,
+                "pitching_role": args.pitching_role,
+                "country": args.country,
+                "outreach_purpose": args.outreach_purpose
+            },
+            "mode": args.mode,
+            "resume": resume,
+            "research_output": None
+        })
+        install_recording()
+        try:
+            with cassette.record():
+                result = _run_from_cassette(cassette, args.mode)
+        finally:
+            cassette.save(args.path)
+        print(f"Recorded {len(cassette.entries)} requests to {args.path}")
+    else:
+        cassette = Cassette.load(args.path)
+        install_replay(cassette, speed=args.speed, strict=not args.lenient)
+        started = time.perf_counter()
+        result = _run_from_cassette(cassette, args.mode)
+        print(f"Replayed {args.path} in {time.perf_counter() - started:.2f}s")
+
+    if result.metrics:
+        total = result.metrics.total()
+        print(f"LLM calls: {total.llm_calls}, searches: {total.serper_calls}")
+    print(result.email or "")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,89 +6,295 @@ import sys
 sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
 
 import os
-from typing import List, Optional, Dict, Any
+from functools import lru_cache
+from typing import Callable, List, Optional, Dict, Any, Tuple, Type
 from crewai import Agent, Task, Crew, Process, LLM
-from crewai_tools import SerperDevTool, FileReadTool
 import json
+from pydantic import BaseModel, ValidationError
+from tools import CachedSerperDevTool, ResumeReadTool
+from resilience import resilient_llm, CALL_DEADLINE
+from ratelimit import rate_limited_llm
+from promptcache import prompt_cached_llm
+from resume_store import get_resume_store
 from models import (
-    ResearchOutput, CompanyAnalysis, IndustryAnalysis,
-    CompanyDetails, PositionContext, WorkEnvironment,
-    MarketPosition, ProfessionalGrowth, LocalMarket,
-    CompanyStage, WorkModel
+    ResearchOutput, CompanyDetails, PositionContext, WorkEnvironment,
+    MarketPosition, ProfessionalGrowth, LocalMarket
 )
 
-def load_resume() -> str:
-    """Safely load resume content with error handling."""
+# Agent and crew console logging; CREW_VERBOSE=0 silences it
+VERBOSE = os.getenv("CREW_VERBOSE", "1") == "1"
+
+# The researcher, writer and manager default to Sonnet, contact discovery and drafts to
+# Haiku; runs of the pipeline pick each task's model through routing.py
+SONNET_MODEL = "anthropic/claude-3-sonnet-20240229"
+HAIKU_MODEL = "anthropic/claude-3-haiku-20240307"
+
+# Task prompts are the same on every run, so providers can cache them; the
+# per-request inputs are handed to each task as its context, which crewai
+# puts after the prompt and output schema (see CacheableTask).
+RESEARCH_TASK_TEMPLATE = """Analyze the company and industry given in the request details.
+            Consider the specific context of the market in their country.
+            
+            Provide a comprehensive analysis following this exact structure:
+            
+            Company Analysis:
+            1. Company Details:
+               - Employee count and office locations
+               - Company stage (startup/established/multinational)
+               - Financial status and performance
+               - Core business areas
+               - Geographical presence
+               - Organizational structure
+
+            2. Position Context:
+               - Department overview
+               - Reporting structure
+               - Growth plans and opportunities
+               - Key projects and initiatives
+               - Required qualifications
+               - Similar roles in the organization
+
+            3. Work Environment:
+               - Company values and mission
+               - Culture and workplace environment
+               - Development and training programs
+               - Benefits and perks
+               - Leadership approach
+               - Employee feedback and reviews
+               - Work model (remote/hybrid/office)
+
+            Industry Analysis:
+            1. Market Position:
+               - Industry ranking and market share
+               - Key competitors analysis
+               - Company differentiators
+               - Strategic partnerships
+               - Recent achievements
+               - Industry challenges and risks
+
+            2. Professional Growth:
+               - Essential skills and competencies
+               - Career advancement paths
+               - Industry certifications
+               - Compensation ranges
+               - Professional networks
+               - Industry growth outlook
+
+            3. Local Market (the country given):
+               - Regional market status
+               - Business environment analysis
+               - Local competition landscape
+               - Employment regulations
+               - Business culture norms
+               - Required permits and licenses
+
+            Return the analysis as a structured JSON object matching the ResearchOutput model format.
+            Ensure all information is accurate, current, and relevant to the position given.
+            
+            IMPORTANT: Your response must be a valid JSON object that follows the ResearchOutput model structure.
+            Do not include any text outside of the JSON object."""
+
+CONTACTS_TASK_TEMPLATE = """Find 2-3 relevant contacts at the company given in the request details, for the position given.
+            Focus on contacts in the country given or with responsibility for it.
+            Format each contact as:
+
+            Contact Name: [Full Name]
+            Role: [Current Role]
+            Location: [Country/Office]
+            Background: [Brief background]
+            LinkedIn: [LinkedIn profile URL if available]
+            Email: [Email if available]
+
+            Separate each contact with a blank line.
+            Make sure to include LinkedIn profiles when possible as they are important for outreach.
+            Focus on hiring managers and team leads."""
+
+EMAIL_TASK_TEMPLATE = """Write a personalized outreach email for the company given in the request details.
+            Consider the local business culture in the country given.
+            Use this exact structure:
+            ---
+            Subject: [Clear subject line]
+
+            Dear [Contact's Name],
+
+            [Opening with specific company detail]
+
+            [Paragraph about relevant experience]
+
+            [Closing with clear call to action]
+
+            Best regards,
+            [Your name]
+            ---
+            
+            Keep the total length under 200 words.
+            Use information from the research and resume."""
+
+# Focused prompt for one ResearchOutput section when research is fanned out
+SECTION_TASK_TEMPLATE = """Research the company and industry given in the request details, for the position given.
+            Consider the specific context of the market in their country.
+            
+            Focus only on this part of the analysis:
+            
+            {section_prompt}
+
+            Return the result as a structured JSON object matching the {model_name} model format.
+            Ensure all information is accurate, current, and relevant to the position given.
+            
+            IMPORTANT: Your response must be a valid JSON object that follows the {model_name} model structure.
+            Do not include any text outside of the JSON object."""
+
+# Prompt for sections that only depend on industry and country, so their
+# results can be cached and shared across companies
+INDUSTRY_SECTION_TASK_TEMPLATE = """Research the industry given in the request details, in the market of the country given.
+            This analysis is not specific to any single company.
+            
+            Focus only on this part of the analysis:
+            
+            {section_prompt}
+
+            Return the result as a structured JSON object matching the {model_name} model format.
+            Ensure all information is accurate, current, and relevant to that industry in that country.
+            
+            IMPORTANT: Your response must be a valid JSON object that follows the {model_name} model structure.
+            Do not include any text outside of the JSON object."""
+
+# ResearchOutput sections: name -> (parent field, model, prompt outline)
+RESEARCH_SECTIONS: Dict[str, Tuple[str, Type[BaseModel], str]] = {
+    "company_details": ("company_analysis", CompanyDetails, """Company Details:
+               - Employee count and office locations
+               - Company stage (startup/established/multinational)
+               - Financial status and performance
+               - Core business areas
+               - Geographical presence
+               - Organizational structure"""),
+    "position_context": ("company_analysis", PositionContext, """Position Context:
+               - Department overview
+               - Reporting structure
+               - Growth plans and opportunities
+               - Key projects and initiatives
+               - Required qualifications
+               - Similar roles in the organization"""),
+    "work_environment": ("company_analysis", WorkEnvironment, """Work Environment:
+               - Company values and mission
+               - Culture and workplace environment
+               - Development and training programs
+               - Benefits and perks
+               - Leadership approach
+               - Employee feedback and reviews
+               - Work model (remote/hybrid/office)"""),
+    "market_position": ("industry_analysis", MarketPosition, """Market Position:
+               - Industry ranking and market share
+               - Key competitors analysis
+               - Company differentiators
+               - Strategic partnerships
+               - Recent achievements
+               - Industry challenges and risks"""),
+    "professional_growth": ("industry_analysis", ProfessionalGrowth, """Professional Growth:
+               - Essential skills and competencies
+               - Career advancement paths
+               - Industry certifications
+               - Compensation ranges
+               - Professional networks
+               - Industry growth outlook"""),
+    "local_market": ("industry_analysis", LocalMarket, """Local Market (the country given):
+               - Regional market status
+               - Business environment analysis
+               - Local competition landscape
+               - Employment regulations
+               - Business culture norms
+               - Required permits and licenses"""),
+}
+
+# Sections keyed on (industry, country) instead of the company
+INDUSTRY_SECTIONS = ("professional_growth", "local_market")
+
+# Labels of the per-request inputs in a task's request details
+REQUEST_FIELDS = {
+    "company": "Company",
+    "industry": "Industry",
+    "country": "Country",
+    "pitching_role": "Position"
+}
+
+def request_details(**inputs: str) -> str:
+    """The request details a task's static prompt refers to, one labelled input per line."""
+    return "Request details:\n" + "\n".join(f"{REQUEST_FIELDS[name]}: {value}" for name, value in inputs.items())
+
+def load_resume(resume_key: Optional[str]) -> str:
+    """Safely load the resume stored under resume_key with error handling."""
     try:
-        if not os.path.exists("resume.txt"):
-            raise FileNotFoundError("Resume file not found")
-        with open("resume.txt", "r", encoding="utf-8") as f:
-            return f.read()
+        resume = get_resume_store().get(resume_key) if resume_key else None
+        if resume is None:
+            raise KeyError("Resume not found for this session")
+        return resume
     except Exception as e:
         raise Exception(f"Error reading resume: {str(e)}")
 
+# Backends behind get_llm and create_tools; see set_backends
+_llm_factory: Callable[..., Any] = LLM
+_search_tool_factory: Callable[..., Any] = CachedSerperDevTool
+
+def set_backends(
+    llm_factory: Optional[Callable[..., Any]] = None,
+    search_tool_factory: Optional[Callable[..., Any]] = None
+) -> None:
+    """
+    Swap the LLM client and search tool implementations, e.g. for offline
+    stand-ins. Factories take the same arguments as LLM and CachedSerperDevTool;
+    None restores the default. Cached clients and agents are dropped.
+    """
+    global _llm_factory, _search_tool_factory
+    _llm_factory = llm_factory or LLM
+    _search_tool_factory = search_tool_factory or CachedSerperDevTool
+    get_llm.cache_clear()
+    _agent_templates.cache_clear()
+
 def create_tools(serper_api_key: str) -> Dict[str, Any]:
     """Create and validate tools with error handling."""
     try:
-        search_tool = SerperDevTool(
+        search_tool = _search_tool_factory(
             serper_api_key=serper_api_key,
             retry_on_fail=True
         )
         
-        file_tool = FileReadTool(
-            file_path="resume.txt",
-            retry_on_fail=True
-        )
-        
         return {
-            "search": search_tool,
-            "resume": file_tool
+            "search": search_tool
         }
     except Exception as e:
         raise Exception(f"Error creating tools: {str(e)}")
 
-def initialize_crew(
-    anthropic_api_key: str, 
-    serper_api_key: str,
-    company: str = "",
-    industry: str = "",
-    pitching_role: str = "",
-    country: str = "",
-    outreach_purpose: str = ""
-) -> Crew:
+@lru_cache(maxsize=16)
+def get_llm(api_key: str, model: str) -> LLM:
     """
-    Initialize CrewAI with robust error handling and validated configuration.
+    Return a shared LLM client for (api_key, model). Clients are reused across
+    runs and sessions so their underlying HTTP connection pools are too.
+    Retries, deadlines and hedging are handled by the resilience policy, so
+    the provider SDK's own retries are turned off; every attempt, hedges
+    included, waits for the shared rate limits. Task prompts are sent with
+    their static part as a separate prompt cache breakpoint.
     """
-    try:
-        # Validate API keys
-        if not anthropic_api_key or not serper_api_key:
-            raise ValueError("Missing required API keys")
-        
-        # Set required environment variables
-        llm = LLM(api_key = anthropic_api_key, model="anthropic/claude-3-sonnet-20240229")
+    llm = _llm_factory(api_key=api_key, model=model, max_retries=0, timeout=CALL_DEADLINE)
+    return resilient_llm(rate_limited_llm(prompt_cached_llm(llm)))
 
-        
-        # Create tools
-        tools = create_tools(serper_api_key)
-        
-        # Validate resume exists
-        load_resume()
+def create_agents(anthropic_api_key: str, tools: Dict[str, Any]) -> Dict[str, Any]:
+    """Create the researcher, contact finder and writer agents plus the manager LLM."""
+    try:
+        llm = get_llm(anthropic_api_key, SONNET_MODEL)
         
         # Create researcher agent
         researcher = Agent(
             role="Research Specialist",
-            goal=f"""Analyze companies and industries to provide comprehensive insights 
+            goal="""Analyze companies and industries to provide comprehensive insights 
             for job applications and professional outreach.""",
             backstory="""You are an expert in corporate research and industry analysis 
             with years of experience helping job seekers understand potential employers.""",
             tools=[tools["search"]],
-            verbose=True,
+            verbose=VERBOSE,
             allow_delegation=False,
             llm=llm,
             llm_config={
                 "temperature": 0.2,
-                "retry_delay": 10,
-                "max_retries": 3,
             },
         )
         
@@ -99,13 +305,11 @@ def initialize_crew(
             backstory="""You are an expert in identifying key decision-makers and 
             hiring managers within organizations.""",
             tools=[tools["search"]],
-            verbose=True,
+            verbose=VERBOSE,
             allow_delegation=False,
-            llm=LLM(api_key = anthropic_api_key, model="anthropic/claude-3-haiku-20240307"),
+            llm=get_llm(anthropic_api_key, HAIKU_MODEL),
             llm_config={
                 "temperature": 0.2,
-                "retry_delay": 10,
-                "max_retries": 3,
             },
         )
         
@@ -116,142 +320,277 @@ def initialize_crew(
             backstory="""Professional writer specializing in job search communications. 
             You excel at creating engaging, personalized messages that highlight relevant 
             experience and generate responses.""",
-            tools=[tools["resume"]],
-            verbose=True,
+            # The resume tool is bound per run on the email task
+            tools=[],
+            verbose=VERBOSE,
             allow_delegation=False,
             llm=llm,
             llm_config={
                 "temperature": 0.6,
-                "retry_delay": 10,
-                "max_retries": 3,
             },
         )
         
-        # Research task
-        research = Task(
-            description=f"""Analyze {company} and the {industry} industry.
-                Consider the specific context of {country} market.
-                
-                Provide a comprehensive analysis following this exact structure:
-                
-                Company Analysis:
-                1. Company Details:
-                   - Employee count and office locations
-                   - Company stage (startup/established/multinational)
-                   - Financial status and performance
-                   - Core business areas
-                   - Geographical presence
-                   - Organizational structure
-
-                2. Position Context:
-                   - Department overview
-                   - Reporting structure
-                   - Growth plans and opportunities
-                   - Key projects and initiatives
-                   - Required qualifications
-                   - Similar roles in the organization
-
-                3. Work Environment:
-                   - Company values and mission
-                   - Culture and workplace environment
-                   - Development and training programs
-                   - Benefits and perks
-                   - Leadership approach
-                   - Employee feedback and reviews
-                   - Work model (remote/hybrid/office)
-
-                Industry Analysis:
-                1. Market Position:
-                   - Industry ranking and market share
-                   - Key competitors analysis
-                   - Company differentiators
-                   - Strategic partnerships
-                   - Recent achievements
-                   - Industry challenges and risks
-
-                2. Professional Growth:
-                   - Essential skills and competencies
-                   - Career advancement paths
-                   - Industry certifications
-                   - Compensation ranges
-                   - Professional networks
-                   - Industry growth outlook
-
-                3. Local Market ({country}):
-                   - Regional market status
-                   - Business environment analysis
-                   - Local competition landscape
-                   - Employment regulations
-                   - Business culture norms
-                   - Required permits and licenses
-
-                Return the analysis as a structured JSON object matching the ResearchOutput model format.
-                Ensure all information is accurate, current, and relevant to {pitching_role} position.
-                
-                IMPORTANT: Your response must be a valid JSON object that follows the ResearchOutput model structure.
-                Do not include any text outside of the JSON object.""",
-            agent=researcher,
-            expected_output="A comprehensive company and industry analysis",
-            output_json=ResearchOutput,
-            context_json=True,
-            tools_json=True
+        return {
+            "researcher": researcher,
+            "contact_finder": contact_finder,
+            "writer": writer,
+            "manager_llm": llm
+        }
+    except Exception as e:
+        raise Exception(f"Error creating agents: {str(e)}")
+
+@lru_cache(maxsize=8)
+def _agent_templates(anthropic_api_key: str, serper_api_key: str) -> Dict[str, Any]:
+    return create_agents(anthropic_api_key, create_tools(serper_api_key))
+
+def get_agents(anthropic_api_key: str, serper_api_key: str) -> Dict[str, Any]:
+    """
+    Return agents for a single run, copied from cached templates. Copies are
+    cheap and keep concurrent runs isolated while sharing LLM clients and tools.
+    """
+    try:
+        templates = _agent_templates(anthropic_api_key, serper_api_key)
+        return {
+            name: value.copy() if isinstance(value, Agent) else value
+            for name, value in templates.items()
+        }
+    except Exception as e:
+        raise Exception(f"Error creating agents: {str(e)}")
+
+def with_model(agent: Agent, model: Optional[str]) -> Agent:
+    """
+    Point an agent copy from get_agents at model's shared client, keeping its
+    API key; None leaves it on its default model.
+    """
+    if model:
+        agent.llm = get_llm(agent.llm.api_key, model)
+    return agent
+
+class CacheableTask(Task):
+    """
+    Task whose description is the same on every run. Its per-request inputs
+    are kept in request_context and handed to the agent along with any
+    upstream task output as the task's context, which crewai puts after the
+    description and output schema, so prompts share a cacheable prefix.
+    """
+
+    request_context: str = ""
+
+    def _with_request(self, context: Optional[str]) -> Optional[str]:
+        return "\n\n".join(part for part in (self.request_context, context) if part) or None
+
+    def _execute_core(self, agent: Any, context: Optional[str], tools: Optional[List[Any]]) -> Any:
+        return super()._execute_core(agent, self._with_request(context), tools)
+
+    async def _aexecute_core(self, agent: Any, context: Optional[str], tools: Optional[List[Any]]) -> Any:
+        return await super()._aexecute_core(agent, self._with_request(context), tools)
+
+class RepairableTask(CacheableTask):
+    """
+    Task whose JSON output is validated by the pipeline rather than by
+    crewai's converter: output that does not match the schema is kept as raw
+    text for field-level repair, instead of failing the task or being
+    re-asked in full by an extra conversion call.
+    """
+
+    def _export_output(self, result: Any) -> Tuple[Optional[BaseModel], Optional[Dict[str, Any]]]:
+        model = self.output_pydantic or self.output_json
+        if model is None or isinstance(result, BaseModel):
+            return super()._export_output(result)
+        from repair import parse_partial_json
+
+        try:
+            instance = model.model_validate(parse_partial_json(result))
+        except ValidationError:
+            return None, None
+        return (None, instance.model_dump()) if self.output_json else (instance, None)
+
+    async def _aexport_output(self, result: Any) -> Tuple[Optional[BaseModel], Optional[Dict[str, Any]]]:
+        return self._export_output(result)
+
+def create_research_task(
+    researcher: Agent,
+    company: str,
+    industry: str,
+    country: str,
+    pitching_role: str
+) -> Task:
+    """Create the company and industry research task."""
+    return RepairableTask(
+        name="research",
+        description=RESEARCH_TASK_TEMPLATE,
+        request_context=request_details(
+            company=company,
+            industry=industry,
+            country=country,
+            pitching_role=pitching_role
+        ),
+        agent=researcher,
+        expected_output="A comprehensive company and industry analysis",
+        output_json=ResearchOutput,
+        context_json=True,
+        tools_json=True
+    )
+
+def create_section_task(
+    researcher: Agent,
+    section: str,
+    company: str,
+    industry: str,
+    country: str,
+    pitching_role: str
+) -> Task:
+    """Create a research task for a single ResearchOutput section."""
+    _, model, outline = RESEARCH_SECTIONS[section]
+    if section in INDUSTRY_SECTIONS:
+        template = INDUSTRY_SECTION_TASK_TEMPLATE
+        details = request_details(industry=industry, country=country)
+    else:
+        template = SECTION_TASK_TEMPLATE
+        details = request_details(
+            company=company, industry=industry, country=country, pitching_role=pitching_role
         )
+    return RepairableTask(
+        name=f"research:{section}",
+        description=template.format(section_prompt=outline, model_name=model.__name__),
+        request_context=details,
+        agent=researcher,
+        expected_output=f"A {model.__name__} JSON object",
+        output_json=model
+    )
+
+def parse_section_output(section: str, result: Any) -> BaseModel:
+    """Parse and validate one research section against its model."""
+    try:
+        data = json.loads(result) if isinstance(result, str) else result
+        return RESEARCH_SECTIONS[section][1].model_validate(data)
+    except Exception as e:
+        raise Exception(f"Error parsing {section} output: {str(e)}")
+
+def group_research_sections(sections: Dict[str, BaseModel]) -> Dict[str, Dict[str, Any]]:
+    """Sections nested under their analysis, as in ResearchOutput; missing ones are left out."""
+    grouped: Dict[str, Dict[str, Any]] = {"company_analysis": {}, "industry_analysis": {}}
+    for section, value in sections.items():
+        parent = RESEARCH_SECTIONS[section][0]
+        grouped[parent][section] = value.model_dump(mode="json") if isinstance(value, BaseModel) else value
+    return grouped
+
+def merge_research_sections(sections: Dict[str, BaseModel]) -> ResearchOutput:
+    """Assemble validated sections into a ResearchOutput."""
+    return ResearchOutput.model_validate(group_research_sections(sections))
+
+def create_contacts_task(
+    contact_finder: Agent,
+    company: str,
+    pitching_role: str,
+    country: str
+) -> Task:
+    """Create the hiring manager / team lead discovery task."""
+    return CacheableTask(
+        name="contacts",
+        description=CONTACTS_TASK_TEMPLATE,
+        request_context=request_details(
+            company=company,
+            pitching_role=pitching_role,
+            country=country
+        ),
+        agent=contact_finder,
+        expected_output="A list of 2-3 formatted contact profiles for relevant hiring managers or team leads."
+    )
+
+def create_email_task(
+    writer: Agent,
+    company: str,
+    country: str,
+    context: Optional[List[Task]] = None,
+    research_output: Optional[ResearchOutput] = None,
+    contacts_output: Optional[str] = None,
+    resume_key: Optional[str] = None
+) -> Task:
+    """
+    Create the outreach email task. Upstream results are either wired in as task
+    context or, when they were produced elsewhere, added to its request details.
+    The writer reads the session's resume through a tool bound to resume_key.
+    """
+    details = [request_details(company=company, country=country)]
+    if research_output is not None:
+        details.append(f"Company and industry research (JSON):\n{research_output.model_dump_json()}")
+    if contacts_output:
+        details.append(f"Contacts found at {company}:\n{contacts_output}")
+
+    return CacheableTask(
+        name="email",
+        description=EMAIL_TASK_TEMPLATE,
+        request_context="\n\n".join(details),
+        agent=writer,
+        expected_output="A formatted email following the specified structure.",
+        context=context or [],
+        tools=[ResumeReadTool(resume_key=resume_key)] if resume_key else []
+    )
+
+def initialize_crew(
+    anthropic_api_key: str, 
+    serper_api_key: str,
+    company: str = "",
+    industry: str = "",
+    pitching_role: str = "",
+    country: str = "",
+    outreach_purpose: str = "",
+    research_output: Optional[ResearchOutput] = None,
+    resume_key: Optional[str] = None,
+    models: Optional[Dict[str, str]] = None
+) -> Crew:
+    """
+    Initialize CrewAI with robust error handling and validated configuration.
+    When research_output is provided (e.g. from the research cache) the research
+    task is skipped and the cached analysis is handed to the email writer instead.
+    models overrides the default model per agent name, "manager_llm" included.
+    """
+    try:
+        # Validate API keys
+        if not anthropic_api_key or not serper_api_key:
+            raise ValueError("Missing required API keys")
         
-        # Contact task
-        contacts = Task(
-            description=f"""Find 2-3 relevant contacts at {company} for the {pitching_role} position.
-                Focus on contacts in {country} or with responsibility for {country}.
-                Format each contact as:
-
-                Contact Name: [Full Name]
-                Role: [Current Role]
-                Location: [Country/Office]
-                Background: [Brief background]
-                LinkedIn: [LinkedIn profile URL if available]
-                Email: [Email if available]
-
-                Separate each contact with a blank line.
-                Make sure to include LinkedIn profiles when possible as they are important for outreach.
-                Focus on hiring managers and team leads.""",
-            agent=contact_finder,
-            expected_output="A list of 2-3 formatted contact profiles for relevant hiring managers or team leads."
-        )
+        # Validate resume exists
+        load_resume(resume_key)
         
-        # Email task
-        email = Task(
-            description=f"""Write a personalized outreach email for {company}.
-                Consider the local business culture in {country}.
-                
-                Use this exact structure:
-                ---
-                Subject: [Clear subject line]
-
-                Dear [Contact's Name],
-
-                [Opening with specific company detail]
-
-                [Paragraph about relevant experience]
-
-                [Closing with clear call to action]
-
-                Best regards,
-                [Your name]
-                ---
-                
-                Keep the total length under 200 words.
-                Use information from the research and resume.""",
-            agent=writer,
-            expected_output="A formatted email following the specified structure.",
-            context=[research, contacts]
-        )
+        agents = get_agents(anthropic_api_key, serper_api_key)
+        for name, model in (models or {}).items():
+            if name == "manager_llm":
+                agents[name] = get_llm(anthropic_api_key, model)
+            else:
+                with_model(agents[name], model)
+        
+        contacts = create_contacts_task(agents["contact_finder"], company, pitching_role, country)
+        
+        if research_output is not None:
+            email = create_email_task(
+                agents["writer"], company, country,
+                context=[contacts],
+                research_output=research_output,
+                resume_key=resume_key
+            )
+            crew_agents = [agents["contact_finder"], agents["writer"]]
+            tasks = [contacts, email]
+        else:
+            research = create_research_task(
+                agents["researcher"], company, industry, country, pitching_role
+            )
+            email = create_email_task(
+                agents["writer"], company, country,
+                context=[research, contacts],
+                resume_key=resume_key
+            )
+            crew_agents = [agents["researcher"], agents["contact_finder"], agents["writer"]]
+            tasks = [research, contacts, email]
         
         # Create crew
         crew = Crew(
-            agents=[researcher, contact_finder, writer],
-            tasks=[research, contacts, email],
+            agents=crew_agents,
+            tasks=tasks,
             process=Process.hierarchical,
-            manager_llm=llm,
-            verbose=True
+            manager_llm=agents["manager_llm"],
+            verbose=VERBOSE
         )
         
         return crew
@@ -285,9 +624,13 @@ if __name__ == "__main__":
         if not all(api_keys.values()):
             raise ValueError("Missing required API keys in environment variables")
         
+        with open("resume.txt", "r", encoding="utf-8") as f:
+            resume_key = get_resume_store().put("cli", f.read())
+        
         crew = initialize_crew(
             anthropic_api_key=api_keys["anthropic"],
-            serper_api_key=api_keys["serper"]
+            serper_api_key=api_keys["serper"],
+            resume_key=resume_key
         )
         
         # Test inputs
@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Any, Dict, List, Tuple
+
+# The landing page has to render within this many seconds of a cold interpreter
+DEFAULT_BUDGET_SECONDS = float(os.getenv("CREW_IMPORT_BUDGET", 1.0))
+# Dependencies that are only needed once a generation or PDF parse starts
+HEAVY_MODULES = ("crewai", "crewai_tools", "PyPDF2", "litellm", "chromadb", "langchain")
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Runs in a fresh interpreter so nothing is already imported
+_PROBE = """
+import os, sys, json, time
+os.environ["CREW_PRELOAD"] = "0"
+os.environ["CREW_WARMUP"] = "0"
+from streamlit.testing.v1 import AppTest
+started = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120).run()
+rendered = time.perf_counter()
+at.run()
+rerun = time.perf_counter()
+print(json.dumps({{
+    "first_render": rendered - started,
+    "rerun": rerun - rendered,
+    "exceptions": [str(e.value) for e in at.exception],
+    "heavy_modules": [m for m in {heavy!r} if m in sys.modules]
+}}))
+"""
+
+
+def slowest_imports(importtime_log: str, limit: int = 10) -> List[Tuple[str, float]]:
+    """Top-level packages with the largest cumulative import time, from -X importtime output."""
+    totals: Dict[str, float] = {}
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith(" ") or name[1:2] == " ":
+            # Only lines with no indentation are top-level imports
+            continue
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0.0) + int(cumulative) / 1e6
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def measure(app_path: str = APP_PATH) -> Dict[str, Any]:
+    """Render the landing page once in a new interpreter and report timings and imports."""
+    probe = _PROBE.format(app=app_path, heavy=HEAVY_MODULES)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True, text=True, cwd=os.path.dirname(app_path),
+        env={**os.environ, "CREWAI_DISABLE_TELEMETRY": "true"}
+    )
+    lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+    if completed.returncode != 0 or not lines:
+        raise Exception(f"Error measuring the landing page: {completed.stderr[-2000:]}")
+    report = json.loads(lines[-1])
+    report["slowest_imports"] = slowest_imports(completed.stderr)
+    return report
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Check that the app's landing page renders within an import-time budget."
+    )
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help="Maximum seconds for the first render of the landing page")
+    args = parser.parse_args(argv)
+
+    report = measure()
+    print(f"first render: {report['first_render']:.3f}s (budget {args.budget:.3f}s), "
+          f"rerun: {report['rerun']:.3f}s")
+    print("slowest imports:")
+    for package, seconds in report["slowest_imports"]:
+        print(f"  {package:<28}{seconds:>8.3f}s")
+
+    failures = []
+    if report["exceptions"]:
+        failures.append(f"landing page raised: {report['exceptions'][0]}")
+    if report["heavy_modules"]:
+        failures.append(f"heavy modules loaded before any generation: {', '.join(report['heavy_modules'])}")
+    if report["first_render"] > args.budget:
+        failures.append(f"first render took {report['first_render']:.3f}s")
+    for failure in failures:
+        print(f"OVER BUDGET {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+import os
+import time
+import uuid
+import sqlite3
+import threading
+from enum import Enum
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from cache import DEFAULT_CACHE_PATH
+from results import PipelineResult, ProgressCallback
+
+DEFAULT_MAX_CONCURRENT_JOBS = int(os.getenv("CREW_MAX_CONCURRENT_JOBS", 2))
+# Finished jobs (and their generated materials) are kept this long for reattaching
+DEFAULT_JOB_RETENTION = float(os.getenv("CREW_JOB_RETENTION", 24 * 3600))
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job at its next progress checkpoint once it has been cancelled."""
+
+
+class JobEvent(BaseModel):
+    step: str
+    status: str
+    at: float
+
+
+class JobRecord(BaseModel):
+    id: str
+    owner: str
+    status: JobStatus = JobStatus.QUEUED
+    inputs: Dict[str, str] = Field(default_factory=dict)
+    progress: List[JobEvent] = Field(default_factory=list)
+    result: Optional[PipelineResult] = None
+    error: Optional[str] = None
+    created_at: float = Field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Step outputs as they complete; kept in memory only, the final result is persisted
+    partial: Dict[str, Any] = Field(default_factory=dict, exclude=True)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+
+# A job body receives a progress callback and returns the pipeline result
+JobFunction = Callable[[ProgressCallback], PipelineResult]
+
+
+class JobManager:
+    """
+    Runs generation jobs on a bounded worker pool, outside any UI thread.
+    Job state and results are persisted to SQLite so clients can poll, detach
+    and reattach by job id. Running jobs are cancelled cooperatively at their
+    next progress checkpoint; queued jobs never start.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_workers: int = DEFAULT_MAX_CONCURRENT_JOBS,
+        retention_seconds: float = DEFAULT_JOB_RETENTION
+    ):
+        self.retention_seconds = retention_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._active: Dict[str, JobRecord] = {}
+        self._futures: Dict[str, Future] = {}
+        self._cancelled: set = set()
+        self._cleanups: Dict[str, Callable[[], None]] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    record TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_owner ON jobs (owner, created_at)")
+
+    def _persist(self, job: JobRecord) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO jobs (id, owner, status, record, created_at)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (job.id, job.owner, job.status.value, job.model_dump_json(), job.created_at)
+            )
+
+    def submit(
+        self,
+        fn: JobFunction,
+        owner: str,
+        inputs: Optional[Dict[str, str]] = None,
+        cleanup: Optional[Callable[[], None]] = None
+    ) -> str:
+        """
+        Queue a job and return its id. cleanup runs once the job is over,
+        however it ends - including cancellation before it ever started.
+        """
+        self.prune()
+        job = JobRecord(id=uuid.uuid4().hex, owner=owner, inputs=inputs or {})
+        with self._lock:
+            self._active[job.id] = job
+            if cleanup is not None:
+                self._cleanups[job.id] = cleanup
+        self._persist(job)
+        future = self._pool.submit(self._run, job, fn)
+        with self._lock:
+            self._futures[job.id] = future
+        return job.id
+
+    def _checkpoint(self, job: JobRecord) -> ProgressCallback:
+        def on_progress(step: str, status: str, output: Any) -> None:
+            if job.id in self._cancelled:
+                raise JobCancelled(f"Job {job.id} was cancelled")
+            with self._lock:
+                job.progress.append(JobEvent(step=step, status=status, at=time.time()))
+                if status == "completed":
+                    job.partial[step] = output
+            self._persist(job)
+        return on_progress
+
+    def _run(self, job: JobRecord, fn: JobFunction) -> None:
+        try:
+            if job.id in self._cancelled:
+                raise JobCancelled(f"Job {job.id} was cancelled")
+            job.status = JobStatus.RUNNING
+            job.started_at = time.time()
+            self._persist(job)
+            job.result = fn(self._checkpoint(job))
+            job.status = JobStatus.SUCCEEDED
+        except JobCancelled:
+            job.status = JobStatus.CANCELLED
+        except Exception as e:
+            # Cancellation raised deep inside the pipeline may arrive wrapped
+            if job.id in self._cancelled:
+                job.status = JobStatus.CANCELLED
+            else:
+                job.status = JobStatus.FAILED
+                job.error = str(e)
+        finally:
+            self._finish(job)
+
+    def _finish(self, job: JobRecord) -> None:
+        job.finished_at = time.time()
+        self._persist(job)
+        with self._lock:
+            self._active.pop(job.id, None)
+            self._futures.pop(job.id, None)
+            self._cancelled.discard(job.id)
+            cleanup = self._cleanups.pop(job.id, None)
+        if cleanup is not None:
+            try:
+                cleanup()
+            except Exception:
+                pass
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        """Current state of a job, from memory while it is active, else from SQLite."""
+        with self._lock:
+            job = self._active.get(job_id)
+            if job is not None:
+                return job.model_copy(
+                    update={"progress": list(job.progress), "partial": dict(job.partial)}
+                )
+            row = self._conn.execute(
+                "SELECT record FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = JobRecord.model_validate_json(row[0])
+        if not job.finished:
+            # Persisted as active but not running here: its process went away
+            job.status = JobStatus.FAILED
+            job.error = "Job was interrupted before it finished"
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """Request cancellation. Returns False if the job is unknown or already finished."""
+        with self._lock:
+            job = self._active.get(job_id)
+            future = self._futures.get(job_id)
+            if job is None:
+                return False
+            self._cancelled.add(job_id)
+        if future is not None and future.cancel():
+            # Never started: finish it here since _run will not
+            job.status = JobStatus.CANCELLED
+            self._finish(job)
+        return True
+
+    def list(self, owner: str, limit: int = 20) -> List[JobRecord]:
+        """Most recent jobs for an owner."""
+        with self._lock:
+            ids = [
+                row[0] for row in self._conn.execute(
+                    "SELECT id FROM jobs WHERE owner = ? ORDER BY created_at DESC LIMIT ?",
+                    (owner, limit)
+                ).fetchall()
+            ]
+        return [job for job in (self.get(job_id) for job_id in ids) if job is not None]
+
+    def prune(self) -> None:
+        """
+        Drop jobs older than the retention period once they have finished, or
+        were interrupted: persisted as active but not running in this process.
+        Jobs still queued or running here are kept however long they take.
+        """
+        with self._lock, self._conn:
+            active = list(self._active)
+            self._conn.execute(
+                f"""DELETE FROM jobs WHERE created_at < ? AND (
+                        status IN ({",".join("?" * len(FINISHED_STATUSES))})
+                        OR id NOT IN ({",".join("?" * len(active))})
+                    )""",
+                [time.time() - self.retention_seconds]
+                + [status.value for status in FINISHED_STATUSES] + active
+            )
+
+    def active_count(self) -> int:
+        with self._lock:
+            return len(self._active)
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
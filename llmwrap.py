@@ -0,0 +1,48 @@
+import inspect
+import threading
+from typing import Any, Dict, Tuple
+
+# Wrapped class per (LLM class, mixin), and the provider class each one wraps
+_wrapped_classes: Dict[Tuple[type, type], type] = {}
+_provider_classes: Dict[type, type] = {}
+_signatures: Dict[type, inspect.Signature] = {}
+_lock = threading.Lock()
+
+
+def wrap_llm(llm: Any, mixin: type) -> Any:
+    """
+    Give an LLM the behaviour of mixin, keeping its provider-specific class:
+    its class is swapped for a subclass with mixin first, whose
+    call(self, *args, **kwargs) wraps the provider's through super().call.
+    An LLM that already has the mixin is returned as it is.
+    """
+    cls = type(llm)
+    if issubclass(cls, mixin):
+        return llm
+    with _lock:
+        wrapped = _wrapped_classes.get((cls, mixin))
+        if wrapped is None:
+            prefix = mixin.__name__.strip("_").replace("LLMMixin", "")
+            wrapped = type(f"{prefix}{cls.__name__}", (mixin, cls), {})
+            _wrapped_classes[(cls, mixin)] = wrapped
+            _provider_classes[wrapped] = _provider_classes.get(cls, cls)
+    llm.__class__ = wrapped
+    return llm
+
+
+def bind_call(llm: Any, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> inspect.BoundArguments:
+    """
+    Arguments of a call on a wrapped LLM bound to its provider's call
+    signature, so a mixin can read or replace them by name (e.g. "messages",
+    "from_task") however they were passed, and forward bound.args and
+    bound.kwargs on.
+    """
+    provider = _provider_classes.get(type(llm), type(llm))
+    with _lock:
+        signature = _signatures.get(provider)
+        if signature is None:
+            signature = inspect.signature(provider.call)
+            # Drop self: the call is forwarded through super()
+            signature = signature.replace(parameters=list(signature.parameters.values())[1:])
+            _signatures[provider] = signature
+    return signature.bind_partial(*args, **kwargs)
@@ -0,0 +1,262 @@
+import os
+import re
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+# JSONL trace of every recorded event; set CREW_TRACE_PATH to "" to disable it
+DEFAULT_TRACE_PATH = os.getenv("CREW_TRACE_PATH", "crew_trace.jsonl")
+# Agent roles as set in crew_company_search.create_agents, plus crewai's hierarchical manager
+AGENT_KEYS = {
+    "Research Specialist": "researcher",
+    "Contact Specialist": "contact_finder",
+    "Communications Expert": "writer",
+    "Crew Manager": "manager"
+}
+SEARCH_TOOL_NAMES = ("Search the internet with Serper",)
+
+_current_trace: contextvars.ContextVar[Optional["RunTrace"]] = contextvars.ContextVar(
+    "crew_run_trace", default=None
+)
+_trace_file_lock = threading.Lock()
+_listeners_registered = False
+_listeners_lock = threading.Lock()
+
+
+class StepMetrics(BaseModel):
+    wall_time: float = 0.0
+    llm_calls: int = 0
+    input_tokens: int = 0
+    # Input tokens read from the provider's prompt cache, included in input_tokens
+    cached_input_tokens: int = 0
+    output_tokens: int = 0
+    serper_calls: int = 0
+    retries: int = 0
+    hedges: int = 0
+    # Seconds spent waiting for the shared rate limits
+    queue_time: float = 0.0
+    # Reruns on a stronger model after the output failed validation
+    escalations: int = 0
+
+    def add(self, other: "StepMetrics") -> None:
+        for field in StepMetrics.model_fields:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+
+class RunMetrics(BaseModel):
+    """Aggregated metrics of one pipeline run, per agent and per task."""
+    run_id: str
+    wall_time: float = 0.0
+    # Search requests that actually reached Serper, i.e. search cache misses
+    serper_requests: int = 0
+    by_agent: Dict[str, StepMetrics] = Field(default_factory=dict)
+    by_task: Dict[str, StepMetrics] = Field(default_factory=dict)
+
+    def total(self) -> StepMetrics:
+        total = StepMetrics()
+        for metrics in self.by_task.values():
+            total.add(metrics)
+        total.wall_time = self.wall_time
+        return total
+
+
+def agent_key(role: Optional[str]) -> str:
+    return AGENT_KEYS.get(role or "", role or "unknown")
+
+
+def _tool_key(name: Optional[str]) -> str:
+    # Tool events may carry either the display name or its sanitized form
+    return re.sub(r"\W+", "_", (name or "").lower()).strip("_")
+
+
+_SEARCH_TOOL_KEYS = {_tool_key(name) for name in SEARCH_TOOL_NAMES}
+
+
+class RunTrace:
+    """
+    Collects wall time, LLM calls, tokens, Serper calls, retries and hedged
+    requests for one run, attributed to agents and tasks. LLM, tool and task
+    events come from crewai's event bus and are matched to the trace active
+    in the context that emitted them; every record is also appended to a
+    JSONL trace file.
+    """
+
+    def __init__(self, run_id: Optional[str] = None, path: Optional[str] = DEFAULT_TRACE_PATH):
+        _register_listeners()
+        self.metrics = RunMetrics(run_id=run_id or uuid.uuid4().hex)
+        self.path = path
+        self._lock = threading.Lock()
+        self._task_starts: Dict[str, float] = {}
+        self._started = time.time()
+
+    @property
+    def run_id(self) -> str:
+        return self.metrics.run_id
+
+    def record(self, event: str, agent: str, task: str, **values: Any) -> None:
+        """Add counters to an agent and a task, and log the event to the trace file."""
+        with self._lock:
+            for key, bucket in ((agent, self.metrics.by_agent), (task, self.metrics.by_task)):
+                step = bucket.setdefault(key, StepMetrics())
+                for field, value in values.items():
+                    if field in StepMetrics.model_fields:
+                        setattr(step, field, getattr(step, field) + value)
+        self._write({"event": event, "agent": agent, "task": task, **values})
+
+    def count_serper_request(self) -> None:
+        with self._lock:
+            self.metrics.serper_requests += 1
+        self._write({"event": "serper_request"})
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        if not self.path:
+            return
+        line = json.dumps({"run_id": self.run_id, "ts": time.time(), **record}, default=str)
+        with _trace_file_lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    @contextmanager
+    def activate(self):
+        """Make this the trace that events emitted in the current context count towards."""
+        token = _current_trace.set(self)
+        try:
+            yield self
+        finally:
+            _current_trace.reset(token)
+
+    @contextmanager
+    def span(self, agent: str, task: str):
+        """Time a block of work that crewai reports no task events for."""
+        started = time.time()
+        try:
+            yield
+        finally:
+            self.record("span", agent, task, wall_time=time.time() - started)
+
+    def finish(self) -> RunMetrics:
+        """Wait for pending event handlers, then return and log the run's metrics."""
+        from crewai.events import crewai_event_bus
+        crewai_event_bus.flush(timeout=5.0)
+        with self._lock:
+            self.metrics.wall_time = time.time() - self._started
+            summary = self.metrics.model_copy(deep=True)
+        self._write({"event": "summary", **summary.model_dump()})
+        return summary
+
+
+def current_trace() -> Optional[RunTrace]:
+    return _current_trace.get()
+
+
+def load_summaries(path: Optional[str] = DEFAULT_TRACE_PATH, limit: int = 50) -> List[RunMetrics]:
+    """Metrics of the most recent runs recorded in a trace file, oldest first."""
+    if not path or not os.path.exists(path):
+        return []
+    summaries: deque = deque(maxlen=limit)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if '"event": "summary"' not in line:
+                continue
+            try:
+                summaries.append(RunMetrics.model_validate_json(line))
+            except Exception:
+                continue
+    return list(summaries)
+
+
+def _usage_tokens(usage: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    usage = usage or {}
+    return {
+        "input_tokens": int(usage.get("input_tokens") or usage.get("prompt_tokens") or 0),
+        "cached_input_tokens": int(usage.get("cached_prompt_tokens") or 0),
+        "output_tokens": int(usage.get("output_tokens") or usage.get("completion_tokens") or 0)
+    }
+
+
+def _register_listeners() -> None:
+    """Subscribe to crewai's event bus once per process."""
+    global _listeners_registered
+    with _listeners_lock:
+        if _listeners_registered:
+            return
+        _listeners_registered = True
+
+    # crewai is only loaded once a run is traced, keeping this module cheap to import
+    from crewai.events import (
+        crewai_event_bus, LLMCallCompletedEvent, LLMCallFailedEvent,
+        TaskStartedEvent, TaskCompletedEvent, TaskFailedEvent,
+        ToolUsageFinishedEvent, ToolUsageErrorEvent
+    )
+
+    @crewai_event_bus.on(LLMCallCompletedEvent)
+    def on_llm_completed(source: Any, event: LLMCallCompletedEvent) -> None:
+        trace = current_trace()
+        if trace:
+            trace.record(
+                "llm_call", agent_key(event.agent_role), event.task_name or "unknown",
+                llm_calls=1, model=event.model, **_usage_tokens(event.usage)
+            )
+
+    @crewai_event_bus.on(LLMCallFailedEvent)
+    def on_llm_failed(source: Any, event: LLMCallFailedEvent) -> None:
+        trace = current_trace()
+        if trace:
+            trace.record(
+                "llm_error", agent_key(event.agent_role), event.task_name or "unknown",
+                retries=1, error=event.error
+            )
+
+    @crewai_event_bus.on(ToolUsageFinishedEvent)
+    def on_tool_finished(source: Any, event: ToolUsageFinishedEvent) -> None:
+        trace = current_trace()
+        if trace and _tool_key(event.tool_name) in _SEARCH_TOOL_KEYS:
+            trace.record(
+                "serper_call", agent_key(event.agent_role), event.task_name or "unknown",
+                serper_calls=1
+            )
+
+    @crewai_event_bus.on(ToolUsageErrorEvent)
+    def on_tool_error(source: Any, event: ToolUsageErrorEvent) -> None:
+        trace = current_trace()
+        if trace:
+            trace.record(
+                "tool_error", agent_key(event.agent_role), event.task_name or "unknown",
+                retries=1, tool=event.tool_name
+            )
+
+    @crewai_event_bus.on(TaskStartedEvent)
+    def on_task_started(source: Any, event: TaskStartedEvent) -> None:
+        trace = current_trace()
+        if trace and event.task_id:
+            with trace._lock:
+                trace._task_starts[event.task_id] = event.timestamp.timestamp()
+
+    def on_task_finished(source: Any, event: Any, outcome: str) -> None:
+        trace = current_trace()
+        if not trace or not event.task_id:
+            return
+        with trace._lock:
+            started = trace._task_starts.pop(event.task_id, None)
+        if started is not None:
+            # Task events are emitted by the task itself and carry no agent role
+            role = event.agent_role or getattr(getattr(source, "agent", None), "role", None)
+            trace.record(
+                f"task_{outcome}", agent_key(role), event.task_name or "unknown",
+                wall_time=event.timestamp.timestamp() - started
+            )
+
+    @crewai_event_bus.on(TaskCompletedEvent)
+    def on_task_completed(source: Any, event: TaskCompletedEvent) -> None:
+        on_task_finished(source, event, "completed")
+
+    @crewai_event_bus.on(TaskFailedEvent)
+    def on_task_failed(source: Any, event: TaskFailedEvent) -> None:
+        on_task_finished(source, event, "failed")
@@ -0,0 +1,132 @@
+import io
+import os
+import time
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+
+MAX_PDF_BYTES = int(os.getenv("CREW_MAX_PDF_BYTES", 10 * 1024 * 1024))
+# Pages read from a PDF; later pages are left out and reported as such
+MAX_PDF_PAGES = int(os.getenv("CREW_MAX_PDF_PAGES", 40))
+# Below this many pages the process pool costs more than it saves
+PARALLEL_PAGE_THRESHOLD = 8
+PAGES_PER_CHUNK = 4
+# Extracted text is kept in memory this long, by content hash, so a
+# resubmitted PDF is not parsed again; it is never written to disk
+TEXT_CACHE_TTL = float(os.getenv("CREW_PDF_TEXT_TTL", 600))
+TEXT_CACHE_ENTRIES = 64
+
+
+class PdfText(BaseModel):
+    """Text extracted from a PDF, with how many of its pages were read."""
+    text: str
+    pages: int
+    pages_read: int
+
+    @property
+    def truncated(self) -> bool:
+        return self.pages_read < self.pages
+
+
+_text_cache: "OrderedDict[str, Tuple[float, PdfText]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _extract_pages(data: bytes, start: int, stop: int) -> List[str]:
+    """Extract text from pages [start, stop) in a single pass over each page."""
+    # PyPDF2 is imported on first use so importing this module stays cheap
+    import PyPDF2
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    texts = []
+    for index in range(start, stop):
+        text = reader.pages[index].extract_text()
+        if text:
+            texts.append(text)
+    return texts
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn keeps workers from inheriting the app's threads and locks
+            _pool = ProcessPoolExecutor(
+                max_workers=min(4, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def extract_pdf(
+    data: bytes,
+    max_pages: int = MAX_PDF_PAGES,
+    max_bytes: int = MAX_PDF_BYTES
+) -> PdfText:
+    """
+    Extract the text of a PDF, caching the result in memory by content hash
+    for TEXT_CACHE_TTL seconds. Only the first max_pages pages are read;
+    long documents are split across worker processes since text extraction
+    is CPU bound.
+    """
+    import PyPDF2
+    if len(data) > max_bytes:
+        raise ValueError(f"PDF is larger than the {max_bytes / (1024 * 1024):.1f} MB limit")
+
+    key = f"{hashlib.sha256(data).hexdigest()}:{max_pages}"
+    now = time.monotonic()
+    with _cache_lock:
+        for stale in [cached for cached, (expires, _) in _text_cache.items() if expires <= now]:
+            del _text_cache[stale]
+        if key in _text_cache:
+            _text_cache.move_to_end(key)
+            return _text_cache[key][1]
+
+    pages = len(PyPDF2.PdfReader(io.BytesIO(data)).pages)
+    page_count = min(pages, max_pages)
+    if page_count < PARALLEL_PAGE_THRESHOLD:
+        texts = _extract_pages(data, 0, page_count)
+    else:
+        ranges = [
+            (start, min(start + PAGES_PER_CHUNK, page_count))
+            for start in range(0, page_count, PAGES_PER_CHUNK)
+        ]
+        try:
+            pool = _get_pool()
+            futures = [pool.submit(_extract_pages, data, start, stop) for start, stop in ranges]
+            texts = [text for future in futures for text in future.result()]
+        except BrokenProcessPool:
+            # Workers can die (e.g. OOM-killed); fall back to extracting in-process
+            _reset_pool()
+            texts = _extract_pages(data, 0, page_count)
+
+    extracted = PdfText(text="\n".join(texts), pages=pages, pages_read=page_count)
+    with _cache_lock:
+        _text_cache[key] = (time.monotonic() + TEXT_CACHE_TTL, extracted)
+        while len(_text_cache) > TEXT_CACHE_ENTRIES:
+            _text_cache.popitem(last=False)
+    return extracted
+
+
+def extract_pdf_text(
+    data: bytes,
+    max_pages: int = MAX_PDF_PAGES,
+    max_bytes: int = MAX_PDF_BYTES
+) -> str:
+    """Text of a PDF, see extract_pdf."""
+    return extract_pdf(data, max_pages, max_bytes).text
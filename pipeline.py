@@ -0,0 +1,737 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from crewai import Agent, Task, Crew, Process
+from pydantic import BaseModel
+
+from crew_company_search import (
+    get_agents, create_research_task, create_section_task, create_contacts_task,
+    create_email_task, initialize_crew, load_resume, parse_research_output,
+    parse_section_output, merge_research_sections, with_model, RESEARCH_SECTIONS, INDUSTRY_SECTIONS,
+    VERBOSE
+)
+from cache import ResearchCache, SectionCache, get_research_cache, get_section_cache, normalize_key_part
+from singleflight import SingleFlight
+from metrics import RunTrace, current_trace
+from models import ResearchOutput
+from repair import repair_section, repair_research, parse_partial_json, section_values
+from resilience import DeadlineExceeded, run_until, shared_deadline
+from routing import get_router
+from budget import RunBudget, DEFAULT_SLA_SECONDS, fallback_research, draft_email, record_degraded
+from results import PipelineResult, ProgressCallback, EXECUTION_MODES, DEFAULT_EXECUTION_MODE
+
+# "single" asks one call for the whole ResearchOutput; "sections" fans out per section
+RESEARCH_MODES = ("single", "sections")
+DEFAULT_RESEARCH_MODE = os.getenv("CREW_RESEARCH_MODE", "sections")
+SECTION_RETRIES = int(os.getenv("CREW_SECTION_RETRIES", 1))
+
+# Identical research and contact lookups in flight at the same time share one run
+research_flight = SingleFlight()
+contacts_flight = SingleFlight()
+
+# A DAG step: names of the steps it depends on, and a function receiving their results
+Step = Tuple[List[str], Callable[[Dict[str, Any]], Any]]
+
+
+def run_dag(
+    steps: Dict[str, Step],
+    max_workers: Optional[int] = None,
+    on_progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """
+    Run steps on a thread pool, starting each one as soon as all of its
+    dependencies have finished. Returns the result of every step by name.
+    on_progress is invoked from the calling thread as steps start and finish.
+    Steps run in a copy of the caller's context, so they report to its trace.
+    """
+    for name, (deps, _) in steps.items():
+        missing = [dep for dep in deps if dep not in steps]
+        if missing:
+            raise ValueError(f"Step '{name}' depends on unknown steps: {missing}")
+
+    results: Dict[str, Any] = {}
+    pending = dict(steps)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(steps) or 1) as pool:
+        while pending or running:
+            ready = [
+                name for name, (deps, _) in pending.items()
+                if all(dep in results for dep in deps)
+            ]
+            for name in ready:
+                deps, fn = pending.pop(name)
+                context = contextvars.copy_context()
+                running[pool.submit(context.run, fn, {dep: results[dep] for dep in deps})] = name
+                if on_progress:
+                    on_progress(name, "started", None)
+            if not running:
+                raise ValueError(f"Dependency cycle between steps: {sorted(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = future.result()
+                if on_progress:
+                    on_progress(name, "completed", results[name])
+    return results
+
+
+def run_task(agent: Agent, task: Task) -> str:
+    """Run a single task in its own sequential crew and return its raw output."""
+    crew = Crew(
+        agents=[agent],
+        tasks=[task],
+        process=Process.sequential,
+        verbose=VERBOSE
+    )
+    result = crew.kickoff()
+    return result.tasks_output[0].raw
+
+
+def to_research_output(raw: Optional[str]) -> Optional[ResearchOutput]:
+    """Validate raw research output, returning None when it does not match the schema."""
+    if not raw:
+        return None
+    try:
+        return ResearchOutput(**parse_research_output(raw))
+    except Exception:
+        return None
+
+
+def validate_research(
+    raw: Optional[str],
+    researcher: Agent,
+    company: str,
+    industry: str,
+    country: str,
+    pitching_role: str
+) -> Optional[ResearchOutput]:
+    """
+    Validate raw research output, re-asking the researcher only for the fields
+    that are missing or invalid. None when it cannot be repaired.
+    """
+    research = to_research_output(raw)
+    if research is not None or not raw:
+        return research
+    context = {
+        "company": company, "industry": industry, "country": country, "pitching_role": pitching_role
+    }
+    try:
+        return repair_research(raw, researcher, context)
+    except Exception:
+        return None
+
+
+def run_research_sections(
+    researcher: Agent,
+    company: str,
+    industry: str,
+    country: str,
+    pitching_role: str,
+    sections: Optional[List[str]] = None,
+    retries: int = SECTION_RETRIES,
+    on_progress: Optional[ProgressCallback] = None
+) -> Dict[str, BaseModel]:
+    """
+    Research each ResearchOutput section concurrently with its own focused prompt
+    and schema, on the model the router picks for it. A section that fails
+    validation first has only its invalid fields re-asked; if that fails too
+    it is rerun on the next stronger model, or retried on its own at the top
+    of its ladder, without redoing the sections that already succeeded.
+    """
+    context = {
+        "company": company, "industry": industry, "country": country, "pitching_role": pitching_role
+    }
+
+    def section_step(section: str) -> Callable[[Dict[str, Any]], BaseModel]:
+        def step(_: Dict[str, Any]) -> BaseModel:
+            router = get_router()
+            model = router.choose(f"research:{section}")
+            last_error = None
+            attempts = failures = 0
+            while failures <= retries:
+                attempts += 1
+                # Each concurrent section gets its own copy of the agent
+                agent = with_model(researcher.copy(), model)
+                task = create_section_task(agent, section, company, industry, country, pitching_role)
+                started = time.monotonic()
+                raw = None
+                try:
+                    raw = run_task(agent, task)
+                    try:
+                        value = parse_section_output(section, raw)
+                    except Exception:
+                        values = section_values(parse_partial_json(raw), section)
+                        value = repair_section(section, values, agent, context)
+                    if model:
+                        router.record(task.name, model, time.monotonic() - started, valid=True)
+                    return value
+                except DeadlineExceeded:
+                    # Out of time; another attempt could only run later still
+                    raise
+                except Exception as e:
+                    last_error = e
+                    stronger = None
+                    if raw is not None and model:
+                        # The output failed validation even after repair
+                        router.record(task.name, model, time.monotonic() - started, valid=False)
+                        stronger = router.escalate(task.name, model)
+                    trace = current_trace()
+                    if stronger:
+                        if trace:
+                            trace.record(
+                                "model_escalation", "researcher", task.name,
+                                escalations=1, model=stronger, error=str(e)
+                            )
+                        model = stronger
+                        continue
+                    failures += 1
+                    if trace and failures <= retries:
+                        trace.record(
+                            "section_retry", "researcher", task.name, retries=1, error=str(e)
+                        )
+            raise Exception(f"Section '{section}' failed after {attempts} attempts: {last_error}")
+        return step
+
+    def report(step: str, status: str, output: Any) -> None:
+        if on_progress:
+            on_progress(f"research:{step}", status, output)
+
+    return run_dag(
+        {section: ([], section_step(section)) for section in (sections or RESEARCH_SECTIONS)},
+        on_progress=report
+    )
+
+
+def _detached(on_progress: Optional[ProgressCallback]) -> Optional[ProgressCallback]:
+    """
+    A progress listener for work other callers may share: once the caller's
+    listener raises, e.g. because its job was cancelled, updates stop instead
+    of the error failing the shared run. The caller still stops at its own
+    next checkpoint outside the shared work.
+    """
+    if on_progress is None:
+        return None
+    failed = threading.Event()
+
+    def forward(step: str, status: str, output: Any) -> None:
+        if failed.is_set():
+            return
+        try:
+            on_progress(step, status, output)
+        except Exception:
+            failed.set()
+    return forward
+
+
+class _ProgressFanout:
+    """
+    Progress of shared runs by key, forwarded to every caller that joined
+    them; a caller joining late first receives the updates it missed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners: Dict[str, List[ProgressCallback]] = {}
+        self._updates: Dict[str, List[Tuple[str, str, Any]]] = {}
+
+    def join(self, key: str, listener: ProgressCallback) -> None:
+        with self._lock:
+            missed = list(self._updates.get(key, []))
+            self._listeners.setdefault(key, []).append(listener)
+        for update in missed:
+            listener(*update)
+
+    def leave(self, key: str, listener: ProgressCallback) -> None:
+        with self._lock:
+            listeners = self._listeners.get(key, [])
+            if listener in listeners:
+                listeners.remove(listener)
+            if not listeners:
+                self._listeners.pop(key, None)
+
+    def publisher(self, key: str) -> ProgressCallback:
+        """Listener for the run itself, starting its key afresh."""
+        with self._lock:
+            self._updates[key] = []
+
+        def publish(step: str, status: str, output: Any) -> None:
+            with self._lock:
+                self._updates.setdefault(key, []).append((step, status, output))
+                listeners = list(self._listeners.get(key, []))
+            for listener in listeners:
+                listener(step, status, output)
+        return publish
+
+    def finish(self, key: str) -> None:
+        with self._lock:
+            self._updates.pop(key, None)
+
+
+research_progress = _ProgressFanout()
+
+
+def research_company(
+    agents: Dict[str, Any],
+    company: str,
+    industry: str,
+    country: str,
+    pitching_role: str,
+    research_mode: str = DEFAULT_RESEARCH_MODE,
+    on_progress: Optional[ProgressCallback] = None,
+    section_cache: Optional[SectionCache] = None
+) -> str:
+    """
+    Run the research step in the given mode and return the raw research JSON.
+    In "sections" mode the industry/country sections are served from the shared
+    section cache when possible, so only company-specific sections are researched.
+    Concurrent calls for the same target are coalesced into a single run whose
+    per-section progress reaches every caller; a caller's listener failing
+    does not fail the run for the others. The run carries its own deadline
+    rather than a caller's, each bounding only its wait with run_until, and
+    caches valid research itself so callers that gave up do not lose it.
+    """
+    if research_mode not in RESEARCH_MODES:
+        raise ValueError(f"Unknown research mode '{research_mode}', expected one of {RESEARCH_MODES}")
+
+    key = f"{research_mode}|{ResearchCache.make_key(company, industry, country, pitching_role)}"
+
+    def run() -> str:
+        try:
+            raw = shared_deadline(lambda: _research_company(
+                agents, company, industry, country, pitching_role,
+                research_mode, research_progress.publisher(key), section_cache
+            ))
+        finally:
+            research_progress.finish(key)
+        research = to_research_output(raw)
+        if research is not None:
+            get_research_cache().set(company, industry, country, pitching_role, research)
+        return raw
+
+    listener = _detached(on_progress)
+    if listener:
+        research_progress.join(key, listener)
+    try:
+        return research_flight.do(key, run)
+    finally:
+        if listener:
+            research_progress.leave(key, listener)
+
+
+def _research_company(
+    agents: Dict[str, Any],
+    company: str,
+    industry: str,
+    country: str,
+    pitching_role: str,
+    research_mode: str,
+    on_progress: Optional[ProgressCallback],
+    section_cache: Optional[SectionCache]
+) -> str:
+    if research_mode == "sections":
+        section_cache = section_cache or get_section_cache()
+        shared = {}
+        for section in INDUSTRY_SECTIONS:
+            cached = section_cache.get(section, industry, country, RESEARCH_SECTIONS[section][1])
+            if cached is not None:
+                shared[section] = cached
+                if on_progress:
+                    on_progress(f"research:{section}", "completed", cached)
+
+        sections = run_research_sections(
+            agents["researcher"], company, industry, country, pitching_role,
+            sections=[section for section in RESEARCH_SECTIONS if section not in shared],
+            on_progress=on_progress
+        )
+        for section in INDUSTRY_SECTIONS:
+            if section in sections:
+                section_cache.set(section, industry, country, sections[section])
+        return merge_research_sections({**sections, **shared}).model_dump_json()
+
+    router = get_router()
+    model = router.choose("research")
+    while True:
+        researcher = with_model(agents["researcher"].copy(), model)
+        task = create_research_task(researcher, company, industry, country, pitching_role)
+        started = time.monotonic()
+        raw = run_task(researcher, task)
+        research = validate_research(raw, researcher, company, industry, country, pitching_role)
+        if not model:
+            break
+        router.record(task.name, model, time.monotonic() - started, valid=research is not None)
+        stronger = router.escalate(task.name, model) if research is None else None
+        if not stronger:
+            break
+        trace = current_trace()
+        if trace:
+            trace.record("model_escalation", "researcher", task.name, escalations=1, model=stronger)
+        model = stronger
+    # Research that cannot be repaired is still passed on raw, as context for the writer
+    return research.model_dump_json() if research is not None else raw
+
+
+def find_contacts(agents: Dict[str, Any], company: str, pitching_role: str, country: str) -> str:
+    """
+    Run the contact discovery task, coalescing identical concurrent lookups.
+    The shared lookup carries its own deadline, not a caller's; each bounds its wait.
+    """
+    key = "|".join(normalize_key_part(part) for part in (company, pitching_role, country))
+
+    def run() -> str:
+        task = create_contacts_task(agents["contact_finder"], company, pitching_role, country)
+        return run_task(agents["contact_finder"], task)
+
+    return contacts_flight.do(key, lambda: shared_deadline(run))
+
+
+def run_research(
+    anthropic_api_key: str,
+    serper_api_key: str,
+    company: str,
+    industry: str,
+    country: str,
+    pitching_role: str,
+    research_mode: str = DEFAULT_RESEARCH_MODE
+) -> ResearchOutput:
+    """Run only the research step and return its validated output."""
+    try:
+        if not anthropic_api_key or not serper_api_key:
+            raise ValueError("Missing required API keys")
+        agents = get_agents(anthropic_api_key, serper_api_key)
+        raw = research_company(agents, company, industry, country, pitching_role, research_mode)
+        return ResearchOutput(**parse_research_output(raw))
+    except Exception as e:
+        raise Exception(f"Error running research: {str(e)}")
+
+
+def _task_raw(task_output: Any) -> Optional[str]:
+    if isinstance(task_output, dict):
+        return task_output.get('output') or task_output.get('raw')
+    return getattr(task_output, 'raw', task_output)
+
+
+def _progress_output(step: str, output: Any) -> Any:
+    """Give progress listeners validated research where possible."""
+    if step == "research" and isinstance(output, str):
+        return to_research_output(output) or output
+    return output
+
+
+def _task_callback(
+    step: str,
+    outputs: Dict[str, Optional[str]],
+    on_progress: Optional[ProgressCallback]
+) -> Callable[[Any], None]:
+    def callback(task_output: Any) -> None:
+        outputs[step] = _task_raw(task_output)
+        if on_progress:
+            on_progress(step, "completed", _progress_output(step, outputs[step]))
+    return callback
+
+
+def _run_hierarchical(
+    anthropic_api_key: str,
+    serper_api_key: str,
+    inputs: Dict[str, str],
+    research_output: Optional[ResearchOutput],
+    resume_key: Optional[str],
+    on_progress: Optional[ProgressCallback],
+    budget: RunBudget
+) -> PipelineResult:
+    company = inputs.get("company", "")
+    industry = inputs.get("industry", "")
+    pitching_role = inputs.get("pitching_role", "")
+    country = inputs.get("country", "")
+    router = get_router()
+    models = {
+        name: model for name, model in (
+            ("researcher", router.choose("research")),
+            ("contact_finder", router.choose("contacts")),
+            ("writer", router.choose("email")),
+            ("manager_llm", router.choose("manager"))
+        ) if model
+    }
+    crew = initialize_crew(
+        anthropic_api_key=anthropic_api_key,
+        serper_api_key=serper_api_key,
+        company=inputs.get("company", ""),
+        industry=inputs.get("industry", ""),
+        pitching_role=inputs.get("pitching_role", ""),
+        country=inputs.get("country", ""),
+        outreach_purpose=inputs.get("outreach_purpose", ""),
+        research_output=research_output,
+        resume_key=resume_key,
+        models=models
+    )
+    if on_progress and research_output is not None:
+        on_progress("research", "completed", research_output)
+    # Outputs of the tasks finished so far, kept in case the crew runs out of time
+    outputs: Dict[str, Optional[str]] = {}
+    for task in crew.tasks:
+        if on_progress:
+            on_progress(task.name, "started", None)
+        task.callback = _task_callback(task.name, outputs, on_progress)
+
+    trace = current_trace()
+    degraded: Dict[str, str] = {}
+    try:
+        # The manager coordinates the whole crew; its wall time is the kickoff's
+        with trace.span("manager", "crew") if trace else nullcontext():
+            result = run_until(lambda: crew.kickoff(inputs=inputs), budget.deadline("email"))
+        for task, task_output in zip(crew.tasks, result.tasks_output or []):
+            outputs[task.name] = _task_raw(task_output)
+    except Exception as e:
+        if not budget.out_of_time("email", e):
+            raise
+    agents = get_agents(anthropic_api_key, serper_api_key)
+    with_model(agents["writer"], models.get("writer"))
+
+    research_raw = outputs.get("research")
+    if research_output is not None:
+        research = research_output
+    else:
+        model = models.get("researcher")
+        research = validate_research(
+            research_raw, with_model(agents["researcher"], model), company, industry, country, pitching_role
+        )
+        if research_raw is not None and model:
+            # The crew has already run, so escalating only repairs the output with the stronger model
+            router.record("research", model, valid=research is not None)
+            stronger = router.escalate("research", model) if research is None else None
+            if stronger:
+                if trace:
+                    trace.record("model_escalation", "researcher", "research", escalations=1, model=stronger)
+                research = validate_research(
+                    research_raw, with_model(agents["researcher"], stronger),
+                    company, industry, country, pitching_role
+                )
+        if research is None and research_raw is None:
+            # Drafting needs time the crew has used up, so only cached research can stand in
+            research, research_raw = fallback_research(
+                anthropic_api_key, agents["researcher"], {}, company, industry, country,
+                pitching_role, budget.deadline("research_fallback"), degraded
+            )
+    contacts = outputs.get("contacts")
+    if contacts is None:
+        record_degraded(degraded, "contacts", "left out, contact search ran out of time")
+    email = outputs.get("email")
+    if email is None:
+        email = _fallback_email(
+            anthropic_api_key, agents["writer"], company, country, research, research_raw,
+            contacts, resume_key, budget, degraded
+        )
+
+    return PipelineResult(
+        research=research,
+        research_raw=research_raw if research_output is None else None,
+        research_cached=research_output is not None,
+        contacts=contacts,
+        email=email,
+        mode="hierarchical",
+        degraded=degraded
+    )
+
+
+def _fallback_email(
+    anthropic_api_key: str,
+    writer: Agent,
+    company: str,
+    country: str,
+    research: Optional[ResearchOutput],
+    research_raw: Optional[str],
+    contacts: Optional[str],
+    resume_key: Optional[str],
+    budget: RunBudget,
+    degraded: Dict[str, str]
+) -> Optional[str]:
+    """A Haiku draft standing in for an email the writer did not finish in time."""
+    try:
+        email = draft_email(
+            anthropic_api_key, writer, company, country, research, research_raw, contacts,
+            resume_key, budget.deadline("email_fallback")
+        )
+    except Exception:
+        email = None
+    if email:
+        record_degraded(degraded, "email", "quick Haiku draft, not written by the writer agent")
+    else:
+        record_degraded(degraded, "email", "left out, email writing ran out of time")
+    return email
+
+
+def _run_dag(
+    anthropic_api_key: str,
+    serper_api_key: str,
+    inputs: Dict[str, str],
+    research_output: Optional[ResearchOutput],
+    resume_key: Optional[str],
+    research_mode: str,
+    on_progress: Optional[ProgressCallback],
+    budget: RunBudget
+) -> PipelineResult:
+    company = inputs.get("company", "")
+    industry = inputs.get("industry", "")
+    pitching_role = inputs.get("pitching_role", "")
+    country = inputs.get("country", "")
+
+    load_resume(resume_key)
+    agents = get_agents(anthropic_api_key, serper_api_key)
+    degraded: Dict[str, str] = {}
+    # Research is routed per section; contacts and email have no validation to
+    # escalate on, so they run on the model picked up front
+    router = get_router()
+    models = {"contacts": router.choose("contacts"), "email": router.choose("email")}
+    with_model(agents["contact_finder"], models["contacts"])
+    with_model(agents["writer"], models["email"])
+
+    def timed(step: str, fn: Callable[[], Any]) -> Any:
+        started = time.monotonic()
+        output = fn()
+        if models[step]:
+            router.record(step, models[step], time.monotonic() - started)
+        return output
+
+    def research_step(_: Dict[str, Any]) -> Optional[str]:
+        if research_output is not None:
+            return None
+        # Sections finished so far, kept in case research runs out of time
+        completed: Dict[str, BaseModel] = {}
+        given_up = threading.Event()
+
+        def track(step: str, status: str, output: Any) -> None:
+            if given_up.is_set():
+                return
+            if status == "completed" and isinstance(output, BaseModel):
+                completed[step.split(":", 1)[-1]] = output
+            if on_progress:
+                on_progress(step, status, output)
+
+        try:
+            return run_until(lambda: research_company(
+                agents, company, industry, country, pitching_role,
+                research_mode=research_mode,
+                on_progress=track
+            ), budget.deadline("research"))
+        except Exception as e:
+            if not budget.out_of_time("research", e):
+                raise
+            given_up.set()
+        _, raw = fallback_research(
+            anthropic_api_key, agents["researcher"], completed, company, industry, country,
+            pitching_role, budget.deadline("research_fallback"), degraded
+        )
+        return raw
+
+    def contacts_step(_: Dict[str, Any]) -> Optional[str]:
+        try:
+            return run_until(
+                lambda: timed("contacts", lambda: find_contacts(agents, company, pitching_role, country)),
+                budget.deadline("contacts")
+            )
+        except Exception as e:
+            if not budget.out_of_time("contacts", e):
+                raise
+        record_degraded(degraded, "contacts", "left out, contact search ran out of time")
+        return None
+
+    def email_step(upstream: Dict[str, Any]) -> Optional[str]:
+        research = research_output or to_research_output(upstream["research"])
+        task = create_email_task(
+            agents["writer"], company, country,
+            research_output=research,
+            contacts_output=upstream["contacts"],
+            resume_key=resume_key
+        )
+        if research is None and upstream["research"]:
+            # Unvalidated research is still useful context for the writer
+            task.request_context += f"\n\nCompany and industry research:\n{upstream['research']}"
+        try:
+            return run_until(
+                lambda: timed("email", lambda: run_task(agents["writer"], task)), budget.deadline("email")
+            )
+        except Exception as e:
+            if not budget.out_of_time("email", e):
+                raise
+        return _fallback_email(
+            anthropic_api_key, agents["writer"], company, country, research, upstream["research"],
+            upstream["contacts"], resume_key, budget, degraded
+        )
+
+    def report(step: str, status: str, output: Any) -> None:
+        if not on_progress:
+            return
+        if step == "research" and research_output is not None:
+            output = research_output if status == "completed" else None
+        on_progress(step, status, _progress_output(step, output))
+
+    results = run_dag({
+        "research": ([], research_step),
+        "contacts": ([], contacts_step),
+        "email": (["research", "contacts"], email_step)
+    }, on_progress=report)
+
+    research_raw = results["research"]
+    return PipelineResult(
+        research=research_output or to_research_output(research_raw),
+        research_raw=research_raw,
+        research_cached=research_output is not None,
+        contacts=results["contacts"],
+        email=results["email"],
+        mode="dag",
+        degraded=degraded
+    )
+
+
+def run_pipeline(
+    anthropic_api_key: str,
+    serper_api_key: str,
+    inputs: Dict[str, str],
+    research_output: Optional[ResearchOutput] = None,
+    mode: str = DEFAULT_EXECUTION_MODE,
+    on_progress: Optional[ProgressCallback] = None,
+    resume_key: Optional[str] = None,
+    research_mode: str = DEFAULT_RESEARCH_MODE,
+    sla_seconds: Optional[float] = DEFAULT_SLA_SECONDS
+) -> PipelineResult:
+    """
+    Generate research, contacts and an outreach email.
+    "dag" runs research and contact discovery concurrently and starts the email as
+    soon as both are ready; "hierarchical" runs the original manager-led crew.
+    on_progress, if given, is told when each of research, contacts and email
+    starts and completes, along with the step's output.
+    resume_key identifies the candidate's resume in the in-memory resume store.
+    research_mode selects single-call or per-section research in "dag" mode.
+    sla_seconds bounds the run end to end, split into per-step budgets; a step
+    that runs out of time falls back to cached research, the sections finished
+    so far or a Haiku draft, and the result's degraded lists what did.
+    The result carries the run's metrics, which are also written to the trace file.
+    """
+    try:
+        if not anthropic_api_key or not serper_api_key:
+            raise ValueError("Missing required API keys")
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{mode}', expected one of {EXECUTION_MODES}")
+
+        trace = RunTrace()
+        budget = RunBudget(sla_seconds)
+        with trace.activate():
+            if mode == "hierarchical":
+                result = _run_hierarchical(
+                    anthropic_api_key, serper_api_key, inputs, research_output, resume_key,
+                    on_progress, budget
+                )
+            else:
+                result = _run_dag(
+                    anthropic_api_key, serper_api_key, inputs, research_output, resume_key,
+                    research_mode, on_progress, budget
+                )
+        result.metrics = trace.finish()
+        return result
+    except Exception as e:
+        raise Exception(f"Error running pipeline: {str(e)}")
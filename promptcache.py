@@ -0,0 +1,187 @@
+import os
+import time
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from crewai.llms.cache import CACHE_BREAKPOINT_KEY
+from pydantic import BaseModel
+
+from llmwrap import wrap_llm, bind_call
+from ratelimit import CHARS_PER_TOKEN
+
+# Send task prompts as a static prefix and a per-request suffix, each cached
+# by the provider; CREW_PROMPT_CACHE=0 sends them whole
+PROMPT_CACHE_ENABLED = os.getenv("CREW_PROMPT_CACHE", "1") == "1"
+# Where crewai's task prompt ends and the context the task was given starts
+# (its "task_with_context" prompt slice); everything before it is static
+CONTEXT_MARKER = "\n\nThis is the context you're working with:\n"
+# Lifetime of Anthropic's ephemeral cache entries; every read extends it
+CACHE_TTL_SECONDS = 300
+# Shortest prefix Anthropic caches, in tokens; shorter breakpoints are ignored
+MIN_CACHEABLE_TOKENS = {"claude-3-haiku-20240307": 2048}
+DEFAULT_MIN_CACHEABLE_TOKENS = 1024
+
+
+def split_task_prompt(messages: Any) -> Any:
+    """
+    Messages with each task prompt crewai marks for caching split in two at
+    its context: the static instructions, output schema included, and the
+    per-request context after them, both kept as cache breakpoints. The
+    first is reused across runs; the whole prompt across the task's turns.
+    """
+    if isinstance(messages, str):
+        return messages
+    split: List[Any] = []
+    for message in messages:
+        content = message.get("content") if isinstance(message, dict) else None
+        if (
+            message.get("role") == "user" and message.get(CACHE_BREAKPOINT_KEY)
+            and isinstance(content, str) and CONTEXT_MARKER in content
+        ):
+            prefix, suffix = content.split(CONTEXT_MARKER, 1)
+            split.append({**message, "content": prefix + CONTEXT_MARKER})
+            split.append({**message, "content": suffix})
+        else:
+            split.append(message)
+    return split
+
+
+class _PromptCachedLLMMixin:
+    """Sends task prompts as a cacheable static prefix and a variable suffix."""
+
+    def call(self, *args: Any, **kwargs: Any) -> Any:
+        if not PROMPT_CACHE_ENABLED:
+            return super().call(*args, **kwargs)
+        bound = bind_call(self, args, kwargs)
+        bound.arguments["messages"] = split_task_prompt(bound.arguments.get("messages"))
+        return super().call(*bound.args, **bound.kwargs)
+
+
+def prompt_cached_llm(llm: Any) -> Any:
+    """Make an LLM send cacheable task prompts, keeping its provider-specific behaviour."""
+    return wrap_llm(llm, _PromptCachedLLMMixin)
+
+
+class CacheUsage(BaseModel):
+    """Prompt bytes of one request, and how many were read from or written to the cache."""
+    prompt_bytes: int = 0
+    read_bytes: int = 0
+    written_bytes: int = 0
+
+
+class PrefixStats(BaseModel):
+    """A cached prompt prefix: its length, reads so far and where it ends."""
+    label: str
+    length: int
+    reads: int = 0
+    tail: str = ""
+
+
+def content_text(content: Any) -> str:
+    """Text of a message's content, whether a string or a list of content blocks."""
+    if isinstance(content, list):
+        return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+    return str(content or "")
+
+
+def _breakpoints(messages: Any) -> Tuple[bytes, List[int]]:
+    """
+    A request as Anthropic reads it for caching, system prompt first, and
+    the byte offsets it may be cached up to: the end of the system prompt
+    and of marked user messages, as crewai stamps them, or of blocks that
+    carry cache_control themselves.
+    """
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    ordered = [m for m in messages if m.get("role") == "system"] + [m for m in messages if m.get("role") != "system"]
+    prompt = b""
+    offsets: List[int] = []
+    for message in ordered:
+        content = message.get("content")
+        prompt += f"{message.get('role')}:{content_text(content)}\n".encode()
+        marked = message.get(CACHE_BREAKPOINT_KEY) and message.get("role") in ("system", "user")
+        if marked or (isinstance(content, list) and any(
+            isinstance(block, dict) and block.get("cache_control") for block in content
+        )):
+            offsets.append(len(prompt))
+    return prompt, offsets
+
+
+class LocalPromptCache:
+    """
+    Offline stand-in for Anthropic's prompt cache, showing which prompt bytes
+    runs reuse. The bytes up to each cache breakpoint of a request are hashed
+    per model; the longest prefix cached within the TTL is read and the
+    breakpoints past it that are long enough to cache are written, as the
+    provider bills them. Each cached prefix keeps its reads and last bytes,
+    so a report shows exactly where reuse stops.
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, PrefixStats]] = {}
+        self._usage: Dict[str, CacheUsage] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def min_bytes(model: str) -> int:
+        tokens = MIN_CACHEABLE_TOKENS.get((model or "").split("/")[-1], DEFAULT_MIN_CACHEABLE_TOKENS)
+        return tokens * CHARS_PER_TOKEN
+
+    def lookup(self, model: str, messages: Any, label: str = "") -> CacheUsage:
+        """Serve one request from the cache, counting it under label (e.g. its task)."""
+        prompt, offsets = _breakpoints(messages)
+        cacheable = [offset for offset in offsets if offset >= self.min_bytes(model)]
+        keys = [hashlib.sha256((model or "").encode() + b"\0" + prompt[:offset]).hexdigest() for offset in cacheable]
+        now = time.monotonic()
+        usage = CacheUsage(prompt_bytes=len(prompt))
+        with self._lock:
+            self._entries = {key: entry for key, entry in self._entries.items() if entry[0] > now}
+            hit = next((index for index in reversed(range(len(keys))) if keys[index] in self._entries), None)
+            if hit is not None:
+                stats = self._entries[keys[hit]][1]
+                stats.reads += 1
+                self._entries[keys[hit]] = (now + self.ttl, stats)
+                usage.read_bytes = cacheable[hit]
+            for index in range((hit + 1) if hit is not None else 0, len(keys)):
+                tail = prompt[:cacheable[index]][-80:].decode(errors="replace")
+                self._entries[keys[index]] = (
+                    now + self.ttl, PrefixStats(label=label, length=cacheable[index], tail=tail)
+                )
+                usage.written_bytes = cacheable[index] - usage.read_bytes
+            total = self._usage.setdefault(label, CacheUsage())
+            for field in CacheUsage.model_fields:
+                setattr(total, field, getattr(total, field) + getattr(usage, field))
+        return usage
+
+    def usage(self) -> Dict[str, CacheUsage]:
+        """Prompt bytes sent, read and written per label so far."""
+        with self._lock:
+            return {label: usage.model_copy() for label, usage in self._usage.items()}
+
+    def prefixes(self) -> List[PrefixStats]:
+        """Live cached prefixes, most read first."""
+        with self._lock:
+            entries = [stats.model_copy() for _, stats in self._entries.values()]
+        return sorted(entries, key=lambda stats: (-stats.reads, stats.label, stats.length))
+
+
+_local_prompt_cache: Optional[LocalPromptCache] = None
+_local_prompt_cache_lock = threading.Lock()
+
+
+def get_local_prompt_cache() -> LocalPromptCache:
+    """Process-wide prompt cache stand-in shared by the offline LLMs."""
+    global _local_prompt_cache
+    with _local_prompt_cache_lock:
+        if _local_prompt_cache is None:
+            _local_prompt_cache = LocalPromptCache()
+        return _local_prompt_cache
+
+
+def set_local_prompt_cache(cache: Optional[LocalPromptCache] = None) -> None:
+    """Swap the process-wide prompt cache stand-in; None starts an empty one on next use."""
+    global _local_prompt_cache
+    with _local_prompt_cache_lock:
+        _local_prompt_cache = cache
@@ -0,0 +1,324 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from metrics import current_trace, agent_key
+from resilience import DeadlineExceeded, current_deadline
+from llmwrap import wrap_llm, bind_call
+
+# SQLite file holding the buckets so several processes share one budget;
+# empty keeps them in this process only
+DEFAULT_RATE_LIMIT_PATH = os.getenv("CREW_RATE_LIMIT_PATH", "")
+# Longest sleep between checks of a shared bucket that other processes also drain
+SHARED_POLL_SECONDS = 0.25
+# Rough characters per token, to budget tokens before the provider reports usage
+CHARS_PER_TOKEN = 4
+
+
+class RateLimit(BaseModel):
+    """
+    Quota of one provider or model. burst is how many requests may go out at
+    once after a quiet period; tokens may burst up to a full minute's worth.
+    tokens_per_minute is one budget that prompt and response tokens are both
+    charged to, although Anthropic limits input and output tokens separately:
+    set it to what the two combined should stay under.
+    """
+    requests_per_second: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+    burst: Optional[float] = None
+
+
+# Anthropic's default tier limits for the crew's models, and Serper's per-second cap;
+# override with CREW_RATE_LIMITS='{"claude-3-haiku-20240307": {"requests_per_second": 2}}'
+DEFAULT_LIMITS: Dict[str, RateLimit] = {
+    "claude-3-sonnet-20240229": RateLimit(requests_per_second=50 / 60, tokens_per_minute=40000, burst=50),
+    "claude-3-haiku-20240307": RateLimit(requests_per_second=50 / 60, tokens_per_minute=50000, burst=50),
+    "serper": RateLimit(requests_per_second=5, burst=5)
+}
+
+
+def limits_from_env() -> Dict[str, RateLimit]:
+    """DEFAULT_LIMITS with the CREW_RATE_LIMITS JSON overrides applied; null removes a limit."""
+    limits = dict(DEFAULT_LIMITS)
+    overrides = os.getenv("CREW_RATE_LIMITS")
+    if not overrides:
+        return limits
+    try:
+        for name, limit in json.loads(overrides).items():
+            if limit is None:
+                limits.pop(name, None)
+            else:
+                limits[name] = RateLimit.model_validate(limit)
+    except Exception as e:
+        raise Exception(f"Error parsing CREW_RATE_LIMITS: {str(e)}")
+    return limits
+
+
+def estimate_tokens(value: Any) -> int:
+    """Token estimate of a prompt or response, from its length."""
+    if isinstance(value, list):
+        value = "\n".join(str(item.get("content", "")) if isinstance(item, dict) else str(item) for item in value)
+    return len(str(value or "")) // CHARS_PER_TOKEN
+
+
+# A bucket draw: (bucket key, amount, refill per second, capacity)
+Draw = Tuple[str, float, float, float]
+
+
+class MemoryBucketStore:
+    """Token buckets held in this process."""
+
+    shared = False
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def _level(self, key: str, rate: float, capacity: float, now: float) -> float:
+        level, updated = self._buckets.get(key, (capacity, now))
+        return min(capacity, level + (now - updated) * rate)
+
+    def take(self, draws: List[Draw]) -> float:
+        """
+        Take every draw at once if all buckets hold enough, returning 0.
+        Otherwise take nothing and return the seconds until they would.
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = {key: self._level(key, rate, capacity, now) for key, _, rate, capacity in draws}
+            wait = max(
+                ((amount - levels[key]) / rate for key, amount, rate, _ in draws if levels[key] < amount),
+                default=0.0
+            )
+            if wait <= 0:
+                for key, amount, _, _ in draws:
+                    self._buckets[key] = (levels[key] - amount, now)
+            return max(0.0, wait)
+
+    def debit(self, key: str, amount: float, rate: float, capacity: float) -> None:
+        """Charge usage found out after the fact; the bucket may go into debt."""
+        now = time.monotonic()
+        with self._lock:
+            level = self._level(key, rate, capacity, now)
+            self._buckets[key] = (max(-capacity, level - amount), now)
+
+
+class SQLiteBucketStore:
+    """Token buckets in a SQLite table, shared by every process using the same file."""
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # Autocommit, so each draw runs in its own BEGIN IMMEDIATE transaction
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_buckets (
+                    key TEXT PRIMARY KEY,
+                    level REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def _levels(self, draws: List[Draw], now: float) -> Dict[str, float]:
+        keys = [key for key, _, _, _ in draws]
+        rows = dict(
+            (key, (level, updated)) for key, level, updated in self._conn.execute(
+                f"SELECT key, level, updated_at FROM rate_buckets WHERE key IN ({','.join('?' * len(keys))})",
+                keys
+            )
+        )
+        levels = {}
+        for key, _, rate, capacity in draws:
+            level, updated = rows.get(key, (capacity, now))
+            levels[key] = min(capacity, level + max(0.0, now - updated) * rate)
+        return levels
+
+    def _write(self, levels: Dict[str, float], now: float) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO rate_buckets (key, level, updated_at) VALUES (?, ?, ?)",
+            [(key, level, now) for key, level in levels.items()]
+        )
+
+    def take(self, draws: List[Draw]) -> float:
+        """Same contract as MemoryBucketStore.take, atomic across processes."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                levels = self._levels(draws, now)
+                wait = max(
+                    ((amount - levels[key]) / rate for key, amount, rate, _ in draws if levels[key] < amount),
+                    default=0.0
+                )
+                if wait <= 0:
+                    self._write({key: levels[key] - amount for key, amount, _, _ in draws}, now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return max(0.0, wait)
+
+    def debit(self, key: str, amount: float, rate: float, capacity: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                level = self._levels([(key, amount, rate, capacity)], now)[key]
+                self._write({key: max(-capacity, level - amount)}, now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+class RateLimiter:
+    """
+    Requests per second and tokens per minute per provider or model, from
+    token buckets. Callers over the limit wait instead of failing, served
+    first come, first served per provider or model, so a burst from one
+    session cannot starve the others. Unlisted names are not limited.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, RateLimit]] = None,
+        path: Optional[str] = DEFAULT_RATE_LIMIT_PATH
+    ):
+        self.limits = limits_from_env() if limits is None else limits
+        self.store = SQLiteBucketStore(path) if path else MemoryBucketStore()
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Tuple[threading.Condition, deque]] = {}
+
+    def limit_for(self, name: str) -> Optional[RateLimit]:
+        # Models are listed without their provider prefix, e.g. "anthropic/"
+        return self.limits.get(name) or self.limits.get(name.split("/")[-1])
+
+    def _draws(self, name: str, limit: RateLimit, tokens: float) -> List[Draw]:
+        draws = []
+        if limit.requests_per_second:
+            burst = max(1.0, limit.burst or limit.requests_per_second)
+            draws.append((f"{name}:requests", 1.0, limit.requests_per_second, burst))
+        if limit.tokens_per_minute and tokens > 0:
+            # A request larger than the bucket would wait forever; it takes the whole bucket instead
+            draws.append((
+                f"{name}:tokens", min(tokens, limit.tokens_per_minute),
+                limit.tokens_per_minute / 60, limit.tokens_per_minute
+            ))
+        return draws
+
+    def _queue(self, name: str) -> Tuple[threading.Condition, deque]:
+        with self._lock:
+            if name not in self._queues:
+                self._queues[name] = (threading.Condition(), deque())
+            return self._queues[name]
+
+    def acquire(self, name: str, tokens: float = 0) -> float:
+        """
+        Wait for one request and tokens under name's limits; returns the
+        seconds spent waiting, 0 when the request could go out at once.
+        Raises DeadlineExceeded when the wait would outlast the deadline of
+        the LLM call being made.
+        """
+        limit = self.limit_for(name)
+        if limit is None:
+            return 0.0
+        draws = self._draws(name.split("/")[-1], limit, tokens)
+        if not draws:
+            return 0.0
+
+        started = time.monotonic()
+        deadline = current_deadline()
+        condition, queue = self._queue(name)
+        ticket = object()
+        with condition:
+            queue.append(ticket)
+            queued = len(queue) > 1
+            try:
+                while queue[0] is not ticket:
+                    if not condition.wait(None if deadline is None else max(0.0, deadline - time.monotonic())):
+                        raise DeadlineExceeded(f"Timed out queueing for the {name} rate limit")
+            except BaseException:
+                queue.remove(ticket)
+                condition.notify_all()
+                raise
+
+        # Only the head of the queue draws from the buckets
+        try:
+            while True:
+                wait = self.store.take(draws)
+                if wait <= 0:
+                    return time.monotonic() - started if queued else 0.0
+                queued = True
+                if deadline is not None and time.monotonic() + wait > deadline:
+                    raise DeadlineExceeded(f"The {name} rate limit would hold this call past its deadline")
+                time.sleep(min(wait, SHARED_POLL_SECONDS) if self.store.shared else wait)
+        finally:
+            with condition:
+                queue.remove(ticket)
+                condition.notify_all()
+
+    def record_usage(self, name: str, tokens: float) -> None:
+        """Charge tokens only known once a call returns, such as the response."""
+        limit = self.limit_for(name)
+        if limit is None or not limit.tokens_per_minute or tokens <= 0:
+            return
+        self.store.debit(
+            f"{name.split('/')[-1]}:tokens", tokens, limit.tokens_per_minute / 60, limit.tokens_per_minute
+        )
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide rate limiter shared by every LLM client and search tool."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
+
+
+def set_rate_limiter(limiter: Optional[RateLimiter] = None) -> None:
+    """Swap the process-wide rate limiter; None rebuilds the default one on next use."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = limiter
+
+
+class _RateLimitedLLMMixin:
+    """Waits for the model's rate limits before each request and charges its tokens."""
+
+    def call(self, *args: Any, **kwargs: Any) -> Any:
+        if not getattr(self, "rate_limited", True):
+            return super().call(*args, **kwargs)
+
+        arguments = bind_call(self, args, kwargs).arguments
+        limiter = get_rate_limiter()
+        waited = limiter.acquire(self.model, estimate_tokens(arguments.get("messages")))
+        if waited > 0:
+            trace = current_trace()
+            if trace:
+                trace.record(
+                    "rate_limited", agent_key(getattr(arguments.get("from_agent"), "role", None)),
+                    getattr(arguments.get("from_task"), "name", None) or "unknown", queue_time=waited
+                )
+        response = super().call(*args, **kwargs)
+        limiter.record_usage(self.model, estimate_tokens(response))
+        return response
+
+
+def rate_limited_llm(llm: Any) -> Any:
+    """Make an LLM respect the shared rate limits, keeping its provider-specific behaviour."""
+    return wrap_llm(llm, _RateLimitedLLMMixin)
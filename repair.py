@@ -0,0 +1,244 @@
+import os
+import re
+import json
+import contextvars
+from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Type, get_args, get_origin
+
+from pydantic import BaseModel, ValidationError
+
+from crew_company_search import RESEARCH_SECTIONS, merge_research_sections
+from metrics import current_trace
+from models import ResearchOutput
+
+# Targeted re-asks per section before giving up on its invalid fields
+REPAIR_ROUNDS = int(os.getenv("CREW_REPAIR_ROUNDS", 2))
+# Cut points tried, from the end, when closing a truncated JSON object
+MAX_JSON_CUTS = 200
+
+REPAIR_PROMPT_TEMPLATE = """You are completing part of a {model_name} JSON object in research about {company}, \
+a company in the {industry} industry, for someone pitching for a {pitching_role} role in {country}.
+
+Return only a JSON object with exactly these fields of {model_name}: {field_names}
+{field_specs}
+
+Problems with the previous values:
+{problems}
+
+These fields are already valid. They are context only, do not return them:
+{valid_json}
+
+Reply with the JSON object alone, no other text."""
+DRAFT_PROMPT_TEMPLATE = """Write a quick first draft of the {model_name} part of research about {company}, \
+a company in the {industry} industry, for someone pitching for a {pitching_role} role in {country}.
+Use what you already know; keep each value short and say so where you are unsure.
+
+Return only a JSON object with exactly these fields of {model_name}: {field_names}
+{field_specs}
+
+Reply with the JSON object alone, no other text."""
+# Lets stand-in LLMs recognize a repair or draft request and which fields it asks for
+REPAIR_FIELDS_PATTERN = re.compile(r"exactly these fields of (\w+): ([\w, ]+)")
+
+
+def parse_partial_json(text: Any) -> Dict[str, Any]:
+    """
+    The JSON object in an LLM reply, tolerating surrounding prose, code fences
+    and truncation: an unterminated object is cut back to its last complete
+    value and closed. Returns {} when no object can be recovered.
+    """
+    if isinstance(text, dict):
+        return text
+    if not isinstance(text, str):
+        return {}
+    start = text.find("{")
+    if start < 0:
+        return {}
+    text = text[start:]
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text)
+        return value if isinstance(value, dict) else {}
+    except json.JSONDecodeError:
+        pass
+
+    closers: List[str] = []
+    cuts: List[Tuple[int, str]] = []
+    in_string = escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                cuts.append((index + 1, "".join(reversed(closers))))
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if not closers:
+                break
+            closers.pop()
+            cuts.append((index + 1, "".join(reversed(closers))))
+            if not closers:
+                break
+        elif char == ",":
+            cuts.append((index, "".join(reversed(closers))))
+
+    for end, closing in reversed(cuts[-MAX_JSON_CUTS:]):
+        try:
+            value = json.loads(text[:end] + closing)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, dict):
+            return value
+    return {}
+
+
+def section_values(data: Dict[str, Any], section: str) -> Dict[str, Any]:
+    """A section's fields from a full ResearchOutput, a flattened one, or the section itself."""
+    parent, model, _ = RESEARCH_SECTIONS[section]
+    group = data.get(parent)
+    values = group.get(section) if isinstance(group, dict) else None
+    if values is None:
+        values = data.get(section)
+    if values is None and any(name in data for name in model.model_fields):
+        values = data
+    return values if isinstance(values, dict) else {}
+
+
+def check_section(
+    model: Type[BaseModel],
+    values: Dict[str, Any]
+) -> Tuple[Optional[BaseModel], Dict[str, Any], Dict[str, str]]:
+    """Validate a section: (instance or None, valid fields, invalid fields with their problem)."""
+    try:
+        return model.model_validate(values), values, {}
+    except ValidationError as e:
+        invalid: Dict[str, str] = {}
+        for error in e.errors():
+            field = str(error["loc"][0]) if error["loc"] else "value"
+            invalid.setdefault(field, error["msg"])
+        valid = {
+            name: value for name, value in values.items()
+            if name in model.model_fields and name not in invalid
+        }
+        return None, valid, invalid
+
+
+def _field_spec(model: Type[BaseModel], name: str) -> str:
+    field = model.model_fields[name]
+    annotation = field.annotation
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        kind = "one of " + ", ".join(json.dumps(member.value) for member in annotation)
+    elif get_origin(annotation) in (list, List):
+        item = (get_args(annotation) or (str,))[0]
+        kind = f"list of {getattr(item, '__name__', 'str')}"
+    else:
+        kind = getattr(annotation, "__name__", "str")
+    description = f" - {field.description}" if field.description else ""
+    return f"- {name} ({kind}){description}"
+
+
+def repair_prompt(
+    model: Type[BaseModel],
+    valid: Dict[str, Any],
+    invalid: Dict[str, str],
+    context: Dict[str, str]
+) -> str:
+    fields = [name for name in model.model_fields if name in invalid]
+    return REPAIR_PROMPT_TEMPLATE.format(
+        model_name=model.__name__,
+        company=context.get("company", ""),
+        industry=context.get("industry", ""),
+        country=context.get("country", ""),
+        pitching_role=context.get("pitching_role", ""),
+        field_names=", ".join(fields),
+        field_specs="\n".join(_field_spec(model, name) for name in fields),
+        problems="\n".join(f"- {name}: {invalid[name]}" for name in fields),
+        valid_json=json.dumps(valid, indent=2, default=str)
+    )
+
+
+def repair_section(
+    section: str,
+    values: Dict[str, Any],
+    researcher: Any,
+    context: Dict[str, str],
+    rounds: int = REPAIR_ROUNDS,
+    llm: Optional[Any] = None
+) -> BaseModel:
+    """
+    Validate one research section, keeping its valid fields and re-asking the
+    researcher's LLM, or llm, only for the missing or invalid ones, up to
+    rounds times. Valid sections return at once without any LLM call.
+    """
+    model = RESEARCH_SECTIONS[section][1]
+    llm = llm or researcher.llm
+    values = dict(values)
+    for attempt in range(rounds + 1):
+        instance, valid, invalid = check_section(model, values)
+        if instance is not None:
+            return instance
+        if attempt == rounds:
+            break
+
+        trace = current_trace()
+        if trace:
+            trace.record(
+                "field_repair", "researcher", f"research:{section}",
+                retries=1, fields=sorted(invalid)
+            )
+        reply = llm.call(
+            [{"role": "user", "content": repair_prompt(model, valid, invalid, context)}],
+            from_agent=researcher
+        )
+        fixed = parse_partial_json(reply)
+        if isinstance(fixed.get(section), dict):
+            fixed = fixed[section]
+        values = {**valid, **{name: value for name, value in fixed.items() if name in invalid}}
+    raise Exception(f"Could not repair {section}: invalid fields {sorted(invalid)}")
+
+
+def draft_section(section: str, llm: Any, agent: Any, context: Dict[str, str]) -> BaseModel:
+    """
+    Draft a whole section in one call from the LLM's own knowledge, without
+    searching, e.g. with a faster model once research has run out of time.
+    Fields the draft gets wrong are repaired once.
+    """
+    model = RESEARCH_SECTIONS[section][1]
+    fields = list(model.model_fields)
+    prompt = DRAFT_PROMPT_TEMPLATE.format(
+        model_name=model.__name__,
+        company=context.get("company", ""),
+        industry=context.get("industry", ""),
+        country=context.get("country", ""),
+        pitching_role=context.get("pitching_role", ""),
+        field_names=", ".join(fields),
+        field_specs="\n".join(_field_spec(model, name) for name in fields)
+    )
+    reply = llm.call([{"role": "user", "content": prompt}], from_agent=agent)
+    return repair_section(section, section_values(parse_partial_json(reply), section), agent, context, 1, llm)
+
+
+def repair_research(raw: Any, researcher: Any, context: Dict[str, str]) -> ResearchOutput:
+    """
+    Validate research output section by section, repairing only the sections
+    with missing or invalid fields, concurrently. Raises if any section
+    cannot be repaired.
+    """
+    data = parse_partial_json(raw)
+    with ThreadPoolExecutor(max_workers=len(RESEARCH_SECTIONS)) as pool:
+        futures = {
+            section: pool.submit(
+                contextvars.copy_context().run,
+                repair_section, section, section_values(data, section), researcher, context
+            )
+            for section in RESEARCH_SECTIONS
+        }
+        sections = {section: future.result() for section, future in futures.items()}
+    return merge_research_sections(sections)
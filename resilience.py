@@ -0,0 +1,355 @@
+import os
+import time
+import random
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED, TimeoutError as FutureTimeout
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from metrics import current_trace, agent_key
+from llmwrap import wrap_llm, bind_call
+
+# Retries after the first attempt, for errors that are worth retrying
+MAX_RETRIES = int(os.getenv("CREW_LLM_MAX_RETRIES", 3))
+# Exponential backoff base and cap in seconds; each delay is drawn uniformly below it
+BACKOFF_BASE = float(os.getenv("CREW_LLM_BACKOFF_BASE", 0.5))
+BACKOFF_MAX = float(os.getenv("CREW_LLM_BACKOFF_MAX", 8.0))
+# Seconds a call may take overall, retries and hedges included
+CALL_DEADLINE = float(os.getenv("CREW_LLM_DEADLINE", 180.0))
+# Seconds a run shared by several callers may take, in place of any one caller's deadline
+SHARED_RUN_DEADLINE = float(os.getenv("CREW_SHARED_RUN_DEADLINE", 300.0))
+# A duplicate request is sent once a call runs past this quantile of its
+# observed latencies; 0 disables hedging
+HEDGE_QUANTILE = float(os.getenv("CREW_HEDGE_QUANTILE", 0.95))
+# Latencies observed per call site before hedging starts, and the earliest hedge
+HEDGE_MIN_SAMPLES = int(os.getenv("CREW_HEDGE_MIN_SAMPLES", 20))
+HEDGE_MIN_DELAY = float(os.getenv("CREW_HEDGE_MIN_DELAY", 1.0))
+LATENCY_WINDOW = 200
+
+# Request timeout, conflict, rate limit, server errors and Anthropic's "overloaded"
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+RETRYABLE_ERROR_NAMES = {"APIConnectionError", "APITimeoutError"}
+
+# Absolute monotonic time the calls made in this context must finish by
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "crew_llm_deadline", default=None
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when an LLM call, with its retries and hedges, runs past its deadline."""
+
+
+def _headers(error: BaseException) -> Any:
+    return getattr(getattr(error, "response", None), "headers", None) or {}
+
+
+def retry_hint(error: BaseException) -> Optional[float]:
+    """Seconds the server asked to wait before retrying, from Retry-After headers."""
+    hint = getattr(error, "retry_after", None)
+    if isinstance(hint, (int, float)):
+        return max(0.0, float(hint))
+    headers = _headers(error)
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient failures: rate limits, overload, server errors, timeouts and dropped connections."""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    should_retry = str(_headers(error).get("x-should-retry", "")).lower()
+    if should_retry in ("true", "false"):
+        return should_retry == "true"
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS or status >= 500
+    return (
+        isinstance(error, (ConnectionError, TimeoutError))
+        or type(error).__name__ in RETRYABLE_ERROR_NAMES
+    )
+
+
+@contextmanager
+def call_deadline(seconds: float):
+    """Bound every LLM call made in this block to finish within seconds from now."""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def run_until(fn: Callable[[], Any], deadline: Optional[float]) -> Any:
+    """
+    Run fn with every LLM call it makes bounded by deadline, a monotonic time,
+    and return its result; raises DeadlineExceeded once the deadline passes.
+    Work still running then is abandoned: its next LLM call fails at once.
+    """
+    if deadline is None:
+        return fn()
+
+    def bounded() -> Any:
+        current = _deadline.get()
+        _deadline.set(deadline if current is None else min(current, deadline))
+        return fn()
+
+    future = _start(bounded)
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeout:
+        if future.done():
+            # fn itself raised a timeout
+            raise
+        raise DeadlineExceeded("Ran out of time")
+
+
+def shared_deadline(fn: Callable[[], Any], seconds: float = SHARED_RUN_DEADLINE) -> Any:
+    """
+    Run fn with its LLM calls bounded by a deadline of its own, seconds from
+    now, instead of the caller's: for work shared with callers that each
+    bound only their wait with run_until. Once they all stop waiting, the
+    work still ends by this deadline.
+    """
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        return fn()
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    """Monotonic time the LLM calls made in this context must finish by, if bounded."""
+    return _deadline.get()
+
+
+class LatencyTracker:
+    """
+    Rolling window of call latencies per call site. Attempts overtaken by a
+    hedge are kept with the time they had run, a lower bound of their latency.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[Tuple[str, ...], deque] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key: Tuple[str, ...], seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, key: Tuple[str, ...], q: float, min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+        """Nearest-rank quantile, or None until min_samples have been observed."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, max(0, int(q * len(samples) + 0.5) - 1))]
+
+
+def _start(fn: Callable[[], Any]) -> Future:
+    """Run fn on its own thread in a copy of the current context."""
+    future: Future = Future()
+    context = contextvars.copy_context()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(context.run(fn))
+        except BaseException as e:
+            future.set_exception(e)
+
+    # Daemon threads: an abandoned attempt must not keep the process alive
+    threading.Thread(target=run, name="llm-attempt", daemon=True).start()
+    return future
+
+
+class ResiliencePolicy:
+    """
+    Retries transient failures with jittered exponential backoff, honoring the
+    server's Retry-After hints, within a per-call deadline, and hedges slow
+    calls: once a call runs past the observed latency quantile of its call
+    site, a duplicate request is sent and whichever answers first wins.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE,
+        backoff_max: float = BACKOFF_MAX,
+        deadline: float = CALL_DEADLINE,
+        hedge_quantile: float = HEDGE_QUANTILE,
+        hedge_min_delay: float = HEDGE_MIN_DELAY,
+        tracker: Optional[LatencyTracker] = None,
+        seed: Optional[int] = None
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.tracker = tracker or LatencyTracker()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def backoff(self, retry: int, error: BaseException) -> float:
+        """
+        Delay before retry number retry (1-based): the server's hint plus up to
+        10% jitter when it sent one, otherwise full-jitter exponential backoff.
+        """
+        hint = retry_hint(error)
+        with self._lock:
+            if hint is not None:
+                return hint * self._random.uniform(1.0, 1.1)
+            return self._random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (retry - 1)))
+
+    def hedge_delay(self, key: Tuple[str, ...]) -> Optional[float]:
+        if self.hedge_quantile <= 0:
+            return None
+        observed = self.tracker.quantile(key, self.hedge_quantile)
+        return None if observed is None else max(observed, self.hedge_min_delay)
+
+    def call(
+        self,
+        fn: Callable[[], Any],
+        key: Tuple[str, ...],
+        hedge: bool = True,
+        labels: Tuple[str, str] = ("unknown", "unknown")
+    ) -> Any:
+        """
+        Call fn with retries and hedging. key identifies the call site whose
+        latencies decide when to hedge; labels are the (agent, task) that
+        retries and hedges are recorded against in the run's trace.
+        """
+        started = time.monotonic()
+        deadline = started + self.deadline
+        scoped = _deadline.get()
+        if scoped is not None:
+            deadline = min(deadline, scoped)
+
+        # Attempts inherit the deadline, so work they queue for can give up in time
+        token = _deadline.set(deadline)
+        try:
+            retry = 0
+            while True:
+                try:
+                    return self._attempt(fn, key, started, deadline, hedge, labels)
+                except Exception as e:
+                    retry += 1
+                    if retry > self.max_retries or not is_retryable(e):
+                        raise
+                    delay = self.backoff(retry, e)
+                    if time.monotonic() + delay >= deadline:
+                        raise
+                    trace = current_trace()
+                    if trace:
+                        trace.record("llm_retry", *labels, delay=round(delay, 3), error=str(e))
+                    time.sleep(delay)
+        finally:
+            _deadline.reset(token)
+
+    def _attempt(
+        self,
+        fn: Callable[[], Any],
+        key: Tuple[str, ...],
+        call_started: float,
+        deadline: float,
+        hedge: bool,
+        labels: Tuple[str, str]
+    ) -> Any:
+        """One attempt, plus at most one hedged duplicate; the first success wins."""
+        started: Dict[Future, float] = {}
+
+        def launch() -> Future:
+            future = _start(fn)
+            started[future] = time.monotonic()
+            return future
+
+        pending = {launch()}
+        hedge_at = None
+        hedge_after = self.hedge_delay(key) if hedge else None
+        if hedge_after is not None:
+            hedge_at = time.monotonic() + hedge_after
+        error: Optional[BaseException] = None
+
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                raise DeadlineExceeded(
+                    f"LLM call exceeded its deadline of {deadline - call_started:.1f}s"
+                )
+            until = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, pending = wait(pending, timeout=max(0.0, until - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    finished = time.monotonic()
+                    # Attempts still running count with their time so far, or
+                    # the tail they belong to would vanish from the window
+                    for attempt, attempt_started in started.items():
+                        if attempt is future or not attempt.done():
+                            self.tracker.observe(key, finished - attempt_started)
+                    return future.result()
+                error = error or future.exception()
+            if hedge_at is not None and time.monotonic() >= hedge_at:
+                hedge_at = None
+                trace = current_trace()
+                if trace:
+                    trace.record("llm_hedge", *labels, hedges=1, after=round(hedge_after, 3))
+                # Added as is: a hedge done already must still be collected
+                pending.add(launch())
+        raise error
+
+
+_policy = ResiliencePolicy()
+_policy_lock = threading.Lock()
+
+
+def get_policy() -> ResiliencePolicy:
+    return _policy
+
+
+def set_policy(policy: Optional[ResiliencePolicy] = None) -> None:
+    """Swap the policy every resilient LLM uses; None restores the default from the environment."""
+    global _policy
+    with _policy_lock:
+        _policy = policy or ResiliencePolicy()
+
+
+class _ResilientLLMMixin:
+    """Routes each call through the current ResiliencePolicy."""
+
+    def call(self, *args: Any, **kwargs: Any) -> Any:
+        call = super().call
+        arguments = bind_call(self, args, kwargs).arguments
+        task = getattr(arguments.get("from_task"), "name", None) or "unknown"
+        return get_policy().call(
+            lambda: call(*args, **kwargs),
+            key=(self.model, task),
+            # Calls that execute tools themselves must not run twice
+            hedge=arguments.get("available_functions") is None and getattr(self, "allow_hedging", True),
+            labels=(agent_key(getattr(arguments.get("from_agent"), "role", None)), task)
+        )
+
+
+def resilient_llm(llm: Any) -> Any:
+    """Make an LLM retry and hedge its calls, keeping its provider-specific behaviour."""
+    return wrap_llm(llm, _ResilientLLMMixin)
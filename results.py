@@ -0,0 +1,31 @@
+import os
+from typing import Any, Callable, Dict, Optional
+
+from pydantic import BaseModel
+
+from metrics import RunMetrics
+from models import ResearchOutput
+
+EXECUTION_MODES = ("dag", "hierarchical")
+DEFAULT_EXECUTION_MODE = os.getenv("CREW_EXECUTION_MODE", "dag")
+
+# Progress callback: (step name, "started" | "completed", step output or None)
+ProgressCallback = Callable[[str, str, Any], None]
+
+
+class PipelineResult(BaseModel):
+    """Outputs of one generation run, independent of the execution mode."""
+    research: Optional[ResearchOutput] = None
+    research_raw: Optional[str] = None
+    research_cached: bool = False
+    contacts: Optional[str] = None
+    email: Optional[str] = None
+    mode: str = DEFAULT_EXECUTION_MODE
+    metrics: Optional[RunMetrics] = None
+    # What had to fall back to keep the run within its time limit, by step or
+    # research section ("research:local_market"), with how it was served
+    degraded: Dict[str, str] = {}
+
+    def is_degraded(self, step: str) -> bool:
+        """Whether step, or any of its sections, was served by a fallback."""
+        return any(name == step or name.startswith(f"{step}:") for name in self.degraded)
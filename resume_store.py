@@ -0,0 +1,63 @@
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+DEFAULT_MAX_RESUMES = 256
+
+
+class ResumeStore:
+    """
+    Thread-safe, in-memory resume texts keyed by session, content hash and a
+    nonce per put, so concurrent sessions never share or race on a resume and
+    each job discards only its own copy, even when a session regenerates with
+    the same file. Least recently used entries are dropped once max_entries
+    is exceeded.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_RESUMES):
+        self._resumes: "OrderedDict[str, str]" = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(session_id: str, text: str, nonce: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{session_id}:{digest}:{nonce}"
+
+    def put(self, session_id: str, text: str) -> str:
+        """Store a resume for a session and return a key, unique to this put, to read it back."""
+        key = self.make_key(session_id, text, uuid.uuid4().hex)
+        with self._lock:
+            self._resumes[key] = text
+            self._resumes.move_to_end(key)
+            while len(self._resumes) > self._max_entries:
+                self._resumes.popitem(last=False)
+        return key
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._resumes.get(key)
+            if text is not None:
+                self._resumes.move_to_end(key)
+            return text
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._resumes.pop(key, None)
+
+    def discard_session(self, session_id: str) -> None:
+        prefix = f"{session_id}:"
+        with self._lock:
+            for key in [key for key in self._resumes if key.startswith(prefix)]:
+                del self._resumes[key]
+
+
+_resume_store = ResumeStore()
+
+
+def get_resume_store() -> ResumeStore:
+    """Process-wide resume store shared by the app and the writer's resume tool."""
+    return _resume_store
+
@@ -0,0 +1,227 @@
+import os
+import json
+import random
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from crew_company_search import SONNET_MODEL, HAIKU_MODEL
+
+# Models each task may run on, cheapest first. Research starts on the model the
+# router picks and moves one step up only when its output fails validation;
+# contacts, email and the manager have no validation to escalate on, so they
+# keep a single model. Keys are task names, or a task name's prefix before ":"
+# (e.g. "research" covers every "research:<section>"); override with
+# CREW_MODEL_ROUTES='{"email": ["anthropic/claude-3-haiku-20240307"]}'
+DEFAULT_ROUTES: Dict[str, List[str]] = {
+    "research": [HAIKU_MODEL, SONNET_MODEL],
+    "contacts": [HAIKU_MODEL],
+    "email": [SONNET_MODEL],
+    "manager": [SONNET_MODEL]
+}
+# Route of work an agent does outside a named task, such as what the
+# hierarchical manager delegates to it
+AGENT_ROUTES = {
+    "researcher": "research",
+    "contact_finder": "contacts",
+    "writer": "email",
+    "manager": "manager"
+}
+# USD per million (input, output) tokens
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    SONNET_MODEL: (3.0, 15.0),
+    HAIKU_MODEL: (0.25, 1.25)
+}
+# Typical input tokens per output token of a task, to blend the two prices
+INPUT_OUTPUT_RATIO = 3.0
+# Expected seconds a task may take, escalations included; the cheapest model
+# meeting it is picked. 0 picks the cheapest model whatever its latency.
+LATENCY_TARGET = float(os.getenv("CREW_ROUTING_LATENCY_TARGET", 0))
+# Models whose output validates less often than this for a task are skipped
+# for it, so a section that keeps failing on Haiku starts on Sonnet instead
+MIN_SUCCESS_RATE = float(os.getenv("CREW_ROUTING_MIN_SUCCESS", 0.5))
+# Share of tasks routed to another model than the best one, to keep its
+# latency and validation rate up to date
+EXPLORE_RATE = float(os.getenv("CREW_ROUTING_EXPLORE", 0.05))
+# Outcomes assumed per task and model before any are observed: optimistic,
+# so a cheaper model gets tried before the router gives up on it
+PRIOR_SUCCESSES = 3
+PRIOR_FAILURES = 1
+OUTCOME_WINDOW = 50
+
+
+def routes_from_env() -> Dict[str, List[str]]:
+    """DEFAULT_ROUTES with the CREW_MODEL_ROUTES JSON overrides applied."""
+    routes = dict(DEFAULT_ROUTES)
+    overrides = os.getenv("CREW_MODEL_ROUTES")
+    if not overrides:
+        return routes
+    try:
+        for key, models in json.loads(overrides).items():
+            if not isinstance(models, list) or not models or not all(isinstance(m, str) for m in models):
+                raise ValueError(f"'{key}' must map to a non-empty list of model names")
+            routes[key] = models
+    except Exception as e:
+        raise Exception(f"Error parsing CREW_MODEL_ROUTES: {str(e)}")
+    return routes
+
+
+def route_key(task: str, agent: str) -> str:
+    """Route an LLM call belongs to, from its task name and agent key."""
+    if agent == "manager":
+        return "manager"
+    return task or AGENT_ROUTES.get(agent, agent)
+
+
+def blended_price(model: str) -> float:
+    """Price per million tokens of a typical task; unknown models count as the dearest."""
+    input_price, output_price = MODEL_PRICES.get(model, max(MODEL_PRICES.values()))
+    return (input_price * INPUT_OUTPUT_RATIO + output_price) / (INPUT_OUTPUT_RATIO + 1)
+
+
+class RouteStats:
+    """Recent latencies and validation outcomes of one task on one model."""
+
+    def __init__(self, window: int = OUTCOME_WINDOW):
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+
+    def success_rate(self) -> float:
+        successes = sum(self.outcomes)
+        return (successes + PRIOR_SUCCESSES) / (len(self.outcomes) + PRIOR_SUCCESSES + PRIOR_FAILURES)
+
+    def latency(self) -> Optional[float]:
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
+
+
+class ModelRouter:
+    """
+    Picks the model each task and research section runs on. Starting on a
+    cheaper model costs it, plus the next model's expected cost when its output
+    fails validation, in which case the task escalates there; latency adds up
+    the same way. Of the models validating often enough, the cheapest start
+    whose expected latency meets the target wins; when none does, the fastest.
+    Models without latency samples yet are assumed to meet it.
+    """
+
+    def __init__(
+        self,
+        routes: Optional[Dict[str, List[str]]] = None,
+        latency_target: float = LATENCY_TARGET,
+        min_success_rate: float = MIN_SUCCESS_RATE,
+        explore_rate: float = EXPLORE_RATE,
+        seed: Optional[int] = None
+    ):
+        self.routes = routes_from_env() if routes is None else routes
+        self.latency_target = latency_target
+        self.min_success_rate = min_success_rate
+        self.explore_rate = explore_rate
+        self._stats: Dict[Tuple[str, str], RouteStats] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def ladder(self, task: str) -> List[str]:
+        """Models task may run on, cheapest first; empty when it is not routed."""
+        return self.routes.get(task) or self.routes.get(task.split(":")[0]) or []
+
+    def _stats_for(self, task: str, model: str) -> RouteStats:
+        return self._stats.setdefault((task, model), RouteStats())
+
+    def expected(self, task: str) -> List[Tuple[float, float, float]]:
+        """
+        (expected cost, expected latency, validation rate) of starting task on
+        each model of its ladder.
+        """
+        ladder = self.ladder(task)
+        with self._lock:
+            stats = [self._stats_for(task, model) for model in ladder]
+            rates = [s.success_rate() for s in stats]
+            latencies = [s.latency() or 0.0 for s in stats]
+        costs: List[Tuple[float, float, float]] = []
+        cost, latency = 0.0, 0.0
+        # From the strongest model down: its own share plus the escalation it may need
+        for index in reversed(range(len(ladder))):
+            escalates = 1.0 - rates[index] if index < len(ladder) - 1 else 0.0
+            cost = blended_price(ladder[index]) + escalates * cost
+            latency = latencies[index] + escalates * latency
+            costs.append((cost, latency, rates[index]))
+        return costs[::-1]
+
+    def choose(self, task: str) -> Optional[str]:
+        """The model to start task on; None when task is not routed."""
+        ladder = self.ladder(task)
+        if len(ladder) <= 1:
+            return ladder[0] if ladder else None
+        expected = self.expected(task)
+        # The strongest model is always a candidate, there being nothing to escalate to
+        candidates = [
+            index for index, (_, _, rate) in enumerate(expected)
+            if rate >= self.min_success_rate or index == len(ladder) - 1
+        ]
+        within = [
+            index for index in candidates
+            if not self.latency_target or expected[index][1] <= self.latency_target
+        ]
+        if within:
+            best = min(within, key=lambda index: expected[index][0])
+        else:
+            best = min(candidates, key=lambda index: expected[index][1])
+        with self._lock:
+            if self._random.random() < self.explore_rate:
+                best = self._random.choice([index for index in range(len(ladder)) if index != best])
+        return ladder[best]
+
+    def escalate(self, task: str, model: str) -> Optional[str]:
+        """The next stronger model for task after model, or None at the top of its ladder."""
+        ladder = self.ladder(task)
+        if model not in ladder or ladder.index(model) == len(ladder) - 1:
+            return None
+        return ladder[ladder.index(model) + 1]
+
+    def record(self, task: str, model: str, latency: Optional[float] = None, valid: Optional[bool] = None) -> None:
+        """Note how long task took on model and whether its output validated, when known."""
+        with self._lock:
+            stats = self._stats_for(task, model)
+            if latency is not None:
+                stats.latencies.append(latency)
+            if valid is not None:
+                stats.outcomes.append(1 if valid else 0)
+
+
+class PinnedRouter(ModelRouter):
+    """
+    Starts each task on the model given for it, e.g. the one a recorded run
+    started on, so a replay makes the same requests; escalates as usual.
+    Tasks without a model are routed as by ModelRouter, without exploring.
+    """
+
+    def __init__(self, models: Dict[str, str], routes: Optional[Dict[str, List[str]]] = None):
+        super().__init__(routes=routes, explore_rate=0.0)
+        self.models = models
+
+    def choose(self, task: str) -> Optional[str]:
+        model = self.models.get(task)
+        if model is None:
+            return super().choose(task)
+        # Clients may report their model without the provider prefix the ladders use
+        return next((m for m in self.ladder(task) if m.split("/")[-1] == model.split("/")[-1]), model)
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    """Process-wide model router, learning from every run's tasks."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
+
+
+def set_router(router: Optional[ModelRouter] = None) -> None:
+    """Swap the process-wide model router; None rebuilds the default one on next use."""
+    global _router
+    with _router_lock:
+        _router = router
@@ -0,0 +1,141 @@
+import os
+import re
+import json
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from cache import SQLiteCache, DEFAULT_CACHE_PATH
+
+DEFAULT_SEARCH_TTL = 24 * 3600
+DEFAULT_SEARCH_MAX_ENTRIES = 5000
+DEFAULT_SEARCH_MEMORY_ENTRIES = 256
+
+_STRIP_CHARS = "\"'`?!,;()[]{}"
+# A quoted phrase, which Serper matches exactly, or a single word
+_QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonicalize a search query so near-identical queries share a cache entry.
+    Case, whitespace and punctuation around words are ignored; word order,
+    quoted phrases and operators such as "site:linkedin.com" are kept.
+    """
+    text = unicodedata.normalize("NFKC", query or "").lower().replace("\u201c", '"').replace("\u201d", '"')
+    tokens = []
+    for match in _QUERY_TOKEN.finditer(text):
+        phrase, word = match.groups()
+        if word is not None:
+            word = word.strip(_STRIP_CHARS)
+            if word:
+                tokens.append(word)
+            continue
+        words = [part.strip(_STRIP_CHARS) for part in phrase.split()]
+        phrase = " ".join(part for part in words if part)
+        if phrase:
+            tokens.append(f'"{phrase}"')
+    return " ".join(tokens)
+
+
+class SearchCache:
+    """In-process LRU in front of an on-disk SQLite store, with hit/miss counters."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_SEARCH_TTL,
+        max_entries: int = DEFAULT_SEARCH_MAX_ENTRIES,
+        memory_entries: int = DEFAULT_SEARCH_MEMORY_ENTRIES
+    ):
+        self._disk = SQLiteCache("search", path, ttl_seconds, max_entries)
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_entries = memory_entries
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, threading.Lock] = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, value: str) -> None:
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._memory_entries:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return value
+        value = self._disk.get(key)
+        if value is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def get_or_fetch(self, key: str, fetch) -> Any:
+        """
+        Return the cached result for key, calling fetch() on a miss.
+        Concurrent callers with the same key wait for a single fetch.
+        """
+        value = self._lookup(key)
+        if value is not None:
+            return json.loads(value)
+
+        with self._lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another caller may have filled the entry while we waited
+            value = self._lookup(key)
+            if value is not None:
+                return json.loads(value)
+            with self._lock:
+                self.misses += 1
+            try:
+                result = fetch()
+                value = json.dumps(result)
+                self._disk.set(key, value)
+                self._remember(key, value)
+                return result
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        self._disk.clear()
+
+
+_search_cache: Optional[SearchCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchCache:
+    """Process-wide search cache shared by every CachedSerperDevTool."""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache(
+                path=os.getenv("CREW_SEARCH_CACHE_PATH", DEFAULT_CACHE_PATH)
+            )
+        return _search_cache
+
@@ -0,0 +1,274 @@
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+from crewai import BaseLLM
+from crewai.llms.base_llm import llm_call_context
+from crewai.events.types.llm_events import LLMCallType
+from pydantic import PrivateAttr
+
+from tools import CachedSerperDevTool
+from repair import REPAIR_FIELDS_PATTERN
+from ratelimit import CHARS_PER_TOKEN
+from promptcache import get_local_prompt_cache, content_text
+from models import (
+    ResearchOutput, CompanyDetails, PositionContext, WorkEnvironment,
+    MarketPosition, ProfessionalGrowth, LocalMarket
+)
+
+SEARCH_TOOL_NAME = "Search the internet with Serper"
+# Thoughts that mark the stub's own tool calls, so it answers once they have run
+SEARCH_THOUGHT = "I should search for current information first"
+DELEGATE_THOUGHT = "I will delegate this to the right coworker"
+
+STUB_CONTACTS = """Contact Name: Jane Doe
+Role: VP of Engineering
+Location: Paris, France
+Background: 15 years leading platform teams
+LinkedIn: https://www.linkedin.com/in/example-jane-doe
+Email: jane.doe@example.com
+
+Contact Name: John Smith
+Role: Head of Talent Acquisition
+Location: London, United Kingdom
+Background: Runs technical hiring across EMEA
+LinkedIn: https://www.linkedin.com/in/example-john-smith"""
+
+STUB_EMAIL = """Subject: Exploring opportunities on your engineering team
+
+Dear Jane,
+
+I have followed your team's work on the platform and would welcome the chance
+to discuss how my experience could contribute to your upcoming projects.
+
+Best regards,
+Alex"""
+
+
+SECTION_MODELS = {
+    model.__name__: model for model in (
+        CompanyDetails, PositionContext, WorkEnvironment,
+        MarketPosition, ProfessionalGrowth, LocalMarket
+    )
+}
+
+
+def _example(model) -> Dict[str, Any]:
+    return model.model_config["json_schema_extra"]["example"]
+
+
+def stub_research() -> ResearchOutput:
+    """A valid ResearchOutput assembled from the models' schema examples."""
+    return ResearchOutput(
+        company_analysis={
+            "company_details": _example(CompanyDetails),
+            "position_context": _example(PositionContext),
+            "work_environment": _example(WorkEnvironment)
+        },
+        industry_analysis={
+            "market_position": _example(MarketPosition),
+            "professional_growth": _example(ProfessionalGrowth),
+            "local_market": _example(LocalMarket)
+        }
+    )
+
+
+class LatencyModel:
+    """
+    Seeded latency distribution in seconds, parsed from a spec:
+    "0.5" or "constant:0.5", "uniform:low,high", "normal:mean,stddev"
+    (clipped at 0) or "lognormal:median,sigma".
+    """
+
+    def __init__(self, spec: str = "0", seed: int = 0):
+        self.spec = spec
+        kind, _, params = spec.partition(":") if ":" in spec else ("constant", "", spec)
+        try:
+            self.params = [float(value) for value in params.split(",")] if params else []
+        except ValueError:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+        arity = {"constant": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if kind not in arity or len(self.params) != arity[kind]:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+        self.kind = kind
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == "constant":
+                return self.params[0]
+            if self.kind == "uniform":
+                return self._random.uniform(*self.params)
+            if self.kind == "normal":
+                return max(0.0, self._random.gauss(*self.params))
+            median, sigma = self.params
+            return self._random.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+
+    def wait(self) -> None:
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _message_text(messages: Any) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(content_text(message.get("content")) for message in messages or [])
+
+
+class StubLLM(BaseLLM):
+    """
+    Deterministic offline stand-in for the Anthropic LLM. Answers are chosen
+    from the task being run: full or per-section research JSON built from the
+    schema examples, contacts or an email; field repair and draft requests get
+    just the requested fields of the example, and other calls made outside a
+    task get the bare answer. Agents with the search tool first issue one
+    search, as the real agents do, and the hierarchical manager delegates
+    each task to its coworker before answering. Every call waits for a
+    sampled latency and emits crewai's LLM events with estimated usage,
+    cached prompt tokens as read from the local prompt cache stand-in.
+    """
+
+    _latency: LatencyModel = PrivateAttr(default_factory=LatencyModel)
+
+    def __init__(self, latency: Optional[LatencyModel] = None, **data: Any):
+        super().__init__(**data)
+        if latency is not None:
+            self._latency = latency
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def _answer(self, task_name: str, role: str) -> str:
+        research = stub_research()
+        if task_name.startswith("research:"):
+            section = task_name.split(":", 1)[1]
+            for analysis in (research.company_analysis, research.industry_analysis):
+                if section in type(analysis).model_fields:
+                    return getattr(analysis, section).model_dump_json()
+        if task_name == "research" or "Research" in role:
+            return research.model_dump_json()
+        if task_name == "contacts" or "Contact" in role:
+            return STUB_CONTACTS
+        return STUB_EMAIL
+
+    def call(
+        self,
+        messages: Any,
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+        from_task: Optional[Any] = None,
+        from_agent: Optional[Any] = None,
+        response_model: Optional[Any] = None
+    ) -> str:
+        # Providers scope each call so its started/completed events share an id
+        with llm_call_context():
+            return self._call(messages, from_task, from_agent, response_model)
+
+    def _call(
+        self,
+        messages: Any,
+        from_task: Optional[Any],
+        from_agent: Optional[Any],
+        response_model: Optional[Any]
+    ) -> str:
+        self._emit_call_started_event(
+            messages=messages, from_task=from_task, from_agent=from_agent
+        )
+        self._latency.wait()
+
+        text = _message_text(messages)
+        role = getattr(from_agent, "role", "") or ""
+        task_name = getattr(from_task, "name", None) or ""
+        agent_tools = [tool.name for tool in (getattr(from_agent, "tools", None) or [])]
+        answer = self._answer(task_name, role)
+
+        repair = REPAIR_FIELDS_PATTERN.search(text)
+        if repair and from_task is None and repair.group(1) in SECTION_MODELS:
+            example = _example(SECTION_MODELS[repair.group(1)])
+            fields = [name.strip() for name in repair.group(2).split(",")]
+            response = json.dumps({name: example[name] for name in fields if name in example})
+        elif response_model is not None or from_task is None:
+            response = answer
+        elif SEARCH_THOUGHT in text or DELEGATE_THOUGHT in text:
+            response = f"Thought: I now know the final answer\nFinal Answer: {answer}"
+        elif SEARCH_TOOL_NAME in agent_tools:
+            # Task descriptions are static; what a search is about is in the request details
+            brief = getattr(from_task, "request_context", "") or getattr(from_task, "description", text)
+            query = " ".join(brief.replace("Request details:", "").split()[:12])
+            response = (
+                f"Thought: {SEARCH_THOUGHT}\n"
+                f"Action: {SEARCH_TOOL_NAME}\n"
+                f"Action Input: {json.dumps({'search_query': query})}"
+            )
+        elif role == "Crew Manager" and from_task is not None:
+            coworker = {
+                "research": "Research Specialist",
+                "contacts": "Contact Specialist"
+            }.get(task_name.split(":")[0], "Communications Expert")
+            response = (
+                f"Thought: {DELEGATE_THOUGHT}\n"
+                "Action: Delegate work to coworker\n"
+                "Action Input: " + json.dumps({
+                    "task": from_task.description[:200],
+                    "context": f"Task name: {task_name}\n{getattr(from_task, 'request_context', '')}",
+                    "coworker": coworker
+                })
+            )
+        else:
+            response = f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+        cache = get_local_prompt_cache().lookup(self.model, messages, task_name or "none")
+        self._emit_call_completed_event(
+            response=response,
+            call_type=LLMCallType.LLM_CALL,
+            from_task=from_task,
+            from_agent=from_agent,
+            messages=messages,
+            usage={
+                "input_tokens": len(text) // CHARS_PER_TOKEN,
+                "output_tokens": len(response) // CHARS_PER_TOKEN,
+                # Included in input_tokens, as crewai reports Anthropic's usage
+                "cached_prompt_tokens": cache.read_bytes // CHARS_PER_TOKEN,
+                "cache_creation_tokens": cache.written_bytes // CHARS_PER_TOKEN
+            }
+        )
+        return response
+
+
+class StubSerperDevTool(CachedSerperDevTool):
+    """
+    Offline stand-in for the Serper API behind the regular cached search tool:
+    only the HTTP request is replaced, with deterministic results derived from
+    the query and a sampled latency.
+    """
+
+    _latency: LatencyModel = PrivateAttr(default_factory=LatencyModel)
+
+    def __init__(self, latency: Optional[LatencyModel] = None, **data: Any):
+        super().__init__(**data)
+        if latency is not None:
+            self._latency = latency
+
+    def _make_api_request(self, search_query: str, search_type: str) -> Dict[str, Any]:
+        self._latency.wait()
+        digest = hashlib.sha256(f"{search_type}|{search_query}".encode()).hexdigest()
+        words = re.findall(r"\w+", search_query)[:6] or ["result"]
+        return {
+            "organic": [
+                {
+                    "title": f"{' '.join(words).title()} - result {index + 1}",
+                    "link": f"https://example.com/{digest[:12]}/{index}",
+                    "snippet": f"Stub result {index + 1} for {search_query}",
+                    "position": index + 1
+                }
+                for index in range(self.n_results)
+            ]
+        }
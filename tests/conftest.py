@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The modules live at the top level of the repository, next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
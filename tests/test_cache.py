@@ -0,0 +1,141 @@
+import pytest
+
+import cache
+from cache import SQLiteCache, ResearchCache, SectionCache, normalize_key_part
+from stubs import stub_research
+
+
+class Clock:
+    """Stands in for the time module, moved forward by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.db")
+
+
+def test_get_returns_what_was_set(path, clock):
+    store = SQLiteCache("t", path, ttl_seconds=60)
+    store.set("k", "v")
+    assert store.get("k") == "v"
+    assert store.get("missing") is None
+
+
+def test_entries_expire_after_ttl(path, clock):
+    store = SQLiteCache("t", path, ttl_seconds=60)
+    store.set("k", "v")
+    clock.now += 60
+    assert store.get("k") == "v"
+    clock.now += 1
+    assert store.get("k") is None
+    assert store.age("k") is None
+
+
+def test_expired_entry_is_deleted_without_stale_window(path, clock):
+    store = SQLiteCache("t", path, ttl_seconds=60)
+    store.set("k", "v")
+    clock.now += 61
+    assert store.get("k") is None
+    assert len(store) == 0
+
+
+def test_least_recently_used_entry_is_evicted(path, clock):
+    store = SQLiteCache("t", path, ttl_seconds=60, max_entries=2)
+    store.set("a", "1")
+    clock.now += 1
+    store.set("b", "2")
+    clock.now += 1
+    # Reading "a" makes "b" the least recently used
+    assert store.get("a") == "1"
+    clock.now += 1
+    store.set("c", "3")
+    assert len(store) == 2
+    assert store.get("b") is None
+    assert store.get("a") == "1"
+    assert store.get("c") == "3"
+
+
+def test_stale_window(path, clock):
+    store = SQLiteCache("t", path, ttl_seconds=60, stale_seconds=100)
+    store.set("k", "v")
+    clock.now += 90
+    # Expired for get, but still readable as stale, with its age
+    assert store.get("k") is None
+    assert store.get_stale("k") == ("v", 90)
+    clock.now += 70
+    assert store.get_stale("k") == ("v", 160)
+    clock.now += 1
+    assert store.get_stale("k") is None
+
+
+def test_rows_past_stale_window_are_dropped_on_set(path, clock):
+    store = SQLiteCache("t", path, ttl_seconds=60, stale_seconds=100)
+    store.set("old", "v")
+    clock.now += 161
+    store.set("new", "v")
+    assert len(store) == 1
+
+
+def test_age(path, clock):
+    store = SQLiteCache("t", path, ttl_seconds=60)
+    store.set("k", "v")
+    clock.now += 30
+    assert store.age("k") == 30
+
+
+def test_invalid_table_name(path):
+    with pytest.raises(ValueError):
+        SQLiteCache("research; DROP TABLE x", path)
+
+
+def test_normalize_key_part():
+    assert normalize_key_part("  Acme   Corp ") == "acme corp"
+    assert normalize_key_part("ACME\tcorp") == "acme corp"
+    assert normalize_key_part(None) == ""
+
+
+def test_research_cache_keys_ignore_case_and_whitespace(path, clock):
+    research_cache = ResearchCache(path)
+    research = stub_research()
+    research_cache.set("Acme Corp", "Software", "France", "Engineer", research)
+    assert research_cache.get(" acme  corp", "SOFTWARE", "france ", "engineer") == research
+    assert research_cache.get("Acme Corp", "Software", "Germany", "Engineer") is None
+
+
+def test_research_cache_stale_research(path, clock):
+    research_cache = ResearchCache(path, ttl_seconds=60, stale_seconds=100)
+    research = stub_research()
+    research_cache.set("Acme", "Software", "France", "Engineer", research)
+    clock.now += 90
+    assert research_cache.get("Acme", "Software", "France", "Engineer") is None
+    assert research_cache.get_stale("Acme", "Software", "France", "Engineer") == (research, 90)
+
+
+def test_research_cache_drops_rows_that_no_longer_validate(path, clock):
+    research_cache = ResearchCache(path)
+    key = ResearchCache.make_key("Acme", "Software", "France", "Engineer")
+    research_cache._store.set(key, '{"not": "research"}')
+    assert research_cache.get("Acme", "Software", "France", "Engineer") is None
+    assert research_cache._store.get(key) is None
+
+
+def test_section_cache_is_shared_across_companies(path, clock):
+    research = stub_research()
+    section = research.industry_analysis.market_position
+    section_cache = SectionCache(path)
+    section_cache.set("market_position", "Software", "France", section)
+    cached = section_cache.get("market_position", " software", "FRANCE", type(section))
+    assert cached == section
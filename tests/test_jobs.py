@@ -0,0 +1,181 @@
+import time
+import threading
+
+import pytest
+
+from jobs import JobManager, JobRecord, JobStatus, JobCancelled
+from results import PipelineResult
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+
+@pytest.fixture
+def manager(path):
+    manager = JobManager(path, max_workers=1)
+    yield manager
+    manager.shutdown()
+
+
+def wait_finished(manager: JobManager, job_id: str, timeout: float = 2.0) -> JobRecord:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job.finished and manager.active_count() == 0:
+            return job
+        time.sleep(0.005)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def blocker(release: threading.Event, started: threading.Event = None):
+    """A job that reports progress until released."""
+    def run(on_progress):
+        if started:
+            started.set()
+        while not release.wait(0.01):
+            on_progress("research", "started", None)
+        return PipelineResult(email="done")
+    return run
+
+
+def test_succeeded_job_is_persisted(manager, path):
+    cleanups = []
+    job_id = manager.submit(
+        lambda on_progress: PipelineResult(email="hello"), owner="me",
+        inputs={"company": "Acme"}, cleanup=lambda: cleanups.append(1)
+    )
+    job = wait_finished(manager, job_id)
+    assert job.status == JobStatus.SUCCEEDED
+    assert cleanups == [1]
+    # Another manager on the same file sees the finished job
+    reloaded = JobManager(path).get(job_id)
+    assert reloaded.status == JobStatus.SUCCEEDED
+    assert reloaded.result.email == "hello"
+    assert (reloaded.owner, reloaded.inputs) == ("me", {"company": "Acme"})
+
+
+def test_failed_job_keeps_its_error(manager):
+    cleanups = []
+
+    def fail(on_progress):
+        raise ValueError("boom")
+
+    job = wait_finished(manager, manager.submit(fail, owner="me", cleanup=lambda: cleanups.append(1)))
+    assert job.status == JobStatus.FAILED
+    assert job.error == "boom"
+    assert cleanups == [1]
+
+
+def test_progress_is_recorded(manager):
+    def run(on_progress):
+        on_progress("research", "started", None)
+        on_progress("research", "completed", "findings")
+        return PipelineResult()
+
+    job_id = manager.submit(run, owner="me")
+    wait_finished(manager, job_id)
+    job = manager.get(job_id)
+    assert [(event.step, event.status) for event in job.progress] == [
+        ("research", "started"), ("research", "completed")
+    ]
+
+
+def test_running_job_is_cancelled_at_its_next_checkpoint(manager):
+    release, started = threading.Event(), threading.Event()
+    cleanups = []
+    job_id = manager.submit(blocker(release, started), owner="me", cleanup=lambda: cleanups.append(1))
+    assert started.wait(1)
+    assert manager.cancel(job_id)
+    job = wait_finished(manager, job_id)
+    release.set()
+    assert job.status == JobStatus.CANCELLED
+    assert cleanups == [1]
+
+
+def test_cancellation_arriving_wrapped_still_cancels(manager):
+    started = threading.Event()
+
+    def run(on_progress):
+        started.set()
+        try:
+            while True:
+                on_progress("research", "started", None)
+                time.sleep(0.01)
+        except JobCancelled as e:
+            raise Exception(f"Error running pipeline: {str(e)}")
+
+    job_id = manager.submit(run, owner="me")
+    assert started.wait(1)
+    manager.cancel(job_id)
+    job = wait_finished(manager, job_id)
+    assert job.status == JobStatus.CANCELLED
+    assert job.error is None
+
+
+def test_queued_job_is_cancelled_before_it_starts(manager):
+    release = threading.Event()
+    manager.submit(blocker(release), owner="me")
+    ran, cleanups = [], []
+    queued = manager.submit(
+        lambda on_progress: ran.append(1), owner="me", cleanup=lambda: cleanups.append(1)
+    )
+    assert manager.cancel(queued)
+    # Finished right away, cleanup included, although the worker is still busy
+    assert manager.get(queued).status == JobStatus.CANCELLED
+    assert cleanups == [1]
+    release.set()
+    wait_finished(manager, queued)
+    assert ran == []
+
+
+def test_cancel_unknown_or_finished_job(manager):
+    assert not manager.cancel("unknown")
+    job_id = manager.submit(lambda on_progress: PipelineResult(), owner="me")
+    wait_finished(manager, job_id)
+    assert not manager.cancel(job_id)
+
+
+def test_failing_cleanup_does_not_fail_the_job(manager):
+    def cleanup():
+        raise RuntimeError("cleanup failed")
+
+    job_id = manager.submit(lambda on_progress: PipelineResult(), owner="me", cleanup=cleanup)
+    assert wait_finished(manager, job_id).status == JobStatus.SUCCEEDED
+
+
+def test_job_left_active_by_another_process_reads_as_interrupted(manager, path):
+    JobManager(path)._persist(JobRecord(id="gone", owner="me", status=JobStatus.RUNNING))
+    job = manager.get("gone")
+    assert job.status == JobStatus.FAILED
+    assert job.error == "Job was interrupted before it finished"
+
+
+def test_list_returns_an_owners_jobs_newest_first(manager):
+    first = manager.submit(lambda on_progress: PipelineResult(), owner="me")
+    wait_finished(manager, first)
+    second = manager.submit(lambda on_progress: PipelineResult(), owner="me")
+    wait_finished(manager, second)
+    manager.submit(lambda on_progress: PipelineResult(), owner="someone else")
+    assert [job.id for job in manager.list("me")] == [second, first]
+
+
+def test_prune_keeps_jobs_still_running(path):
+    manager = JobManager(path, max_workers=1, retention_seconds=0.05)
+    release, started = threading.Event(), threading.Event()
+    running = manager.submit(blocker(release, started), owner="me")
+    assert started.wait(1)
+    manager._persist(JobRecord(id="interrupted", owner="me", status=JobStatus.RUNNING, created_at=0))
+    manager._persist(JobRecord(id="old", owner="me", status=JobStatus.SUCCEEDED, created_at=0))
+    time.sleep(0.1)
+    manager.prune()
+    assert manager.get("old") is None
+    assert manager.get("interrupted") is None
+    assert manager.get(running).status == JobStatus.RUNNING
+    release.set()
+    job = wait_finished(manager, running)
+    assert job.status == JobStatus.SUCCEEDED
+    # Polled from SQLite once finished: its row survived the prune
+    assert manager.get(running).result.email == "done"
+    manager.shutdown()
@@ -0,0 +1,120 @@
+import time
+import threading
+
+import pytest
+
+from ratelimit import MemoryBucketStore, SQLiteBucketStore, RateLimit, RateLimiter
+from resilience import DeadlineExceeded, call_deadline
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBucketStore()
+    return SQLiteBucketStore(str(tmp_path / "buckets.db"))
+
+
+def test_burst_then_wait(store):
+    draw = [("k", 1.0, 10.0, 2.0)]
+    assert store.take(draw) == 0
+    assert store.take(draw) == 0
+    wait = store.take(draw)
+    assert 0 < wait <= 0.1
+
+
+def test_refills_after_waiting(store):
+    draw = [("k", 1.0, 20.0, 1.0)]
+    assert store.take(draw) == 0
+    wait = store.take(draw)
+    assert wait > 0
+    time.sleep(wait + 0.01)
+    assert store.take(draw) == 0
+
+
+def test_take_is_all_or_nothing(store):
+    assert store.take([("a", 1.0, 1.0, 1.0)]) == 0
+    # "a" is empty, so "b" must not be drawn either
+    assert store.take([("a", 1.0, 1.0, 1.0), ("b", 5.0, 1.0, 5.0)]) > 0
+    assert store.take([("b", 5.0, 1.0, 5.0)]) == 0
+
+
+def test_wait_is_for_the_slowest_bucket(store):
+    assert store.take([("a", 1.0, 10.0, 1.0), ("b", 1.0, 1.0, 1.0)]) == 0
+    wait = store.take([("a", 1.0, 10.0, 1.0), ("b", 1.0, 1.0, 1.0)])
+    assert 0.9 < wait <= 1.0
+
+
+def test_debit_goes_into_debt(store):
+    store.debit("k", 15.0, 10.0, 10.0)
+    # Level -5: six tokens short of one
+    assert store.take([("k", 1.0, 10.0, 10.0)]) == pytest.approx(0.6, abs=0.05)
+
+
+def test_debt_is_capped_at_capacity(store):
+    store.debit("k", 1000.0, 10.0, 10.0)
+    assert store.take([("k", 1.0, 10.0, 10.0)]) == pytest.approx(1.1, abs=0.05)
+
+
+def test_sqlite_buckets_are_shared(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+    draw = [("k", 1.0, 1.0, 1.0)]
+    assert first.take(draw) == 0
+    assert second.take(draw) > 0
+
+
+def test_unlisted_names_are_not_limited():
+    limiter = RateLimiter(limits={}, path="")
+    assert limiter.acquire("anthropic/claude-3-haiku-20240307", tokens=10 ** 6) == 0
+
+
+def test_provider_prefix_is_ignored():
+    limiter = RateLimiter(limits={"m": RateLimit(requests_per_second=20, burst=1)}, path="")
+    assert limiter.acquire("anthropic/m") == 0
+    assert limiter.acquire("m") > 0
+
+
+def test_request_larger_than_token_bucket_takes_all_of_it():
+    limiter = RateLimiter(limits={"m": RateLimit(tokens_per_minute=60)}, path="")
+    assert limiter.acquire("m", tokens=1000) == 0
+
+
+def test_usage_debt_holds_calls_past_their_deadline():
+    limiter = RateLimiter(limits={"m": RateLimit(tokens_per_minute=600)}, path="")
+    assert limiter.acquire("m", tokens=600) == 0
+    limiter.record_usage("m", 300)
+    with call_deadline(0.2), pytest.raises(DeadlineExceeded, match="past its deadline"):
+        limiter.acquire("m", tokens=1)
+
+
+def test_waiters_are_served_in_arrival_order():
+    limiter = RateLimiter(limits={"m": RateLimit(requests_per_second=10, burst=1)}, path="")
+    assert limiter.acquire("m") == 0
+    served = []
+
+    def acquire(index: int) -> None:
+        limiter.acquire("m")
+        served.append(index)
+
+    threads = [threading.Thread(target=acquire, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join()
+    assert served == [0, 1, 2, 3]
+
+
+def test_deadline_while_queued_leaves_the_queue():
+    limiter = RateLimiter(limits={"m": RateLimit(requests_per_second=5, burst=1)}, path="")
+    assert limiter.acquire("m") == 0
+    head = threading.Thread(target=limiter.acquire, args=("m",))
+    head.start()
+    time.sleep(0.02)
+    with call_deadline(0.05), pytest.raises(DeadlineExceeded, match="queueing"):
+        limiter.acquire("m")
+    head.join()
+    # The timed-out caller gave up its place; the next one is not stuck behind it
+    started = time.monotonic()
+    limiter.acquire("m")
+    assert time.monotonic() - started < 0.5
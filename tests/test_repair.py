@@ -0,0 +1,70 @@
+import pytest
+
+from repair import parse_partial_json
+
+
+def test_complete_object():
+    assert parse_partial_json('{"a": 1, "b": [1, 2]}') == {"a": 1, "b": [1, 2]}
+
+
+def test_dict_passes_through():
+    assert parse_partial_json({"a": 1}) == {"a": 1}
+
+
+@pytest.mark.parametrize("text", [None, 42, "", "no json here", "[1, 2]"])
+def test_no_object(text):
+    assert parse_partial_json(text) == {}
+
+
+def test_prose_and_code_fences():
+    text = 'Here is the research:\n```json\n{"a": 1, "b": "x"}\n```\nLet me know if you need more.'
+    assert parse_partial_json(text) == {"a": 1, "b": "x"}
+
+
+def test_only_first_object():
+    assert parse_partial_json('{"a": 1} and then {"b": 2}') == {"a": 1}
+
+
+def test_truncated_after_complete_value():
+    assert parse_partial_json('{"a": 1, "b": 2, ') == {"a": 1, "b": 2}
+
+
+def test_truncated_inside_string():
+    assert parse_partial_json('{"a": "done", "b": "cut off mid') == {"a": "done"}
+
+
+def test_truncated_key_without_value():
+    assert parse_partial_json('{"a": 1, "b"') == {"a": 1}
+    assert parse_partial_json('{"a": 1, "b":') == {"a": 1}
+
+
+def test_truncated_number_is_dropped():
+    # A number cut short may still parse, so it is not trusted
+    assert parse_partial_json('{"a": ["x", "y"], "b": 1.') == {"a": ["x", "y"]}
+
+
+def test_truncated_nested_containers_are_closed():
+    text = '{"a": {"b": [{"c": 1}, {"d": 2'
+    assert parse_partial_json(text) == {"a": {"b": [{"c": 1}]}}
+
+
+def test_truncated_list_keeps_complete_items():
+    assert parse_partial_json('{"a": ["x", "y", "z') == {"a": ["x", "y"]}
+
+
+def test_escaped_quote_does_not_end_string():
+    assert parse_partial_json(r'{"a": "say \"hi\"", "b": "unfinished \"quote') == {"a": 'say "hi"'}
+
+
+def test_escaped_backslash_before_closing_quote():
+    assert parse_partial_json(r'{"a": "C:\\", "b": "c') == {"a": "C:\\"}
+
+
+def test_brackets_inside_strings_are_ignored():
+    text = '{"a": "brace } and ] inside", "b": {"c": 1, "d"'
+    assert parse_partial_json(text) == {"a": "brace } and ] inside", "b": {"c": 1}}
+
+
+def test_truncated_before_any_value():
+    assert parse_partial_json('{"a') == {}
+    assert parse_partial_json("{") == {}
@@ -0,0 +1,207 @@
+import time
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import resilience
+from resilience import (
+    ResiliencePolicy, LatencyTracker, DeadlineExceeded, call_deadline, is_retryable, retry_hint
+)
+
+KEY = ("model", "task")
+
+
+class APIStatusError(Exception):
+    """Shaped like the provider SDK errors: a status code and the response headers."""
+
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+class SleepRecorder:
+    """Stands in for the time module, recording sleeps instead of sleeping."""
+
+    def __init__(self):
+        self.sleeps = []
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def time(self) -> float:
+        return time.time()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SleepRecorder()
+    monkeypatch.setattr(resilience, "time", clock)
+    return clock
+
+
+def failing(*errors, result="ok"):
+    """fn raising each error in turn, then returning result; counts its calls."""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return fn, calls
+
+
+def test_retryable_errors():
+    assert is_retryable(APIStatusError(429))
+    assert is_retryable(APIStatusError(529))
+    assert is_retryable(APIStatusError(500))
+    assert is_retryable(ConnectionError())
+    assert is_retryable(APIConnectionError())
+    assert not is_retryable(APIStatusError(400))
+    assert not is_retryable(ValueError("bad output"))
+    assert not is_retryable(DeadlineExceeded())
+
+
+def test_server_should_retry_header_wins_over_status():
+    assert not is_retryable(APIStatusError(500, {"x-should-retry": "false"}))
+    assert is_retryable(APIStatusError(400, {"x-should-retry": "true"}))
+
+
+def test_retry_hint():
+    assert retry_hint(APIStatusError(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_hint(APIStatusError(429, {"retry-after": "3"})) == 3.0
+    assert retry_hint(APIStatusError(429, {"retry-after": "Thu, 01 Jan 1970 00:00:00 GMT"})) == 0.0
+    assert retry_hint(APIStatusError(429)) is None
+
+
+def test_retryable_error_is_retried(clock):
+    policy = ResiliencePolicy(max_retries=3, seed=1)
+    fn, calls = failing(APIStatusError(503), APIStatusError(429))
+    assert policy.call(fn, KEY, hedge=False) == "ok"
+    assert len(calls) == 3
+    assert len(clock.sleeps) == 2
+
+
+def test_non_retryable_error_is_raised_at_once(clock):
+    policy = ResiliencePolicy(max_retries=3, seed=1)
+    fn, calls = failing(APIStatusError(400))
+    with pytest.raises(APIStatusError):
+        policy.call(fn, KEY, hedge=False)
+    assert len(calls) == 1
+    assert clock.sleeps == []
+
+
+def test_retries_stop_after_max_retries(clock):
+    policy = ResiliencePolicy(max_retries=2, seed=1)
+    fn, calls = failing(*[APIStatusError(503)] * 5)
+    with pytest.raises(APIStatusError):
+        policy.call(fn, KEY, hedge=False)
+    assert len(calls) == 3
+
+
+def test_backoff_is_jittered_exponential_and_seeded():
+    error = APIStatusError(503)
+    delays = [ResiliencePolicy(backoff_base=0.5, backoff_max=2.0, seed=7).backoff(retry, error) for retry in (1, 2, 3, 4)]
+    again = [ResiliencePolicy(backoff_base=0.5, backoff_max=2.0, seed=7).backoff(retry, error) for retry in (1, 2, 3, 4)]
+    assert delays == again
+    for retry, delay in enumerate(delays, start=1):
+        assert 0 <= delay <= min(2.0, 0.5 * 2 ** (retry - 1))
+
+
+def test_retry_after_hint_sets_the_delay(clock):
+    policy = ResiliencePolicy(max_retries=1, backoff_max=0.1, seed=1)
+    fn, calls = failing(APIStatusError(429, {"retry-after": "2"}))
+    assert policy.call(fn, KEY, hedge=False) == "ok"
+    # The hint, plus at most 10% jitter, even above backoff_max
+    assert len(clock.sleeps) == 1
+    assert 2.0 <= clock.sleeps[0] <= 2.2
+
+
+def test_deadline_cuts_off_retries(clock):
+    policy = ResiliencePolicy(max_retries=3, deadline=1.0, seed=1)
+    fn, calls = failing(APIStatusError(429, {"retry-after": "5"}))
+    # Waiting as asked would end past the deadline: give up instead
+    with pytest.raises(APIStatusError):
+        policy.call(fn, KEY, hedge=False)
+    assert len(calls) == 1
+    assert clock.sleeps == []
+
+
+def test_scoped_deadline_is_tighter_than_the_policy(clock):
+    policy = ResiliencePolicy(max_retries=3, deadline=60.0, seed=1)
+    fn, calls = failing(APIStatusError(429, {"retry-after": "1"}))
+    with call_deadline(0.5):
+        with pytest.raises(APIStatusError):
+            policy.call(fn, KEY, hedge=False)
+    assert len(calls) == 1
+
+
+def test_slow_call_raises_deadline_exceeded(clock):
+    policy = ResiliencePolicy(max_retries=3, deadline=0.05, seed=1)
+    release = threading.Event()
+    with pytest.raises(DeadlineExceeded):
+        policy.call(lambda: release.wait(1), KEY, hedge=False)
+    release.set()
+    assert clock.sleeps == []
+
+
+def test_hedge_wins_over_slow_first_attempt():
+    tracker = LatencyTracker()
+    for _ in range(resilience.HEDGE_MIN_SAMPLES):
+        tracker.observe(KEY, 0.01)
+    policy = ResiliencePolicy(hedge_quantile=0.95, hedge_min_delay=0.05, tracker=tracker, seed=1)
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(2)
+            return "slow"
+        return "fast"
+
+    started = time.monotonic()
+    assert policy.call(fn, KEY) == "fast"
+    assert time.monotonic() - started < 1
+    release.set()
+    assert len(calls) == 2
+    # The overtaken attempt is kept with its time so far, past the hedge delay
+    assert tracker.quantile(KEY, 1.0) >= 0.05
+
+
+def test_no_hedge_before_enough_samples():
+    policy = ResiliencePolicy(hedge_quantile=0.95, hedge_min_delay=0.01, tracker=LatencyTracker(), seed=1)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.1)
+        return "ok"
+
+    assert policy.call(fn, KEY) == "ok"
+    assert calls == [1]
+
+
+def test_no_hedge_when_disabled_for_the_call():
+    tracker = LatencyTracker()
+    for _ in range(resilience.HEDGE_MIN_SAMPLES):
+        tracker.observe(KEY, 0.01)
+    policy = ResiliencePolicy(hedge_quantile=0.95, hedge_min_delay=0.01, tracker=tracker, seed=1)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.1)
+        return "ok"
+
+    assert policy.call(fn, KEY, hedge=False) == "ok"
+    assert calls == [1]
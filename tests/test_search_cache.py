@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from search_cache import SearchCache, normalize_query
+
+
+@pytest.fixture
+def search_cache(tmp_path):
+    return SearchCache(path=str(tmp_path / "search.db"))
+
+
+def test_case_whitespace_and_punctuation_are_folded():
+    assert normalize_query("  Acme   Corp CEO? ") == normalize_query("acme corp ceo")
+    assert normalize_query("(Acme), CEO!") == "acme ceo"
+
+
+def test_word_order_is_kept():
+    assert normalize_query("sales head acme") != normalize_query("head sales acme")
+
+
+def test_repeated_words_are_kept():
+    assert normalize_query("new new york") == "new new york"
+
+
+def test_quoted_phrase_stays_one_token():
+    assert normalize_query('"Head  of Sales" Acme') == '"head of sales" acme'
+    assert normalize_query('"head of sales" acme') != normalize_query("head of sales acme")
+    assert normalize_query('"head of sales" acme') != normalize_query("sales acme of head")
+
+
+def test_curly_quotes_are_phrases_too():
+    assert normalize_query("“head of sales” acme") == normalize_query('"head of sales" acme')
+
+
+def test_unterminated_quote_is_dropped():
+    assert normalize_query('acme "head of sales') == "acme head of sales"
+
+
+def test_empty_quotes_are_dropped():
+    assert normalize_query('"" acme') == "acme"
+
+
+def test_operators_are_kept():
+    assert normalize_query("site:linkedin.com Acme CTO") == "site:linkedin.com acme cto"
+
+
+def test_second_lookup_is_served_from_memory(search_cache, monkeypatch):
+    fetches = []
+    assert search_cache.get_or_fetch("q", lambda: fetches.append(1) or {"organic": [1]}) == {"organic": [1]}
+
+    def no_disk(key):
+        raise AssertionError("read SQLite for an entry held in memory")
+
+    monkeypatch.setattr(search_cache._disk, "get", no_disk)
+    assert search_cache.get_or_fetch("q", lambda: fetches.append(1)) == {"organic": [1]}
+    assert fetches == [1]
+    stats = search_cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 0, 1)
+
+
+def test_entry_evicted_from_memory_is_read_from_disk(tmp_path):
+    search_cache = SearchCache(path=str(tmp_path / "search.db"), memory_entries=1)
+    search_cache.get_or_fetch("a", lambda: "A")
+    search_cache.get_or_fetch("b", lambda: "B")
+    assert search_cache.get_or_fetch("a", lambda: "refetched") == "A"
+    assert search_cache.stats()["disk_hits"] == 1
+
+
+def test_disk_entries_survive_a_new_process(tmp_path):
+    path = str(tmp_path / "search.db")
+    SearchCache(path=path).get_or_fetch("q", lambda: "result")
+    fresh = SearchCache(path=path)
+    assert fresh.get_or_fetch("q", lambda: "refetched") == "result"
+    assert fresh.stats()["disk_hits"] == 1
+
+
+def test_concurrent_misses_fetch_once(search_cache):
+    release = threading.Event()
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        release.wait(1)
+        return "result"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(search_cache.get_or_fetch("q", fetch)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["result"] * 4
+    assert fetches == [1]
@@ -0,0 +1,96 @@
+import time
+import threading
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def run_concurrently(flight: SingleFlight, key: str, fn, callers: int):
+    """Call flight.do from several threads while fn is in flight; returns results and errors."""
+    results, errors = [], []
+
+    def call() -> None:
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_waiters(flight: SingleFlight, count: int) -> None:
+    deadline = time.monotonic() + 2
+    while flight.coalesced < count and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(2)
+        return "result"
+
+    threads, results, errors = run_concurrently(flight, "k", fn, callers=5)
+    wait_for_waiters(flight, 4)
+    assert flight.in_flight("k")
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == ["result"] * 5
+    assert errors == []
+    assert flight.coalesced == 4
+    assert not flight.in_flight("k")
+
+
+def test_exception_reaches_every_waiter():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(2)
+        raise ValueError("boom")
+
+    threads, results, errors = run_concurrently(flight, "k", fn, callers=4)
+    wait_for_waiters(flight, 3)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == []
+    assert len(errors) == 4
+    assert all(isinstance(error, ValueError) and str(error) == "boom" for error in errors)
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.coalesced == 0
+
+
+def test_nothing_is_cached_after_completion():
+    flight = SingleFlight()
+    calls = []
+    flight.do("k", lambda: calls.append(1))
+    flight.do("k", lambda: calls.append(1))
+    assert calls == [1, 1]
+
+
+def test_key_is_free_again_after_a_failure():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("k", fail)
+    assert not flight.in_flight("k")
+    assert flight.do("k", lambda: "retried") == "retried"
@@ -0,0 +1,55 @@
+from typing import Any
+
+from crewai.tools import BaseTool
+from crewai_tools import SerperDevTool
+
+from search_cache import get_search_cache, normalize_query
+from resume_store import get_resume_store
+from metrics import current_trace
+from ratelimit import get_rate_limiter
+
+
+class CachedSerperDevTool(SerperDevTool):
+    """SerperDevTool that serves repeated queries from the shared search cache."""
+
+    def cache_key(self, **kwargs: Any) -> str:
+        """Key of a search: the query, normalized, plus every setting that changes results."""
+        query = kwargs.get("search_query") or kwargs.get("query") or ""
+        search_type = kwargs.get("search_type", self.search_type)
+        return "|".join([
+            str(search_type),
+            str(self.country or ""),
+            str(self.location or ""),
+            str(self.locale or ""),
+            str(self.n_results),
+            normalize_query(query)
+        ])
+
+    def _run(self, **kwargs: Any) -> Any:
+        key = self.cache_key(**kwargs)
+
+        def fetch() -> Any:
+            trace = current_trace()
+            if trace:
+                trace.count_serper_request()
+            get_rate_limiter().acquire("serper")
+            return super(CachedSerperDevTool, self)._run(**kwargs)
+
+        return get_search_cache().get_or_fetch(key, fetch)
+
+
+class ResumeReadTool(BaseTool):
+    """Reads the candidate's resume for one run straight from the in-memory store."""
+
+    name: str = "Read candidate resume"
+    description: str = (
+        "Returns the full text of the candidate's resume. "
+        "Use it to reference relevant experience in outreach messages."
+    )
+    resume_key: str
+
+    def _run(self) -> str:
+        text = get_resume_store().get(self.resume_key)
+        if text is None:
+            raise ValueError("Resume is no longer available for this session")
+        return text
@@ -0,0 +1,235 @@
+import pysqlite3
+import sys
+sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
+
+import os
+import argparse
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+
+from cache import ResearchCache, SectionCache, RequestLog, get_section_cache
+
+logger = logging.getLogger(__name__)
+
+# Countries offered in the app's "Country" selectbox
+COUNTRIES = [
+    "France", "United States", "United Kingdom", "Germany",
+    "Singapore", "Australia", "Canada", "Japan", "Netherlands",
+    "Switzerland"
+]
+TOP_INDUSTRIES = [
+    industry.strip()
+    for industry in os.getenv(
+        "CREW_WARMUP_INDUSTRIES", "Software,Financial Services,Healthcare,E-commerce,Consulting"
+    ).split(",")
+    if industry.strip()
+]
+# Refresh entries once they have used this share of their TTL
+REFRESH_FRACTION = 0.8
+# Minimum pause between two warm-up jobs, to stay well under provider rate limits
+MIN_JOB_INTERVAL = float(os.getenv("CREW_WARMUP_INTERVAL", 30))
+TOP_COMPANIES = 20
+# How far back company requests count towards popularity
+POPULARITY_WINDOW = 14 * 24 * 3600
+
+# Job priorities: lower runs first
+PRIORITY_MISSING_SECTIONS = 0
+PRIORITY_STALE_SECTIONS = 1
+PRIORITY_MISSING_COMPANY = 2
+PRIORITY_STALE_COMPANY = 3
+
+Job = Tuple[int, str, Callable[[], None]]
+
+
+class WarmupScheduler:
+    """
+    Background job that keeps the section and research caches warm for the
+    app's countries, our top industries and the most requested companies.
+    Entries are refreshed before their TTL runs out. Work runs on a single
+    low-priority thread, one job at a time, spaced by min_interval, and it
+    pauses while interactive generations are in progress.
+    """
+
+    def __init__(
+        self,
+        anthropic_api_key: str,
+        serper_api_key: str,
+        industries: Optional[List[str]] = None,
+        countries: Optional[List[str]] = None,
+        top_companies: int = TOP_COMPANIES,
+        refresh_fraction: float = REFRESH_FRACTION,
+        min_interval: float = MIN_JOB_INTERVAL,
+        research_cache: Optional[ResearchCache] = None,
+        section_cache: Optional[SectionCache] = None,
+        request_log: Optional[RequestLog] = None
+    ):
+        self.anthropic_api_key = anthropic_api_key
+        self.serper_api_key = serper_api_key
+        self.industries = industries or TOP_INDUSTRIES
+        self.countries = countries or COUNTRIES
+        self.top_companies = top_companies
+        self.refresh_fraction = refresh_fraction
+        self.min_interval = min_interval
+        self.research_cache = research_cache or ResearchCache()
+        self.section_cache = section_cache or get_section_cache()
+        self.request_log = request_log or RequestLog()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._foreground = 0
+        self._idle = threading.Condition()
+
+    def _needs_refresh(self, age: Optional[float], ttl: float) -> Optional[bool]:
+        """None if fresh, False if stale but present, True if missing."""
+        if age is None:
+            return True
+        if age >= ttl * self.refresh_fraction:
+            return False
+        return None
+
+    def plan(self) -> List[Job]:
+        """Work needed to keep the caches warm, highest priority first."""
+        # Loaded here, on the warm-up thread, so starting the scheduler stays cheap
+        from crew_company_search import INDUSTRY_SECTIONS
+        jobs: List[Job] = []
+        for industry in self.industries:
+            for country in self.countries:
+                ages = [
+                    self.section_cache.age(section, industry, country)
+                    for section in INDUSTRY_SECTIONS
+                ]
+                states = [self._needs_refresh(age, self.section_cache.ttl_seconds) for age in ages]
+                if any(state is not None for state in states):
+                    priority = PRIORITY_MISSING_SECTIONS if True in states else PRIORITY_STALE_SECTIONS
+                    jobs.append((
+                        priority,
+                        f"sections: {industry} / {country}",
+                        self._section_job(industry, country)
+                    ))
+
+        for company, industry, country, role in self.request_log.top(
+            self.top_companies, since_seconds=POPULARITY_WINDOW
+        ):
+            state = self._needs_refresh(
+                self.research_cache.age(company, industry, country, role),
+                self.research_cache.ttl_seconds
+            )
+            if state is not None:
+                priority = PRIORITY_MISSING_COMPANY if state else PRIORITY_STALE_COMPANY
+                jobs.append((
+                    priority,
+                    f"company: {company} ({role}, {country})",
+                    self._company_job(company, industry, country, role)
+                ))
+
+        # Stable sort keeps popularity order within a priority
+        return sorted(jobs, key=lambda job: job[0])
+
+    def _section_job(self, industry: str, country: str) -> Callable[[], None]:
+        def job() -> None:
+            from crew_company_search import get_agents, INDUSTRY_SECTIONS
+            from pipeline import run_research_sections
+            agents = get_agents(self.anthropic_api_key, self.serper_api_key)
+            sections = run_research_sections(
+                agents["researcher"], "", industry, country, "",
+                sections=list(INDUSTRY_SECTIONS)
+            )
+            for section, value in sections.items():
+                self.section_cache.set(section, industry, country, value)
+        return job
+
+    def _company_job(self, company: str, industry: str, country: str, role: str) -> Callable[[], None]:
+        def job() -> None:
+            from pipeline import run_research
+            research = run_research(
+                self.anthropic_api_key, self.serper_api_key, company, industry, country, role
+            )
+            self.research_cache.set(company, industry, country, role, research)
+        return job
+
+    @contextmanager
+    def foreground(self):
+        """Mark an interactive generation as running; warm-up jobs wait until it ends."""
+        with self._idle:
+            self._foreground += 1
+        try:
+            yield
+        finally:
+            with self._idle:
+                self._foreground -= 1
+                self._idle.notify_all()
+
+    def _wait_until_idle(self) -> None:
+        with self._idle:
+            while self._foreground and not self._stop.is_set():
+                self._idle.wait(timeout=1.0)
+
+    def run_once(self) -> int:
+        """Run every job currently due, returning how many succeeded."""
+        succeeded = 0
+        for _, name, job in self.plan():
+            if self._stop.is_set():
+                break
+            self._wait_until_idle()
+            try:
+                job()
+                succeeded += 1
+                logger.info("refreshed %s", name)
+            except Exception as e:
+                logger.warning("failed %s: %s", name, str(e))
+            # Spread jobs out so background work never competes for quota
+            self._stop.wait(self.min_interval)
+        return succeeded
+
+    def _loop(self, cycle_interval: float) -> None:
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(cycle_interval)
+
+    def start(self, cycle_interval: float = 3600) -> None:
+        """Start the background warm-up thread if it is not already running."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, args=(cycle_interval,), name="cache-warmup", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._idle:
+            self._idle.notify_all()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Warm the research caches ahead of user traffic.")
+    parser.add_argument("--once", action="store_true", help="Run the due jobs once and exit")
+    parser.add_argument("--interval", type=float, default=MIN_JOB_INTERVAL,
+                        help="Seconds to wait between jobs")
+    parser.add_argument("--cycle", type=float, default=3600,
+                        help="Seconds between planning cycles when running continuously")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="[warmup] %(message)s")
+
+    anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
+    serper_api_key = os.getenv("SERPER_API_KEY")
+    if not anthropic_api_key or not serper_api_key:
+        print("Missing required API keys in environment variables", file=sys.stderr)
+        return 2
+
+    scheduler = WarmupScheduler(anthropic_api_key, serper_api_key, min_interval=args.interval)
+    if args.once:
+        scheduler.run_once()
+        return 0
+
+    try:
+        scheduler._loop(args.cycle)
+    except KeyboardInterrupt:
+        scheduler.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())